@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Database methods are written once as operations: generators that yield every API request they
+# need as (name, args) and are sent the answer (or have the request's error thrown into them).
+# An I/O adapter answers the requests, db_signal.SignalIO with blocking calls and
+# async_db_signal.AsyncSignalIO with awaitable ones, so the same operation serves the blocking
+# classes and their awaitable counterparts. Operations compose with `yield from`.
+Operation = Generator[tuple[str, tuple], Any, T]
+
+
+def run_operation(operation: Operation[T], io: object) -> T:
+    """Run an operation to completion, answering its requests with blocking calls on io."""
+    try:
+        request = next(operation)
+        while True:
+            name, args = request
+            try:
+                result = getattr(io, name)(*args)
+            except Exception as e:  # noqa: BLE001
+                request = operation.throw(e)
+            else:
+                request = operation.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def async_run_operation(operation: Operation[T], io: object) -> T:
+    """Run an operation to completion, answering its requests with awaitable calls on io."""
+    try:
+        request = next(operation)
+        while True:
+            name, args = request
+            try:
+                result = await getattr(io, name)(*args)
+            except Exception as e:  # noqa: BLE001
+                request = operation.throw(e)
+            else:
+                request = operation.send(result)
+    except StopIteration as stop:
+        return stop.value
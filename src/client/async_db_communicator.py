@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import aiohttp
+import exceptions as err
+from api_constants import (
+    BACKEND_HOST,
+    REQUEST_HEADERS,
+)
+from async_http_transport import get_async_transport
+from db_communicator import (
+    AllItemsRoutes,
+    StripeRoutes,
+    VMItemsRoutes,
+    VMRoutes,
+    check_status,
+    string_builder,
+)
+
+#Awaitable counterpart of db_communicator. The endpoints are the ones db_communicator defines,
+#built with a send that goes through the shared aiohttp transport, so every endpoint call returns
+#a coroutine and the event loop keeps running (keypad scanning, LCD scrolling) while waiting on
+#the API.
+
+
+async def send(
+    method: str, route: tuple[str, ...], payload: object = None, params: dict | None = None,
+) -> (dict | list | None):
+    """Send a request to BACKEND_HOST/route, raising the same errors as db_communicator.send."""
+    api_route = string_builder(BACKEND_HOST, *route)
+    kwargs = {} if payload is None else {"json": payload, "headers": REQUEST_HEADERS}
+    if params is not None:
+        kwargs["params"] = params
+    try:
+        status, body = await get_async_transport().request(method, api_route, **kwargs)
+    except aiohttp.ClientConnectionError as e:
+        raise ConnectionError(f"Failed to connect to API: {e}") from e
+    except aiohttp.ClientError as e:
+        raise err.QueryFailureError("Error: " + str(e), status_code=None) from e
+
+    check_status(status, body, api_route)
+    return body
+
+
+AsyncVMs = VMRoutes(send)
+AsyncAllItems = AllItemsRoutes(send)
+AsyncVMItems = VMItemsRoutes(send)
+AsyncStripe = StripeRoutes(send)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import async_db_communicator
+import exceptions as err
+from api_constants import (
+    NOT_FOUND,
+)
+from db_ping import async_circuit_breaker_guard
+
+if TYPE_CHECKING:
+    from inventory_journal import JournalReplayer
+
+
+class AsyncVendingMachines:
+    """Awaitable counterpart of db_signal.VendingMachines.
+
+    Methods
+    -------
+    vending_machine_exists(hardware_id:str)
+        Checks whether vending machine exists in database
+    get_vending_machine(hardware_id: str)
+        Returns vending machine in json format specified by ID
+    register_vending_machine(hardware_id: str, row_count: int, column_count: int)
+        Register the dimensions of a vending machine in the database
+    set_mode(hardware_id:str, new_mode: str, expected_mode: str)
+        Set the operating mode of vending machine in database, only if it is expected_mode
+        when given
+    rename(hardware_id:str, new_name: str)
+        Set the name of the vending machine in database
+
+    """
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def vending_machine_exists(hardware_id:str) -> bool:
+        try:
+            await AsyncVendingMachines.get_vending_machine(hardware_id)
+        except err.QueryFailureError as e:
+            if(e.status_code == NOT_FOUND): return False
+            raise
+        else: return True
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def get_vending_machine(hardware_id:str) -> (dict | None):
+        return await async_db_communicator.AsyncVMs.get_single_machine(hardware_id)
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def register_vending_machine(
+        hardware_id:str, row_count:int, column_count:int) -> (dict | None):
+        return await async_db_communicator.AsyncVMs.register_machine(
+            hardware_id, row_count, column_count)
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def set_mode(
+        hardware_id:str, new_mode:str, expected_mode:str | None = None) -> (dict | None):
+        return await async_db_communicator.AsyncVMs.alter_mode(
+            hardware_id, new_mode, expected_mode)
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def rename(hardware_id:str, new_name:str) -> (dict | None):
+        return await async_db_communicator.AsyncVMs.alter_name(hardware_id, new_name)
+
+
+class AsyncItems:
+    """Awaitable counterpart of db_signal.Items.
+
+    Methods
+    -------
+    get_all_items()
+        Show list of all stockable items in the database
+
+    """
+
+    @staticmethod
+    async def get_all_items() -> list[str]:
+        return await async_db_communicator.AsyncAllItems.get_items()
+
+
+class AsyncInventory:
+    """Awaitable counterpart of db_signal.Inventory.
+
+    Methods
+    -------
+    get_inventory_of_vending_machine(hardware_id: str, since: int)
+        Get all items associated with a vending machine, or only those changed after since
+    update_database(hardware_id: str, inventory: list[dict[str, str]])
+        Upload local changes stored in change_log to database
+
+    """
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def get_inventory_of_vending_machine(
+        hardware_id: str, since: int | None = None) -> (dict | list[dict] | None):
+        return await async_db_communicator.AsyncVMItems.get_items(hardware_id, since)
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def update_database(hardware_id: str, inventory: list[dict[str, str]]) -> (dict | None):
+        return await async_db_communicator.AsyncVMItems.update_vm_inv(hardware_id, inventory)
+
+
+class AsyncStripe:
+    """Awaitable counterpart of db_signal.Stripe.
+
+    Methods
+    -------
+    get_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int)
+        Get a secure payment token associated with a card for payment
+    charge(token: str, amount: int)
+        Use the payment token to charge an amount to a customer's payment method
+
+    """
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def get_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int) -> str:
+        # Created client side, no request to await
+        return async_db_communicator.AsyncStripe.create_payment_token(
+            card_number, exp_month, exp_year, cvc)
+
+    @staticmethod
+    @async_circuit_breaker_guard()
+    async def charge(token: str, amount: int) -> (dict | None):
+        if(amount == 0): return None
+        return await async_db_communicator.AsyncStripe.charge_card(min(amount, 50), token)
+
+
+class AsyncSignalIO:
+    """Awaitable counterpart of db_signal.SignalIO, answers requests with async_db_signal calls.
+
+    Methods
+    -------
+    get_vending_machine(hardware_id: str)
+        AsyncVendingMachines.get_vending_machine
+    register_vending_machine(hardware_id: str, row_count: int, column_count: int)
+        AsyncVendingMachines.register_vending_machine
+    set_mode(hardware_id: str, new_mode: str, expected_mode: str)
+        AsyncVendingMachines.set_mode
+    get_inventory_of_vending_machine(hardware_id: str, since: int)
+        AsyncInventory.get_inventory_of_vending_machine
+    update_database(hardware_id: str, inventory: list[dict[str, str]])
+        AsyncInventory.update_database
+    get_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int)
+        AsyncStripe.get_payment_token
+    charge(token: str, amount: int)
+        AsyncStripe.charge
+    replay_journal(replayer: JournalReplayer)
+        Send journaled changes without blocking the event loop, returns False while they are
+        still pending
+
+    """
+
+    @staticmethod
+    async def get_vending_machine(hardware_id: str) -> (dict | None):
+        return await AsyncVendingMachines.get_vending_machine(hardware_id)
+
+    @staticmethod
+    async def register_vending_machine(
+        hardware_id: str, row_count: int, column_count: int) -> (dict | None):
+        return await AsyncVendingMachines.register_vending_machine(
+            hardware_id, row_count, column_count)
+
+    @staticmethod
+    async def set_mode(
+        hardware_id: str, new_mode: str, expected_mode: str | None = None) -> (dict | None):
+        return await AsyncVendingMachines.set_mode(hardware_id, new_mode, expected_mode)
+
+    @staticmethod
+    async def get_inventory_of_vending_machine(
+        hardware_id: str, since: int | None = None) -> (dict | list[dict] | None):
+        return await AsyncInventory.get_inventory_of_vending_machine(hardware_id, since)
+
+    @staticmethod
+    async def update_database(hardware_id: str, inventory: list[dict[str, str]]) -> (dict | None):
+        return await AsyncInventory.update_database(hardware_id, inventory)
+
+    @staticmethod
+    async def get_payment_token(card_number: str, exp_month: str, exp_year: int, cvc: int) -> str:
+        return await AsyncStripe.get_payment_token(card_number, exp_month, exp_year, cvc)
+
+    @staticmethod
+    async def charge(token: str, amount: int) -> (dict | None):
+        return await AsyncStripe.charge(token, amount)
+
+    @staticmethod
+    async def replay_journal(replayer: JournalReplayer) -> bool:
+        return await replayer.async_replay_once()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from api_constants import (
+    KEEP_ALIVE,
+    POOL_MAXSIZE,
+    ROUTE_TIMEOUTS,
+    TIMEOUT,
+)
+
+
+class AsyncHttpTransport:
+    """Non-blocking counterpart of http_transport.HttpTransport built on aiohttp.
+
+    The aiohttp session is created lazily inside the running event loop and keeps a pool of
+    keep-alive connections to the API, so awaiting a request never blocks the loop.
+
+    Attributes
+    ----------
+    route_timeouts: dict[str, float]
+        Timeout (in seconds) for each API route, routes not listed use default_timeout
+    default_timeout: float
+        Timeout (in seconds) used for routes without an entry in route_timeouts
+
+    Methods
+    -------
+    async def request(self, method, url, timeout=None, **kwargs) -> tuple[int, object]
+        Send a request and return its status code and decoded JSON body
+    def timeout_for(self, url) -> float
+        Returns the timeout for the route that url points to
+    def get_stats(self) -> dict
+        Returns request, latency and connection reuse counters
+    def reset_stats(self) -> None
+        Zeroes all counters
+    async def close(self) -> None
+        Closes the session and all pooled connections
+
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = POOL_MAXSIZE,
+        keep_alive: bool = KEEP_ALIVE,
+        route_timeouts: dict[str, float] | None = None,
+        default_timeout: float = TIMEOUT,
+    ) -> None:
+        self.route_timeouts = dict(ROUTE_TIMEOUTS if route_timeouts is None else route_timeouts)
+        self.default_timeout = default_timeout
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.__session: aiohttp.ClientSession | None = None
+        self.reset_stats()
+
+
+    async def request(
+        self, method: str, url: str, timeout: float | None = None, **kwargs,  # noqa: ANN003, ASYNC109
+        ) -> tuple[int, object]:
+        if timeout is None:
+            timeout = self.timeout_for(url)
+
+        session = self.__get_session()
+        start = time.perf_counter()
+        try:
+            async with session.request(
+                method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs,
+            ) as response:
+                text = await response.text()
+                try:
+                    body = json.loads(text) if text else None
+                except ValueError:
+                    body = text
+                return response.status, body
+        finally:
+            elapsed = time.perf_counter() - start
+            route = self.__route_of(url)
+            self.__requests += 1
+            self.__total_time += elapsed
+            count, total = self.__route_stats.get(route, (0, 0.0))
+            self.__route_stats[route] = (count + 1, total + elapsed)
+
+
+    def timeout_for(self, url: str) -> float:
+        return self.route_timeouts.get(self.__route_of(url), self.default_timeout)
+
+
+    def get_stats(self) -> dict:
+        requests_made = self.__requests
+        return {
+            "requests": requests_made,
+            "connections_opened": self.__opened,
+            "connections_reused": self.__reused,
+            "reuse_ratio": self.__reused / requests_made if requests_made else 0.0,
+            "total_time": self.__total_time,
+            "avg_latency": self.__total_time / requests_made if requests_made else 0.0,
+            "routes": {
+                route: {"requests": count, "avg_latency": total / count}
+                for route, (count, total) in self.__route_stats.items()
+            },
+        }
+
+
+    def reset_stats(self) -> None:
+        self.__requests = 0
+        self.__opened = 0
+        self.__reused = 0
+        self.__total_time = 0.0
+        self.__route_stats: dict[str, tuple[int, float]] = {}
+
+
+    async def close(self) -> None:
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+        self.__session = None
+
+
+    def __get_session(self) -> aiohttp.ClientSession:
+        if self.__session is None or self.__session.closed:
+            # aiohttp reports whether each request opened or reused a pooled connection
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self.__on_connection_created)
+            trace.on_connection_reuseconn.append(self.__on_connection_reused)
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize, force_close=not self.keep_alive)
+            self.__session = aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+        return self.__session
+
+    async def __on_connection_created(self, *_args) -> None:
+        self.__opened += 1
+
+    async def __on_connection_reused(self, *_args) -> None:
+        self.__reused += 1
+
+
+    def __route_of(self, url: str) -> str:
+        segments = [s for s in urlsplit(url).path.split("/") if s]
+        for segment in reversed(segments):
+            if segment in self.route_timeouts:
+                return segment
+        return segments[0] if segments else ""
+
+
+_transport: AsyncHttpTransport | None = None
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    """Return the process wide async transport, creating it with default settings on first use."""
+    global _transport
+    if _transport is None:
+        _transport = AsyncHttpTransport()
+    return _transport
+
+
+async def configure_async_transport(**settings) -> AsyncHttpTransport:  # noqa: ANN003
+    """Replace the process wide async transport with one built from settings."""
+    global _transport
+    if _transport is not None:
+        await _transport.close()
+    _transport = AsyncHttpTransport(**settings)
+    return _transport
+
+
+async def close_async_transport() -> None:
+    """Close the process wide async transport if one was created."""
+    if _transport is not None:
+        await _transport.close()
+
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from api_operation import async_run_operation
+from async_db_signal import AsyncSignalIO
+from inventory_manager import InventoryManager
+
+if TYPE_CHECKING:
+    from enum_types import InventoryManagerMode, SlotNamingScheme
+    from inventory_journal import InventoryJournal
+
+
+class AsyncInventoryManager:
+    """Awaitable interface to an InventoryManager for callers on the event loop.
+
+    The InventoryManager (core) keeps the inventory and defines every database method once as an
+    operation, this class runs those operations with awaitable I/O built on async_db_signal, so
+    callers running on the event loop never block on the network. Local inventory operations
+    (get_item, change_stock, add_item, ...) and attributes are forwarded to core unchanged.
+    Code that needs blocking database methods, e.g. the MQTT thread, uses core directly.
+
+    Attributes
+    ----------
+    core: InventoryManager
+        Inventory manager holding the inventory, its database methods block
+
+    Methods
+    -------
+    async def sync_from_database() -> dict
+        Check if dimensions match between local and db, load inventory of vending machine,
+        and sync mode with database
+    async def load_inventory_from_db(self) -> list[str]
+        Load changed items from database, returns the names of the slots that changed
+    async def save_inventory_to_db(self) -> None
+        Save items to database, slots that changed in the database meanwhile are merged
+    async def load_mode_from_db(self) -> None
+        Set the local mode to the mode that is on the db, skipped while the mode lease is valid
+    async def set_mode(self, new_mode) -> None
+        Sets the operating mode of this inventory manager
+    async def compare_and_set_mode(self, expected_mode, new_mode) -> bool
+        Change the mode on the db only if it is still expected_mode, returns whether it was
+
+    """
+
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        hardware_id: str,
+        journal: InventoryJournal | None = None,
+        slot_naming: SlotNamingScheme | None = None,
+    ) -> None:
+        self.core = InventoryManager(height, width, hardware_id, journal, slot_naming)
+
+
+    def __getattr__(self, name: str) -> object:
+        """Forward names not defined here, i.e. the core's local operations and attributes."""
+        return getattr(self.core, name)
+
+
+    async def sync_from_database(self) -> dict:
+        return await async_run_operation(self.core.sync_from_database_op(), AsyncSignalIO)
+
+
+    async def load_inventory_from_db(self) -> list[str]:
+        return await async_run_operation(self.core.load_inventory_from_db_op(), AsyncSignalIO)
+
+    async def save_inventory_to_db(self) -> None:
+        await async_run_operation(self.core.save_inventory_to_db_op(), AsyncSignalIO)
+
+
+    async def load_mode_from_db(self) -> None:
+        await async_run_operation(self.core.load_mode_from_db_op(), AsyncSignalIO)
+
+
+    async def set_mode(self, new_mode: InventoryManagerMode) -> None:
+        await async_run_operation(self.core.set_mode_op(new_mode), AsyncSignalIO)
+
+
+    async def compare_and_set_mode(
+        self, expected_mode: InventoryManagerMode, new_mode: InventoryManagerMode,
+    ) -> bool:
+        return await async_run_operation(
+            self.core.compare_and_set_mode_op(expected_mode, new_mode), AsyncSignalIO)
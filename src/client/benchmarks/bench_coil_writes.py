@@ -0,0 +1,87 @@
+"""Benchmark the per step GPIO overhead of per coil writes versus one group write.
+
+Run on the pi from src/client: python -m benchmarks.bench_coil_writes
+or anywhere with: python -m benchmarks.bench_coil_writes --hardware simulated
+
+"per coil" is how motors used to step: four gpiozero OutputDevices created for every
+rotation and one write per coil per step. "group" is StepperMotor as it is now, pins claimed
+once and one lgpio group write of a precomputed bitmask per step. Setup is the cost paid per
+rotation (claiming and releasing the pins for per coil, nothing for group). Uses the pins of
+the first motor, which must not be turning.
+"""
+import argparse  # noqa: INP001
+import time
+
+from customer.Hardware import backend
+from customer.Hardware.hardware_constants import (
+    STEP_DELAY,
+    STEP_SEQUENCE,
+    STEPPER_PINS,
+    STEPS_PER_QUARTER_REV,
+)
+from customer.Hardware.stepper_motors import StepperMotor
+
+STEPS = 20_000
+ROTATIONS = 50
+
+
+def per_coil(pins: list[int]) -> tuple[float, float]:
+    start = time.perf_counter()
+    for _ in range(ROTATIONS):
+        coils = [backend.gpiozero.OutputDevice(pin) for pin in pins]
+        for coil in coils:
+            coil.off()
+            coil.close()
+    setup = (time.perf_counter() - start) / ROTATIONS
+
+    coils = [backend.gpiozero.OutputDevice(pin) for pin in pins]
+    try:
+        start = time.perf_counter()
+        for step_num in range(STEPS):
+            step = STEP_SEQUENCE[step_num % len(STEP_SEQUENCE)]
+            for coil, val in zip(coils, step):
+                coil.value = val
+        per_step = (time.perf_counter() - start) / STEPS
+    finally:
+        for coil in coils:
+            coil.off()
+            coil.close()
+    return setup, per_step
+
+
+def group(pins: list[int]) -> tuple[float, float]:
+    motor = StepperMotor(STEPS_PER_QUARTER_REV, STEP_DELAY, STEP_SEQUENCE, pins)
+    try:
+        start = time.perf_counter()
+        for _ in range(ROTATIONS):
+            motor.begin()
+            motor.end()
+        setup = (time.perf_counter() - start) / ROTATIONS
+
+        start = time.perf_counter()
+        for step_num in range(STEPS):
+            motor.step(step_num)
+        per_step = (time.perf_counter() - start) / STEPS
+    finally:
+        motor.close()
+    return setup, per_step
+
+
+def main() -> None:
+    pins = STEPPER_PINS[0][0]
+    print(f"step budget at STEP_DELAY: {STEP_DELAY * 1e6:.0f}us")
+    print(f"{'writes':>9} {'setup us':>10} {'step us':>9} {'of budget':>10}")
+    results = {"per coil": per_coil(pins), "group": group(pins)}
+    for name, (setup, per_step) in results.items():
+        print(
+            f"{name:>9} {setup * 1e6:>10.1f} {per_step * 1e6:>9.2f}"
+            f" {per_step / STEP_DELAY:>10.1%}",
+        )
+    print(f"group write speedup per step: {results['per coil'][1] / results['group'][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per step overhead of coil writes.")
+    backend.add_argument(parser)
+    backend.select(parser.parse_args().hardware)
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark idle CPU and press latency of the edge triggered and polling keypad drivers.
+
+Run on the pi from src/client: python -m benchmarks.bench_keypad
+or anywhere with: python -m benchmarks.bench_keypad --hardware simulated
+
+For every driver the keypad first sits idle for IDLE_SECONDS, CPU time used by the process
+is measured. Then press keys for PRESS_SECONDS. Press latency is from the moment the press
+could first be seen (the edge alert, or the previous scan pass for polling) to the key being
+queued for the runner. With simulated hardware a script taps the keys.
+"""
+import argparse  # noqa: INP001
+import asyncio
+import time
+
+from customer.Hardware import backend
+from customer.Hardware.hardware_constants import (
+    KEYPAD_COL_PINS,
+    KEYPAD_DEBOUNCE,
+    KEYPAD_LAYOUT,
+    KEYPAD_ROW_PINS,
+)
+from customer.Hardware.keypad import EDGE_SCAN, POLL_SCAN, AsyncKeypad
+
+IDLE_SECONDS = 10
+PRESS_SECONDS = 15
+TAP_GAP = 0.25
+
+
+def tap_keys() -> None:
+    from customer.Hardware.simulated.keypad_matrix import TAP_HOLD, KeypadMatrix
+
+    matrix = KeypadMatrix(
+        backend.lgpio.get_chip(0), KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS)
+    keys = [key for row in KEYPAD_LAYOUT for key in row]
+    taps = int(PRESS_SECONDS / (TAP_GAP + TAP_HOLD)) - 1
+    matrix.play((TAP_GAP, keys[i % len(keys)]) for i in range(taps))
+
+
+async def measure(mode: str) -> None:
+    keypad = AsyncKeypad(
+        KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS, mode=mode, debounce=KEYPAD_DEBOUNCE)
+    await keypad.start()
+    try:
+        print(f"{mode}: leave the keypad alone for {IDLE_SECONDS}s")
+        cpu, wall = time.process_time(), time.perf_counter()
+        await asyncio.sleep(IDLE_SECONDS)
+        idle_cpu = (time.process_time() - cpu) / (time.perf_counter() - wall)
+        idle_wakeups = keypad.get_stats()["wakeups"] / IDLE_SECONDS
+
+        print(f"{mode}: press keys for {PRESS_SECONDS}s")
+        if backend.selected() == backend.SIMULATED:
+            tap_keys()
+        await asyncio.sleep(PRESS_SECONDS)
+        stats = keypad.get_stats()
+        print(
+            f"{mode}: idle CPU {idle_cpu:.2%}, {idle_wakeups:.1f} wakeups/s idle, "
+            f"{stats['presses']} presses, latency avg {stats['avg_latency'] * 1000:.2f}ms "
+            f"max {stats['max_latency'] * 1000:.2f}ms",
+        )
+    finally:
+        await keypad.close()
+
+
+async def main() -> None:
+    for mode in (POLL_SCAN, EDGE_SCAN):
+        await measure(mode)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keypad idle CPU and press latency per driver.")
+    backend.add_argument(parser)
+    backend.select(parser.parse_args().hardware)
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Benchmark I2C bytes per second of scrolling a message by display shifts versus deltas.
+
+Run on the pi from src/client: python -m benchmarks.bench_lcd_scroll
+or anywhere with: python -m benchmarks.bench_lcd_scroll --hardware simulated
+
+The message scrolls on the first line for SECONDS in each mode. With the second line blank
+it is loaded into display RAM once and shifted, one command per frame. With text on the
+second line display shifts would move it too, so frames are drawn as framebuffer deltas.
+The old scroll loop rewrote the whole window every frame, shown for reference.
+"""
+import argparse  # noqa: INP001
+import asyncio
+
+from customer.Hardware import backend
+from customer.Hardware.hardware_constants import (
+    I2C_ADDR,
+    LCD_BACKLIGHT,
+    LCD_CHR,
+    LCD_CMD,
+    LCD_E_DELAY,
+    LCD_E_PULSE,
+    LCD_ENABLE,
+    LCD_LINE_1,
+    LCD_LINE_2,
+    LCD_WIDTH,
+)
+from customer.Hardware.LCD_display import DELTA_SCROLL, HARDWARE_SCROLL, LCDDisplay
+
+MESSAGE = "CHOOSE SLOT OR PRESS C TO PAY"
+SCROLL_DELAY = 0.3
+SECONDS = 10
+
+
+async def main() -> None:
+    lcd = LCDDisplay(
+        I2C_ADDR, LCD_WIDTH, LCD_LINE_1, LCD_LINE_2, LCD_CHR, LCD_CMD,
+        LCD_BACKLIGHT, LCD_ENABLE, LCD_E_PULSE, LCD_E_DELAY,
+    )
+    await lcd.init()
+
+    for mode, second_line in ((HARDWARE_SCROLL, ""), (DELTA_SCROLL, "1 DISPENSING")):
+        await lcd.write(second_line, LCD_LINE_2)
+        await lcd.write(MESSAGE, LCD_LINE_1, SCROLL_DELAY)
+        await asyncio.sleep(SECONDS)
+        await lcd.clear_all()
+        rate = lcd.get_stats()["scroll_bytes_per_second"][mode]
+        print(f"{mode:>9}: {rate:>8.1f} I2C bytes/s")
+
+    # A full window of LCD bytes (cursor + characters), 6 I2C bytes each, every frame
+    print(f"{'rewrite':>9}: {(LCD_WIDTH + 1) * 6 / SCROLL_DELAY:>8.1f} I2C bytes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="I2C bytes per second per scroll mode.")
+    backend.add_argument(parser)
+    backend.select(parser.parse_args().hardware)
+    asyncio.run(main())
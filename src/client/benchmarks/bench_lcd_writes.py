@@ -0,0 +1,76 @@
+"""Benchmark characters per second written to the LCD per byte versus batched.
+
+Run on the pi from src/client: python -m benchmarks.bench_lcd_writes
+or anywhere with: python -m benchmarks.bench_lcd_writes --hardware simulated
+
+"per byte" is how lines used to be written: six single byte I2C writes per character with
+the enable pulse paced by asyncio sleeps. "batched" encodes a whole line into one buffer and
+sends it as a single I2C transfer from the display's worker thread. Every repaint changes all
+16 characters, so the framebuffer skips nothing and both paths send the same LCD bytes.
+"""
+import argparse  # noqa: INP001
+import asyncio
+import time
+
+from customer.Hardware import backend
+from customer.Hardware.hardware_constants import (
+    I2C_ADDR,
+    LCD_BACKLIGHT,
+    LCD_CHR,
+    LCD_CMD,
+    LCD_E_DELAY,
+    LCD_E_PULSE,
+    LCD_ENABLE,
+    LCD_LINE_1,
+    LCD_LINE_2,
+    LCD_WIDTH,
+)
+from customer.Hardware.LCD_display import LCDDisplay
+
+REPAINTS = 40
+TEXTS = ["0123456789ABCDEF", "FEDCBA9876543210"]
+
+
+async def per_byte(lcd: LCDDisplay) -> float:
+    start = time.perf_counter()
+    for i in range(REPAINTS):
+        await lcd._lcd_byte(LCD_LINE_1, LCD_CMD)  # noqa: SLF001
+        for char in TEXTS[i % 2]:
+            await lcd._lcd_byte(ord(char), LCD_CHR)  # noqa: SLF001
+    return REPAINTS * LCD_WIDTH / (time.perf_counter() - start)
+
+
+async def batched(lcd: LCDDisplay) -> float:
+    start = time.perf_counter()
+    for i in range(REPAINTS):
+        await lcd.write(TEXTS[i % 2], LCD_LINE_1)
+    return REPAINTS * LCD_WIDTH / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    lcd = LCDDisplay(
+        I2C_ADDR, LCD_WIDTH, LCD_LINE_1, LCD_LINE_2, LCD_CHR, LCD_CMD,
+        LCD_BACKLIGHT, LCD_ENABLE, LCD_E_PULSE, LCD_E_DELAY,
+    )
+    await lcd.init()
+
+    results = {}
+    for name, bench in (("per byte", per_byte), ("batched", batched)):
+        before = lcd.get_stats()
+        chars_per_second = await bench(lcd)
+        after = lcd.get_stats()
+        results[name] = chars_per_second
+        print(
+            f"{name:>9}: {chars_per_second:>8.0f} chars/s"
+            f"  {(after['i2c_bytes'] - before['i2c_bytes']) / REPAINTS:>5.0f} I2C bytes"
+            f"  {(after['transfers'] - before['transfers']) / REPAINTS:>5.0f} transfers per line",
+        )
+    print(f"speedup: {results['batched'] / results['per byte']:.1f}x")
+    await lcd.clear_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LCD characters per second per write path.")
+    backend.add_argument(parser)
+    backend.select(parser.parse_args().hardware)
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""Benchmark the duration of a dispense with and without a motion profile.
+
+Run from src/client: python -m benchmarks.bench_motion_profile
+
+Durations are computed from the step delay tables, the ones the stepping thread sleeps on, for
+a full dispense and for a single quarter rotation (short moves spend most of their time
+accelerating). The last column is how long building the delay table of a dispense takes the
+first time, after which it is cached.
+"""
+import time  # noqa: INP001
+
+from customer.Hardware.hardware_constants import (
+    DISPENSE_QUARTER_ROTATIONS,
+    MOTION_PROFILE,
+    STEP_DELAY,
+    STEPS_PER_QUARTER_REV,
+)
+from customer.Hardware.motion_profile import S_CURVE, TRAPEZOIDAL, MotionProfile
+
+
+def main() -> None:
+    dispense_steps = DISPENSE_QUARTER_ROTATIONS * STEPS_PER_QUARTER_REV
+    print(f"{'profile':>12} {'dispense s':>10} {'quarter s':>10} {'ramp steps':>10} {'build ms':>9}")
+    print(
+        f"{'constant':>12} {dispense_steps * STEP_DELAY:>10.3f}"
+        f" {STEPS_PER_QUARTER_REV * STEP_DELAY:>10.3f} {0:>10} {0:>9.3f}",
+    )
+    for shape in (TRAPEZOIDAL, S_CURVE):
+        start = time.perf_counter()
+        profile = MotionProfile.from_config({**MOTION_PROFILE, "shape": shape})
+        profile.delays(dispense_steps)
+        build = (time.perf_counter() - start) * 1000
+        print(
+            f"{shape:>12} {profile.duration(dispense_steps):>10.3f}"
+            f" {profile.duration(STEPS_PER_QUARTER_REV):>10.3f}"
+            f" {len(profile.ramp):>10} {build:>9.3f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark dispensing a cart serially versus concurrently within the power budget.
+
+Run from src/client: python -m benchmarks.bench_motor_scheduler
+
+Motors are stand ins that record their coil writes instead of driving GPIO pins, so the
+timing is the scheduler's: the serial column uses a budget of one motor's worth of coils,
+the others allow more motors to step at once. The last column is the lowest achieved step
+rate as a share of the target rate. Each rotation is shortened to SCALE of a real
+dispense to keep the run short, times are scaled back up for the report.
+"""
+import asyncio
+import time
+
+from customer.Hardware.hardware_constants import (
+    DISPENSE_QUARTER_ROTATIONS,
+    STEP_DELAY,
+    STEP_SEQUENCE,
+    STEPS_PER_QUARTER_REV,
+)
+from customer.hardware_manager import DispenserManager
+
+SCALE = 1 / 16
+CARTS = [1, 2, 3, 6]
+BUDGETS = [2, 4, 6]
+
+
+class RecordingMotor:
+    """StepperMotor stand in with the same stepping interface and no hardware."""
+
+    def __init__(self) -> None:
+        self.steps_per_rev = int(STEPS_PER_QUARTER_REV * SCALE)
+        self.step_delay = STEP_DELAY
+        self.max_energized_coils = max(sum(step) for step in STEP_SEQUENCE)
+        self.pins = []
+        self.steps = 0
+
+    def begin(self) -> None:
+        pass
+
+    def step(self, _step_num: int) -> None:
+        self.steps += 1
+
+    def end(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def total_steps(self, quarter_rotations: int) -> int:
+        return quarter_rotations * self.steps_per_rev
+
+    def step_delays(self, total_steps: int) -> list[float]:
+        return [self.step_delay] * total_steps
+
+
+async def dispense_cart(items: int, max_coils: int) -> tuple[float, float]:
+    motors = [[RecordingMotor() for _ in range(items)]]
+    dispenser = DispenserManager(motors, max_coils)
+
+    start = time.perf_counter()
+    await dispenser.dispense_many([(0, col) for col in range(items)])
+    elapsed = (time.perf_counter() - start) / SCALE
+
+    stats = dispenser.scheduler.get_stats()
+    dispenser.close()
+    return elapsed, stats["achieved_rate"] / stats["target_rate"]
+
+
+def main() -> None:
+    ideal = DISPENSE_QUARTER_ROTATIONS * STEPS_PER_QUARTER_REV * STEP_DELAY
+    print(f"one dispense at the nominal step rate: {ideal:.2f}s")
+    print(f"{'items':>5} " + " ".join(f"{f'budget {b} s':>12}" for b in BUDGETS) + "  step rate")
+    for items in CARTS:
+        results = [asyncio.run(dispense_cart(items, budget)) for budget in BUDGETS]
+        worst_rate = min(rate for _, rate in results)
+        print(
+            f"{items:>5} " + " ".join(f"{elapsed:>12.2f}" for elapsed, _ in results)
+            + f"  {worst_rate:>8.1%}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark get_stock_information with the per-slot render cache.
+
+Run from src/client: python -m benchmarks.bench_render
+
+Compares the cached renderer against the original full rebuild with repeated string
+concatenation, for a cold render, a render after one purchase and a render with no changes.
+"""
+import timeit  # noqa: INP001
+
+from inventory_manager import InventoryManager
+
+SIZES = [(10, 10), (100, 100)]
+REPEAT = 5
+NUMBER = 20
+
+
+def concat_render(inv_man: InventoryManager, show_empty_slots: bool = False) -> str:
+    # The renderer before the cache: every slot, every call, out += per line
+    grid = inv_man.grid
+    out = ""
+    for index, slot_name in enumerate(inv_man.slots.names):
+        if grid.is_empty(index):
+            if show_empty_slots:
+                out += f"{slot_name}: <EMPTY>\n"
+        elif grid.get_stock(index) != 0 or show_empty_slots:
+            out = (
+                out + f"{slot_name}: "
+                f"{grid.get_name(index)}, "
+                f"Price: {grid.get_cost(index)}, "
+                f"Left in Stock: {grid.get_stock(index)}\n"
+            )
+    return out.strip()
+
+
+def best_of(statement) -> float:  # noqa: ANN001
+    return min(timeit.repeat(statement, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def bench_size(rows: int, columns: int) -> dict:
+    inv_man = InventoryManager(rows, columns, "BENCH")
+    names = inv_man.slots.names
+    for i, name in enumerate(names):
+        inv_man.add_item(name, f"Item {i % 50}", 5 + i % 3, 1.25)
+    assert concat_render(inv_man) == inv_man.get_stock_information()
+
+    def cold() -> None:
+        inv_man.grid.dirty.update(range(inv_man.grid.size))
+        inv_man.get_stock_information()
+
+    def after_purchase() -> None:
+        inv_man.change_stock(names[0], 1)
+        inv_man.get_stock_information()
+
+    return {
+        "slots": len(names),
+        "concat": best_of(lambda: concat_render(inv_man)),
+        "cold": best_of(cold),
+        "after purchase": best_of(after_purchase),
+        "unchanged": best_of(inv_man.get_stock_information),
+    }
+
+
+def main() -> None:
+    columns = ["concat", "cold", "after purchase", "unchanged"]
+    print(f"{'slots':>7} " + " ".join(f"{name + ' us':>18}" for name in columns))
+    for rows, cols in SIZES:
+        result = bench_size(rows, cols)
+        print(f"{result['slots']:>7} " + " ".join(f"{result[n] * 1e6:>18.1f}" for n in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""Load test VendingMachineRunner: many simulated machines, each used by a scripted customer.
+
+Run from src/client: python -m benchmarks.bench_runner_load --runners 20 --sessions 6
+
+Every runner gets its own simulated keypad, LCD and motors (on a virtual GPIO chip of its
+own) and its own machine on a local stand in for the API (local_backend.LocalBackend), all in
+one process and on one event loop like the runner on the pi. Each machine's customer goes
+through sessions one after another, picking one at random:
+
+- browse: type a paid slot and press the dispense key, the price is shown
+- free: type a free slot and press the dispense key, the item is dispensed
+- transaction: enter card info, buy two or three items, end the transaction
+
+Latencies are timed on the simulated hardware, where the customer would see them. Keypress
+to display is from a key press to the typed text showing on the LCD, selection to dispense
+start from the dispense key to the first step of the slot's motor, end transaction from the
+end transaction key to the charged amount showing on the LCD. Motors turn SCALE of a real
+dispense so dispensing doesn't dominate the run.
+"""
+import argparse  # noqa: INP001
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from api_constants import POOL_MAXSIZE
+from async_http_transport import configure_async_transport
+from customer.Hardware import backend
+from customer.Hardware.hardware_constants import (
+    CARD_INFO_KEY,
+    DISPENSE_KEY,
+    END_TRANSACTION_KEY,
+    I2C_ADDR,
+    KEYPAD_COL_PINS,
+    KEYPAD_DEBOUNCE,
+    KEYPAD_LAYOUT,
+    KEYPAD_ROW_PINS,
+    LCD_BACKLIGHT,
+    LCD_CHR,
+    LCD_CMD,
+    LCD_E_DELAY,
+    LCD_E_PULSE,
+    LCD_ENABLE,
+    LCD_LINE_1,
+    LCD_LINE_2,
+    LCD_WIDTH,
+    STEP_DELAY,
+    STEP_SEQUENCE,
+    STEPPER_PINS,
+    STEPPER_PROFILES,
+    STEPS_PER_QUARTER_REV,
+)
+from customer.Hardware.motion_profile import MotionProfile
+from customer.Hardware.simulated.keypad_matrix import TAP_HOLD, KeypadMatrix
+from customer.Hardware.stepper_motors import StepperMotor
+from customer.hardware_manager import DispenserManager, DisplayManager, InputManager
+from local_backend import LocalBackend
+from vm_runner import VendingMachineRunner
+
+SCALE = 1 / 16
+API_LATENCY = 0.02
+THINK_TIME = 1.0
+TIMEOUT = 30
+
+ROWS = len(STEPPER_PINS)
+COLUMNS = len(STEPPER_PINS[0])
+INVENTORY = {
+    "00": ("Soda", 1.50, 10_000),
+    "01": ("Water", 0.00, 10_000),
+    "02": ("Chips", 1.00, 10_000),
+}
+PAID_SLOTS = ["00", "02"]
+FREE_SLOTS = ["01"]
+
+CHOOSE_PROMPT = f"CHOOSE SLOT OR {CARD_INFO_KEY}"
+ENTER_PROMPT = f"ENTER SLOT OR {END_TRANSACTION_KEY}"
+KEY_GAP = 2 * KEYPAD_DEBOUNCE
+
+KEYPRESS = "keypress to display"
+DISPENSE_START = "selection to dispense"
+END_TRANSACTION = "end transaction"
+METRICS = (KEYPRESS, DISPENSE_START, END_TRANSACTION)
+
+
+class SessionTimeoutError(Exception):
+    """The machine did not show what the customer waited for in time."""
+
+
+class Customer:
+    """Presses keys on one machine's virtual keypad and times what its LCD and motors do.
+
+    Display changes are reported by the simulated LCD from the I2C thread with the time the
+    transfer finished. Waits are registered before the key that causes them is pressed, so
+    a change can't be missed however fast the runner reacts.
+    """
+
+    def __init__(self, runner: VendingMachineRunner, chip: int, motors: dict) -> None:
+        self.runner = runner
+        self.matrix = KeypadMatrix(
+            backend.lgpio.get_chip(chip), KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS)
+        self.recorders = {
+            slot: backend.lgpio.get_chip(chip).recorders[motor.pins[0]]
+            for slot, motor in motors.items()
+        }
+        self.latencies: dict[str, list[float]] = {metric: [] for metric in METRICS}
+        self.sessions: dict[str, int] = {}
+        self.error: str | None = None
+
+        self.__loop = asyncio.get_running_loop()
+        self.__expected: list[tuple[int, str, asyncio.Future]] = []
+        runner.display.lcd.bus.device(I2C_ADDR).add_listener(self.__on_display)
+
+    def expect(self, line: int, text: str) -> asyncio.Future:
+        """Future of the time the LCD next changes to show text at the start of line."""
+        future = self.__loop.create_future()
+        self.__expected.append((line, text, future))
+        return future
+
+    async def shown(self, future: asyncio.Future) -> float:
+        try:
+            return await asyncio.wait_for(future, TIMEOUT)
+        except TimeoutError:
+            raise SessionTimeoutError("Display did not change as expected") from None
+
+    async def tap(self, key: str) -> float:
+        """Press and release a key, returns the time it was pressed."""
+        pressed = time.perf_counter()
+        self.matrix.press(key)
+        await asyncio.sleep(TAP_HOLD)
+        self.matrix.release(key)
+        await asyncio.sleep(KEY_GAP)
+        return pressed
+
+    async def type_slot(self, slot: str) -> None:
+        for count in range(1, len(slot) + 1):
+            echoed = self.expect(1, slot[:count])
+            pressed = await self.tap(slot[count - 1])
+            self.latencies[KEYPRESS].append(await self.shown(echoed) - pressed)
+
+    async def select(self, slot: str) -> None:
+        """Type a slot that dispenses and press the dispense key, returns once it is queued."""
+        await self.type_slot(slot)
+        queued = self.expect(0, "QUEUED")
+        recorder = self.recorders[slot]
+        seen = len(recorder.writes)
+        pressed = await self.tap(DISPENSE_KEY)
+
+        # Steps are recorded with their time by the stepping thread, polling only finds them
+        deadline = time.perf_counter() + TIMEOUT
+        while (started := self.__first_step(recorder.writes, seen)) is None:
+            if time.perf_counter() > deadline:
+                raise SessionTimeoutError(f"Motor of slot {slot} did not start")
+            await asyncio.sleep(0.005)
+        self.latencies[DISPENSE_START].append(started - pressed)
+        await self.shown(queued)
+
+    @staticmethod
+    def __first_step(writes: list[tuple[float, int]], seen: int) -> float | None:
+        # A motor still turning for an earlier selection first ends that rotation, writing 0
+        running = seen > 0 and writes[seen - 1][1] != 0
+        for stamp, bits in writes[seen:]:
+            if not bits:
+                running = False
+            elif not running:
+                return stamp
+        return None
+
+    def __on_display(self, lines: list[str]) -> None:
+        # Called on the LCD's I2C thread
+        stamp = time.perf_counter()
+        self.__loop.call_soon_threadsafe(self.__displayed, lines, stamp)
+
+    def __displayed(self, lines: list[str], stamp: float) -> None:
+        for expected in list(self.__expected):
+            line, text, future = expected
+            if future.done():
+                self.__expected.remove(expected)
+            elif lines[line].startswith(text):
+                future.set_result(stamp)
+                self.__expected.remove(expected)
+
+
+async def browse(customer: Customer, rng: random.Random) -> None:
+    await customer.type_slot(rng.choice(PAID_SLOTS))
+    price = customer.expect(0, "$")
+    await customer.tap(DISPENSE_KEY)
+    await customer.shown(price)
+    await customer.shown(customer.expect(0, CHOOSE_PROMPT))
+
+
+async def free_item(customer: Customer, rng: random.Random) -> None:
+    await customer.select(rng.choice(FREE_SLOTS))
+    await customer.shown(customer.expect(0, CHOOSE_PROMPT))
+
+
+async def transaction(customer: Customer, rng: random.Random) -> None:
+    entered = customer.expect(0, ENTER_PROMPT)
+    await customer.tap(CARD_INFO_KEY)
+    await customer.shown(entered)
+
+    for _ in range(rng.randint(2, 3)):
+        await customer.select(rng.choice(PAID_SLOTS))
+        await customer.shown(customer.expect(0, ENTER_PROMPT))
+
+    charged = customer.expect(0, "CHARGED $")
+    pressed = await customer.tap(END_TRANSACTION_KEY)
+    customer.latencies[END_TRANSACTION].append(await customer.shown(charged) - pressed)
+    await customer.shown(customer.expect(0, CHOOSE_PROMPT))
+
+
+SESSIONS = {"browse": browse, "free": free_item, "transaction": transaction}
+
+
+def build_runner(index: int, config_dir: str, scale: float) -> tuple[VendingMachineRunner, dict]:
+    hardware_id = f"LOADTEST{index:03d}"
+    config_file = os.path.join(config_dir, hardware_id + ".json")  # noqa: PTH118
+    with open(config_file, "w") as file:  # noqa: PTH123
+        json.dump({
+            "hardware_id": hardware_id,
+            "rows": ROWS,
+            "columns": COLUMNS,
+            "journal_path": os.path.join(config_dir, hardware_id + ".log"),  # noqa: PTH118
+            "notifications": False,
+        }, file)
+
+    # Every machine is wired to a virtual GPIO chip of its own
+    input_mgr = InputManager(KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS, chip=index)
+    display_mgr = DisplayManager(
+        {
+            "i2c_addr": I2C_ADDR,
+            "width": LCD_WIDTH,
+            "line_1": LCD_LINE_1,
+            "line_2": LCD_LINE_2,
+            "lcd_chr": LCD_CHR,
+            "lcd_cmd": LCD_CMD,
+            "backlight": LCD_BACKLIGHT,
+            "enable_flag": LCD_ENABLE,
+            "e_pulse": LCD_E_PULSE,
+            "e_delay": LCD_E_DELAY,
+        },
+    )
+    motors = [
+        [
+            StepperMotor(
+                int(STEPS_PER_QUARTER_REV * scale), STEP_DELAY, STEP_SEQUENCE, pins,
+                MotionProfile.from_config(profile), chip=index,
+            )
+            for pins, profile in zip(row, profile_row, strict=True)
+        ]
+        for row, profile_row in zip(STEPPER_PINS, STEPPER_PROFILES, strict=True)
+    ]
+    runner = VendingMachineRunner(
+        input_mgr, display_mgr, DispenserManager(motors), config_file)
+    slots = {f"{row}{col}": motors[row][col] for row in range(ROWS) for col in range(COLUMNS)}
+    return runner, slots
+
+
+async def shop(customer: Customer, sessions: int, think: float, rng: random.Random) -> None:
+    try:
+        await customer.shown(customer.expect(0, CHOOSE_PROMPT))
+        for _ in range(sessions):
+            await asyncio.sleep(rng.uniform(0, think))
+            name = rng.choice(list(SESSIONS))
+            await SESSIONS[name](customer, rng)
+            customer.sessions[name] = customer.sessions.get(name, 0) + 1
+    except SessionTimeoutError as e:
+        # The machine is in an unknown state, its remaining sessions are not run
+        customer.error = f"{customer.runner.config['hardware_id']}: {e}"
+
+
+def percentiles(samples: list[float]) -> tuple[float, float, float]:
+    if len(samples) < 2:  # noqa: PLR2004
+        return (samples[0],) * 3 if samples else (0.0, 0.0, 0.0)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = LocalBackend(latency=args.latency)
+    for index in range(args.runners):
+        api.add_machine(f"LOADTEST{index:03d}", ROWS, COLUMNS, INVENTORY)
+    api.start()
+    # Every machine has a connection pool of its own on the pi
+    await configure_async_transport(pool_maxsize=POOL_MAXSIZE * args.runners)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        built = [build_runner(index, config_dir, args.scale) for index in range(args.runners)]
+        customers = [
+            Customer(runner, index, slots) for index, (runner, slots) in enumerate(built)]
+
+        output = None if args.verbose else open(os.devnull, "w")  # noqa: PTH123, SIM115
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            runners = [asyncio.create_task(runner.run()) for runner, _ in built]
+            await asyncio.gather(*(
+                shop(customer, args.sessions, args.think, random.Random(args.seed + index))
+                for index, customer in enumerate(customers)
+            ))
+            elapsed = time.perf_counter() - start
+
+            for task in runners:
+                task.cancel()
+            await asyncio.gather(*runners, return_exceptions=True)
+            for runner, _ in built:
+                if runner.vending_machine is not None:
+                    runner.vending_machine.inv_man.journal_replayer.stop()
+        if output:
+            output.close()
+    api.stop()
+
+    report(args, customers, api, elapsed)
+
+
+def report(
+    args: argparse.Namespace, customers: list[Customer], api: LocalBackend, elapsed: float,
+) -> None:
+    sessions = {
+        name: sum(customer.sessions.get(name, 0) for customer in customers) for name in SESSIONS}
+    errors = [customer.error for customer in customers if customer.error is not None]
+    print(
+        f"{args.runners} runners, {sum(sessions.values())} sessions ("
+        + ", ".join(f"{count} {name}" for name, count in sessions.items())
+        + f") in {elapsed:.1f}s, {len(errors)} runners stopped early",
+    )
+    for error in errors:
+        print(f"  {error}")
+    print(f"{'':>22} {'samples':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for metric in METRICS:
+        samples = [latency for customer in customers for latency in customer.latencies[metric]]
+        p50, p95, p99 = percentiles(samples)
+        print(
+            f"{metric:>22} {len(samples):>8} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+            f"{p99 * 1000:>8.1f}",
+        )
+
+    stats = api.get_stats()
+    print(
+        f"API stand in: {stats['requests']} requests at {args.latency * 1000:.0f}ms, "
+        f"{stats['conflicts']} version conflicts, {stats['charges']} charges",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test VendingMachineRunner headless.")
+    parser.add_argument("--runners", type=int, default=10, help="machines run at once")
+    parser.add_argument("--sessions", type=int, default=6, help="customer sessions per machine")
+    parser.add_argument(
+        "--latency", type=float, default=API_LATENCY, help="seconds every API request takes")
+    parser.add_argument(
+        "--think", type=float, default=THINK_TIME, help="most seconds between sessions")
+    parser.add_argument(
+        "--scale", type=float, default=SCALE, help="share of a real dispense motors turn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the runners' output")
+    args = parser.parse_args()
+
+    # Before any hardware is created
+    backend.select(backend.SIMULATED)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
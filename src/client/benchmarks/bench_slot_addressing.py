@@ -0,0 +1,65 @@
+"""Benchmark slot name lookups and whole-inventory operations as machines grow.
+
+Run from src/client: python -m benchmarks.bench_slot_addressing
+
+For every size the per-slot cost should stay flat, which means lookups are O(1) and full
+inventory operations are linear in the number of slots.
+"""
+import timeit  # noqa: INP001
+
+from enum_types import SlotNamingScheme
+from inventory_manager import InventoryManager
+
+# (rows, columns) from the current 10x10 limit up to the largest supported machine
+SIZES = [(10, 10), (40, 12), (50, 40), (100, 100)]
+REPEAT = 5
+
+
+def best_of(statement, number: int) -> float:  # noqa: ANN001
+    # Seconds per call, best of REPEAT runs to filter out scheduler noise
+    return min(timeit.repeat(statement, number=number, repeat=REPEAT)) / number
+
+
+def bench_size(rows: int, columns: int) -> dict:
+    scheme = SlotNamingScheme.DIGITS if rows <= 10 and columns <= 10 else None
+    inv_man = InventoryManager(rows, columns, "BENCH", slot_naming=scheme)
+    names = inv_man.slots.names
+    inventory = [
+        {"slot_name": name, "item_name": f"Item {i % 50}", "price": "1.25", "stock": 5}
+        for i, name in enumerate(names)
+    ]
+    inv_man._apply_inventory(inventory)  # noqa: SLF001
+
+    def lookup_all() -> None:
+        for name in names:
+            inv_man.get_coordinates_from_slotname(name)
+
+    def change_all() -> None:
+        for name in names:
+            inv_man.change_stock(name, 1)
+
+    slots = len(names)
+    return {
+        "slots": slots,
+        "lookup": best_of(lookup_all, 20) / slots,
+        "change_stock": best_of(change_all, 5) / slots,
+        "load": best_of(lambda: inv_man._apply_inventory(inventory), 5) / slots,  # noqa: SLF001
+        "render": best_of(inv_man.get_stock_information, 5) / slots,
+        "build": best_of(
+            lambda: InventoryManager(rows, columns, "BENCH", slot_naming=scheme), 5) / slots,
+    }
+
+
+def main() -> None:
+    columns = ["lookup", "change_stock", "load", "render", "build"]
+    print(f"{'slots':>7} " + " ".join(f"{name + ' ns/slot':>20}" for name in columns))
+    for rows, cols in SIZES:
+        result = bench_size(rows, cols)
+        print(
+            f"{result['slots']:>7} "
+            + " ".join(f"{result[name] * 1e9:>20.1f}" for name in columns),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import exceptions as err
+from api_constants import (
+    BREAKER_BASE_DELAY,
+    BREAKER_FAIL_FAST,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_JITTER,
+    BREAKER_MAX_DELAY,
+    BREAKER_TRIAL_WAIT,
+)
+from enum_types import CircuitState
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state machine shared by every caller of the API.
+
+    CLOSED lets every request through. After failure_threshold consecutive failures the breaker
+    OPENs and refuses requests until a jittered, exponentially growing backoff delay has passed.
+    It then goes HALF_OPEN and lets a single trial request through: success closes the breaker,
+    failure opens it again with a longer delay. Callers refused while the trial is in flight wait
+    for its outcome instead of retrying at once. All methods are thread safe, so the breaker can
+    be shared between the MQTT thread, the health prober, blocking callers and the event loop.
+
+    Attributes
+    ----------
+    failure_threshold: int
+        Consecutive failures before the breaker opens
+    base_delay: float
+        Backoff delay (seconds) after the breaker opens for the first time
+    max_delay: float
+        Upper bound (seconds) for the backoff delay
+    jitter: float
+        Fraction (0 - 1) of each backoff delay that is randomized
+    fail_fast: bool
+        Whether guarded calls should raise BackendUnavailableError instead of waiting while open
+    trial_wait: float
+        Longest wait (seconds) for a half open trial to resolve before checking again
+
+    Methods
+    -------
+    def get_state(self) -> CircuitState
+        Returns the current state, moving OPEN to HALF_OPEN once the backoff has passed
+    def allow_request(self) -> bool
+        Returns whether a request may be sent now
+    def before_call(self) -> None
+        Raises BackendUnavailableError if a request may not be sent now
+    def record_success(self) -> None
+        Report a successful request, closes the breaker
+    def record_failure(self) -> None
+        Report a failed request, may open the breaker
+    def time_until_retry(self) -> float
+        Seconds until the breaker may let a request through
+    def failure_delay(self) -> float
+        Seconds a caller should wait before retrying after a failed request
+    def wait_until_available(self) -> None
+        Block until a trial request may be sent or the trial in flight has resolved
+    async def async_wait_until_available(self) -> None
+        Await until a trial request may be sent without blocking the event loop
+    def get_stats(self) -> dict
+        Returns state, failure and rejection counters
+
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_delay: float = BREAKER_BASE_DELAY,
+        max_delay: float = BREAKER_MAX_DELAY,
+        jitter: float = BREAKER_JITTER,
+        fail_fast: bool = BREAKER_FAIL_FAST,
+        trial_wait: float = BREAKER_TRIAL_WAIT,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.fail_fast = fail_fast
+        self.trial_wait = trial_wait
+        self.__clock = clock
+        self.__rng = rng
+
+        self.__lock = threading.Lock()
+        # Notified whenever a request resolves, wakes callers waiting on a half open trial
+        self.__resolved = threading.Condition(self.__lock)
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__open_count = 0
+        self.__retry_at = 0.0
+        self.__trial_in_flight = False
+
+        self.__times_opened = 0
+        self.__rejected = 0
+
+
+    def get_state(self) -> CircuitState:
+        with self.__lock:
+            self.__refresh()
+            return self.__state
+
+
+    def allow_request(self) -> bool:
+        with self.__lock:
+            self.__refresh()
+            if self.__state is CircuitState.CLOSED:
+                return True
+            if self.__state is CircuitState.HALF_OPEN and not self.__trial_in_flight:
+                # Only one trial request at a time while half open
+                self.__trial_in_flight = True
+                return True
+            self.__rejected += 1
+            return False
+
+
+    def before_call(self) -> None:
+        if not self.allow_request():
+            raise err.BackendUnavailableError(
+                "API is unavailable, request refused by circuit breaker",
+                retry_in=self.time_until_retry(),
+            )
+
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__state = CircuitState.CLOSED
+            self.__failures = 0
+            self.__open_count = 0
+            self.__trial_in_flight = False
+            self.__resolved.notify_all()
+
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__refresh()
+            self.__failures += 1
+            self.__trial_in_flight = False
+
+            if (
+                self.__state is CircuitState.HALF_OPEN
+                or (self.__state is CircuitState.CLOSED
+                    and self.__failures >= self.failure_threshold)
+            ):
+                self.__open_count += 1
+                self.__times_opened += 1
+                self.__state = CircuitState.OPEN
+                self.__retry_at = self.__clock() + self.backoff_delay(self.__open_count)
+            self.__resolved.notify_all()
+
+
+    def backoff_delay(self, attempt: int) -> float:
+        # Exponential growth capped at max_delay, with part of the delay randomized so that
+        # several waiting callers (or machines) do not all retry at the same moment
+        delay = min(self.max_delay, self.base_delay * (2 ** max(attempt - 1, 0)))
+        return delay * (1 - self.jitter + self.jitter * self.__rng())
+
+
+    def time_until_retry(self) -> float:
+        with self.__lock:
+            return self.__time_until_retry()
+
+
+    def failure_delay(self) -> float:
+        # While still closed, space out retries with the same backoff the open state uses
+        with self.__lock:
+            if self.__state is CircuitState.OPEN:
+                return max(self.__retry_at - self.__clock(), 0.0)
+            failures = self.__failures
+        return self.backoff_delay(failures) if failures else 0.0
+
+
+    def wait_until_available(self) -> None:
+        # Woken early when the request in flight resolves, the caller then checks again
+        with self.__lock:
+            delay = self.__time_until_retry()
+            if delay > 0:
+                self.__resolved.wait(delay)
+
+
+    async def async_wait_until_available(self) -> None:
+        await asyncio.sleep(self.time_until_retry())
+
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            self.__refresh()
+            return {
+                "state": self.__state.name,
+                "consecutive_failures": self.__failures,
+                "times_opened": self.__times_opened,
+                "rejected": self.__rejected,
+            }
+
+
+    def __refresh(self) -> None:
+        # Caller holds the lock
+        if self.__state is CircuitState.OPEN and self.__clock() >= self.__retry_at:
+            self.__state = CircuitState.HALF_OPEN
+            self.__trial_in_flight = False
+
+    def __time_until_retry(self) -> float:
+        # Caller holds the lock. While the half open trial is in flight its outcome is unknown,
+        # so callers wait trial_wait seconds instead of retrying immediately
+        self.__refresh()
+        if self.__state is CircuitState.OPEN:
+            return max(self.__retry_at - self.__clock(), 0.0)
+        if self.__state is CircuitState.HALF_OPEN and self.__trial_in_flight:
+            return self.trial_wait
+        return 0.0
+
+
+_breaker: CircuitBreaker | None = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    """Return the process wide circuit breaker guarding the API."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker()
+        return _breaker
+
+
+def configure_breaker(**settings) -> CircuitBreaker:  # noqa: ANN003
+    """Replace the process wide circuit breaker with one built from settings."""
+    global _breaker
+    with _breaker_lock:
+        _breaker = CircuitBreaker(**settings)
+        return _breaker
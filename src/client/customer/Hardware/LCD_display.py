@@ -1,10 +1,38 @@
 import asyncio
+import time
+from collections.abc import Awaitable
+from concurrent.futures import ThreadPoolExecutor
 
-from smbus2 import SMBus
+from customer.Hardware import backend
+
+DDRAM_LINE_LENGTH = 40
+"""Characters of display RAM per line of a HD44780, the display shows a window of them."""
+
+RETURN_HOME_DELAY = 0.002
+"""Seconds the return home command (undoes display shifts) takes, 1.52ms on a HD44780."""
+
+HARDWARE_SCROLL = "hardware"
+DELTA_SCROLL = "delta"
 
 
 class LCDDisplay:
-    """LCD display class to encapsulate control of displaying characters to a LCD display with an I2C module."""
+    """LCD display class to encapsulate control of displaying characters to a LCD display with an I2C module.
+
+    A shadow framebuffer holds what every line currently shows. Writes only send the characters
+    that differ from it, each run of them preceded by a cursor positioning command, so
+    repainting an unchanged line sends nothing over the bus.
+
+    The nibbles and enable pulses of all those characters are encoded into one buffer and sent
+    as a single I2C transfer by a worker thread. The I2C expander latches every byte onto its
+    pins as it arrives, at 100-400kHz a byte takes 22-90us, longer than the enable pulse
+    (0.5us) and character write (37us) timings of the LCD, so the buffer needs no sleeps
+    in between. Init commands, which need longer delays, keep the paced per byte path.
+
+    Messages longer than the width scroll. A message that fits the line's display RAM is loaded
+    into it once and scrolled by display shift commands, one command per frame. The shift moves
+    both lines, so this only runs while the other line is blank; otherwise, or as soon as the
+    other line is written, frames are drawn as framebuffer deltas.
+    """
 
     def __init__(  # noqa: PLR0913
         self,
@@ -47,11 +75,32 @@ class LCDDisplay:
         self.E_PULSE = e_pulse
         self.E_DELAY = e_delay
 
-        # Track scrolling routines per line
+        # Track scrolling routines per line, the message each one scrolls and the event that
+        # stops it after the frame it is drawing
         self._scrolling_tasks = {}
+        self._scrolling_messages = {}
+        self._scroll_stops = {}
+        # Line scrolled by display shifts and lines with text beyond the window in display RAM
+        self._shifted_line: int | None = None
+        self._ddram_tails: set[int] = set()
+        # Bytes sent and seconds spent scrolling per mode
+        self._scroll_bytes = dict.fromkeys((HARDWARE_SCROLL, DELTA_SCROLL), 0)
+        self._scroll_time = dict.fromkeys((HARDWARE_SCROLL, DELTA_SCROLL), 0.0)
+
+        # What every line shows, None until init clears the display
+        self._framebuffer: dict[int, list[str]] | None = None
+        # Writes of different lines must not interleave, the cursor is shared
+        self._write_lock = asyncio.Lock()
+        self._lcd_bytes = 0
+        self._skipped_chars = 0
+        self._i2c_bytes = 0
+        self._transfers = 0
+
+        # Bus transfers run one after another on this thread, off the event loop
+        self._bus_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lcd")
 
         # I2C bus setup
-        self.bus = SMBus(1)
+        self.bus = backend.smbus2.SMBus(1)
 
     async def init(self):
         await self._lcd_byte(0x33, self.LCD_CMD)  # Init
@@ -65,81 +114,199 @@ class LCDDisplay:
         # Clear display
         await self._lcd_byte(0x01, self.LCD_CMD)
         await asyncio.sleep(self.E_DELAY)
+        self._framebuffer = {
+            line: [" "] * self.LCD_WIDTH for line in (self.LCD_LINE_1, self.LCD_LINE_2)
+        }
 
     async def write(self, message: str, line: int, scroll_delay: float = 0.3) -> None:
         """Write a message to the LCD. If it's too long, scroll it indefinitely until cleared."""
-        # First, ensure any existing scrolling task for this line is properly canceled
-        if line in self._scrolling_tasks:
-            self._scrolling_tasks[line].cancel()
-            try:  # noqa: SIM105
-                await self._scrolling_tasks[line]
-            except asyncio.CancelledError:
-                pass
-            del self._scrolling_tasks[line]
-
-            # Clean the line before writing new content
-            await self._lcd_byte(line, self.LCD_CMD)
-            for _ in range(self.LCD_WIDTH):
-                await self._lcd_byte(ord(" "), self.LCD_CHR)
+        if len(message) > self.LCD_WIDTH and self._scrolling_messages.get(line) == message:
+            # Already scrolling this message
+            return
 
-            # Small delay to ensure I2C bus stability
-            await asyncio.sleep(0.01)
+        await self._cancel_scroll(line)
 
-        await self.clear_line(line=line)
-
-        # Now write the new message
         if len(message) <= self.LCD_WIDTH:
-            await self._lcd_byte(line, self.LCD_CMD)
-            message = message.ljust(self.LCD_WIDTH, " ")
-            for char in message:
-                await self._lcd_byte(ord(char), self.LCD_CHR)
+            await self._write_diff(line, message)
         else:
             # Launch a new task to scroll indefinitely
-            await self._lcd_byte(line, self.LCD_CMD)  # Reset cursor position
-            task = asyncio.create_task(self._scroll_loop(message, line, scroll_delay))
+            stop = asyncio.Event()
+            task = asyncio.create_task(self._scroll_loop(message, line, scroll_delay, stop))
             self._scrolling_tasks[line] = task
+            self._scrolling_messages[line] = message
+            self._scroll_stops[line] = stop
 
-    async def _scroll_loop(self, message: str, line: int, scroll_delay: float) -> None:
+    async def _scroll_loop(
+        self, message: str, line: int, scroll_delay: float, stop: asyncio.Event,
+    ) -> None:
         scroll_text = message + " " * self.LCD_WIDTH
-        try:
-            while True:
-                for i in range(len(scroll_text) - self.LCD_WIDTH + 1):
-                    window = scroll_text[i : i + self.LCD_WIDTH]
-                    await self._lcd_byte(line, self.LCD_CMD)
-                    for char in window:
-                        await self._lcd_byte(ord(char), self.LCD_CHR)
-                    await asyncio.sleep(scroll_delay)
-        except asyncio.CancelledError:
-            # Clear the line when canceled to avoid partial text
-            try:
-                await self._lcd_byte(line, self.LCD_CMD)
-                for _ in range(self.LCD_WIDTH):
-                    await self._lcd_byte(ord(" "), self.LCD_CHR)
-            except Exception:
-                # Ignore any errors during cleanup
-                pass
-            raise  # Re-raise to properly handle task cancellation
+        while True:
+            if self._can_shift(line, message):
+                await self._scroll_frame(HARDWARE_SCROLL, self._load_ddram(line, message))
+                while self._shifted_line == line:
+                    if await self._scroll_pause(stop, scroll_delay, HARDWARE_SCROLL):
+                        return
+                    await self._scroll_frame(HARDWARE_SCROLL, self._shift_left(line))
+                # The other line was written, continue with deltas
+
+            for i in range(len(scroll_text) - self.LCD_WIDTH + 1):
+                window = scroll_text[i : i + self.LCD_WIDTH]
+                await self._scroll_frame(DELTA_SCROLL, self._write_diff(line, window))
+                if await self._scroll_pause(stop, scroll_delay, DELTA_SCROLL):
+                    return
 
     async def clear_line(self, line: int) -> None:
         """Clear a specific line and cancel any scrolling task on it."""
-        if line in self._scrolling_tasks:
-            self._scrolling_tasks[line].cancel()
-            try:  # noqa: SIM105
-                await self._scrolling_tasks[line]
-            except asyncio.CancelledError:
-                pass
-            del self._scrolling_tasks[line]
-
-        await self._lcd_byte(line, self.LCD_CMD)
-        for _ in range(self.LCD_WIDTH):
-            await self._lcd_byte(ord(" "), self.LCD_CHR)
-            await asyncio.sleep(0.005)  # delay for I2C stability
+        await self._cancel_scroll(line)
+        await self._write_diff(line, "")
 
     async def clear_all(self):
         await self.clear_line(self.LCD_LINE_1)
         await self.clear_line(self.LCD_LINE_2)
 
+    def get_stats(self) -> dict:
+        """Returns bytes sent to the LCD, I2C bytes and transfers they took, and characters
+        skipped because they were unchanged.
+        """  # noqa: D205
+        return {
+            "lcd_bytes": self._lcd_bytes,
+            "i2c_bytes": self._i2c_bytes,
+            "transfers": self._transfers,
+            "skipped_chars": self._skipped_chars,
+            "scroll_bytes_per_second": {
+                mode: self._scroll_bytes[mode] / elapsed if elapsed else 0.0
+                for mode, elapsed in self._scroll_time.items()
+            },
+        }
+
+    async def _cancel_scroll(self, line: int) -> None:
+        # Stopped between frames rather than cancelled, cancelling mid byte would leave the
+        # LCD waiting for the second nibble
+        if line in self._scrolling_tasks:
+            self._scroll_stops.pop(line).set()
+            await self._scrolling_tasks.pop(line)
+            del self._scrolling_messages[line]
+            if self._shifted_line == line:
+                async with self._write_lock:
+                    await self._unshift()
+
+    def _can_shift(self, line: int, message: str) -> bool:
+        # Shifting moves both lines, the other one has to be blank and not scrolling itself
+        return (
+            self._framebuffer is not None
+            and len(message) < DDRAM_LINE_LENGTH
+            and all(scrolling == line for scrolling in self._scrolling_tasks)
+            and all(
+                char == " "
+                for other, shown in self._framebuffer.items() if other != line
+                for char in shown
+            )
+        )
+
+    async def _load_ddram(self, line: int, message: str) -> None:
+        # Write the whole message into the line's display RAM, blank what the other line has
+        # beyond the window, it would scroll into view
+        text = message.ljust(DDRAM_LINE_LENGTH)
+        async with self._write_lock:
+            buffer = self._encode(line, self.LCD_CMD)
+            for char in text:
+                buffer += self._encode(ord(char), self.LCD_CHR)
+            for other in self._ddram_tails - {line}:
+                buffer += self._encode(other + self.LCD_WIDTH, self.LCD_CMD)
+                for _ in range(DDRAM_LINE_LENGTH - self.LCD_WIDTH):
+                    buffer += self._encode(ord(" "), self.LCD_CHR)
+            await self._send(buffer)
+
+            self._framebuffer[line] = list(text[: self.LCD_WIDTH])
+            self._ddram_tails = {line}
+            self._shifted_line = line
+
+    async def _shift_left(self, line: int) -> None:
+        async with self._write_lock:
+            if self._shifted_line == line:
+                await self._send(self._encode(0x18, self.LCD_CMD))
+
+    async def _unshift(self) -> None:
+        # Return home undoes the shifts, the window shows the first columns of display RAM
+        # again, which the framebuffer has held all along
+        await self._send(self._encode(0x02, self.LCD_CMD))
+        await asyncio.sleep(RETURN_HOME_DELAY)
+        self._shifted_line = None
+
+    async def _scroll_frame(self, mode: str, frame: Awaitable[None]) -> None:
+        sent = self._i2c_bytes
+        start = time.perf_counter()
+        await frame
+        self._scroll_bytes[mode] += self._i2c_bytes - sent
+        self._scroll_time[mode] += time.perf_counter() - start
+
+    async def _scroll_pause(self, stop: asyncio.Event, scroll_delay: float, mode: str) -> bool:
+        # Wait out a frame, returns whether scrolling was stopped meanwhile
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(stop.wait(), scroll_delay)
+        except TimeoutError:
+            return False
+        finally:
+            self._scroll_time[mode] += time.perf_counter() - start
+        return True
+
+    async def _write_diff(self, line: int, text: str) -> None:
+        # Send only the characters of the line that differ from the framebuffer. Moving the
+        # cursor costs a byte like a character does, so a single unchanged character between
+        # two changes is rewritten rather than skipped.
+        text = text.ljust(self.LCD_WIDTH, " ")[: self.LCD_WIDTH]
+        if self._framebuffer is None:
+            # Contents unknown, write every character
+            self._framebuffer = {}
+        shown = self._framebuffer.setdefault(line, [""] * self.LCD_WIDTH)
+
+        async with self._write_lock:
+            buffer = []
+            changed = {}
+            cursor = None
+            for col, char in enumerate(text):
+                if shown[col] == char and (
+                    col + 1 == self.LCD_WIDTH or cursor != col or shown[col + 1] == text[col + 1]
+                ):
+                    self._skipped_chars += 1
+                    continue
+                if cursor != col:
+                    buffer += self._encode(line + col, self.LCD_CMD)
+                buffer += self._encode(ord(char), self.LCD_CHR)
+                changed[col] = char
+                cursor = col + 1
+
+            if buffer:
+                if self._shifted_line is not None:
+                    # The window is shifted, columns would land in the wrong place
+                    await self._unshift()
+                await self._send(buffer)
+                for col, char in changed.items():
+                    shown[col] = char
+
+    def _encode(self, bits: int, mode: int) -> list[int]:
+        # Expander bytes of one LCD byte: every nibble is put on the pins, then latched by
+        # raising and lowering enable
+        self._lcd_bytes += 1
+        encoded = []
+        for nibble in (bits & 0xF0, (bits << 4) & 0xF0):
+            data = mode | nibble | self.LCD_BACKLIGHT
+            encoded += (data, data | self.LCD_ENABLE, data)
+        return encoded
+
+    async def _send(self, buffer: list[int]) -> None:
+        self._i2c_bytes += len(buffer)
+        self._transfers += 1
+        message = backend.smbus2.i2c_msg.write(self.I2C_ADDR, buffer)
+        await asyncio.get_running_loop().run_in_executor(
+            self._bus_worker, self.bus.i2c_rdwr, message)
+
     async def _lcd_byte(self, bits: int, mode: int) -> None:
+        self._lcd_bytes += 1
+        self._i2c_bytes += 6
+        self._transfers += 6
+
         bits_high = mode | (bits & 0xF0) | self.LCD_BACKLIGHT
         bits_low = mode | ((bits << 4) & 0xF0) | self.LCD_BACKLIGHT
 
@@ -0,0 +1,54 @@
+"""Hardware libraries the drivers talk to: lgpio, smbus2 and gpiozero.
+
+REAL uses the libraries installed on the pi. SIMULATED uses the stand ins in
+customer/Hardware/simulated (virtual GPIO chips, a scriptable keypad matrix, an HD44780 on a
+simulated I2C bus, recorded stepper timings), so the drivers and the runner can run and be
+benchmarked on any Linux box.
+
+Drivers reference the libraries as attributes of this module (backend.lgpio.gpio_read(...)).
+They are imported on first use, so select has to be called before any hardware is created.
+"""
+import argparse
+import importlib
+from types import ModuleType
+
+REAL = "real"
+SIMULATED = "simulated"
+
+LIBRARIES = ("lgpio", "smbus2", "gpiozero")
+
+_selected = REAL
+
+
+def select(backend: str) -> None:
+    """Use the REAL or SIMULATED hardware libraries from now on."""
+    global _selected  # noqa: PLW0603
+    if backend not in (REAL, SIMULATED):
+        raise ValueError(f"Unknown hardware backend {backend}")
+    _selected = backend
+    for library in LIBRARIES:
+        globals().pop(library, None)
+
+
+def selected() -> str:
+    return _selected
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the --hardware option choosing the backend to a command line parser."""
+    parser.add_argument(
+        "--hardware",
+        choices=[REAL, SIMULATED],
+        default=REAL,
+        help="simulated runs on virtual GPIO, keypad, LCD and motors instead of the pi's",
+    )
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name not in LIBRARIES:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+    module_name = name if _selected == REAL else f"customer.Hardware.simulated.{name}"
+    module = importlib.import_module(module_name)
+    # Cached as a plain attribute, later lookups don't come through here
+    globals()[name] = module
+    return module
@@ -25,6 +25,17 @@ stepper driver, In1, In2, In3, In4 respectivity. The patterns energerizes the st
 individual coils in the correct sequence.
 """
 
+DISPENSE_QUARTER_ROTATIONS = 4
+"""Quarter rotations a motor turns to dispense one item."""
+
+MAX_ENERGIZED_COILS = 4
+"""
+Power budget of the motor scheduler: most coils energized at the same time across all motors.
+A 28BYJ-48 draws roughly 240mA per energized coil and STEP_SEQUENCE energizes up to 2 coils per
+step, so 4 lets two motors run at once from a 1A supply. A budget below one motor's worth still
+runs motors, one at a time.
+"""
+
 """GPIO pins used on the pi to map to the inputs of the stepper motors."""
 STEPPER_PINS = [
     [   # Row 1
@@ -34,6 +45,28 @@ STEPPER_PINS = [
     ],
 ]
 
+MOTION_PROFILE = {
+    "shape": "s_curve",
+    "start_rate": 1 / STEP_DELAY,
+    "max_rate": 900,
+    "acceleration": 1500,
+}
+"""
+Acceleration profile of a dispense (see motion_profile.MotionProfile), rates in steps per
+second. A 28BYJ-48 reliably starts from rest at the STEP_DELAY rate but, once turning, keeps up
+with nearly twice that. "shape" is "trapezoidal" or "s_curve", the S-curve eases into and out of
+the acceleration so the rotor doesn't skip steps when the rate starts and stops changing.
+"""
+
+"""Motion profile of every motor, same layout as STEPPER_PINS. None steps at STEP_DELAY."""
+STEPPER_PROFILES = [
+    [   # Row 1
+        MOTION_PROFILE,     # Motor 1
+        MOTION_PROFILE,     # Motor 2
+        MOTION_PROFILE,     # Motor 3
+    ],
+]
+
 ###################
 ##### Buttons  ####
 ###################
@@ -95,6 +128,24 @@ KEYPAD_ROW_PINS = [5, 6, 13, 19]
 KEYPAD_COL_PINS = [4, 12, 26, 24]
 """Pins associated with the cols of the keypad."""
 
+KEYPAD_SCAN_MODE = "edge"
+"""
+"edge" scans the keypad only when an edge alert on a row pin signals activity, "poll" scans
+every column and row every scan delay.
+"""
+
+KEYPAD_DEBOUNCE = 0.02
+"""Seconds a row pin has to stay at a level before a press or release counts."""
+
+KEYPAD_QUEUE_SIZE = 32
+"""Key presses kept while the runner is busy (typeahead), more are lost."""
+
+KEYPAD_OVERFLOW = "drop_newest"
+"""
+Key lost when KEYPAD_QUEUE_SIZE presses are waiting: "drop_newest" keeps the keys typed first,
+"drop_oldest" the keys typed last.
+"""
+
 
 ###################
 #######  UI  ######
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from collections import deque
+
+DROP_NEWEST = "drop_newest"
+"""A full queue keeps the keys typed first and rejects new ones, like a keyboard buffer."""
+
+DROP_OLDEST = "drop_oldest"
+"""A full queue makes room for a new key by dropping the oldest one."""
+
+
+class KeyEvent:
+    """A key press with the time.monotonic() time it was first seen by the scanner."""
+
+    __slots__ = ("key", "timestamp")
+
+    def __init__(self, key: str, timestamp: float) -> None:
+        self.key = key
+        self.timestamp = timestamp
+
+
+class KeyEventQueue:
+    """Bounded queue handing key events from a scanning thread to the event loop.
+
+    put may be called from any thread, get is awaited on the event loop the queue is bound to.
+    Keys typed while the runner is busy wait here (typeahead) up to maxsize, after that the
+    overflow policy decides which key is lost; lost keys are counted.
+
+    Methods
+    -------
+    def bind(self, loop) -> None
+        Set the event loop get is awaited on, before the first put
+    def put(self, event) -> bool
+        Queue an event from any thread, returns False if this event was dropped
+    async def get(self) -> KeyEvent
+        Wait for the oldest event
+    def get_stats(self) -> dict
+        Returns queued, dropped and peak queue length
+
+    """
+
+    def __init__(self, maxsize: int, overflow: str = DROP_NEWEST) -> None:
+        if overflow not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        if maxsize < 1:
+            raise ValueError("Key event queue needs room for at least one event")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.__events: deque[KeyEvent] = deque()
+        self.__lock = threading.Lock()
+        self.__ready = asyncio.Event()
+        self.__loop: asyncio.AbstractEventLoop | None = None
+
+        self.__queued = 0
+        self.__dropped = 0
+        self.__peak = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.__loop = loop
+
+    def put(self, event: KeyEvent) -> bool:
+        with self.__lock:
+            if len(self.__events) >= self.maxsize:
+                self.__dropped += 1
+                if self.overflow == DROP_NEWEST:
+                    return False
+                self.__events.popleft()
+            self.__events.append(event)
+            self.__queued += 1
+            self.__peak = max(self.__peak, len(self.__events))
+
+        self.__loop.call_soon_threadsafe(self.__ready.set)
+        return True
+
+    async def get(self) -> KeyEvent:
+        while True:
+            with self.__lock:
+                if self.__events:
+                    return self.__events.popleft()
+                # A put after this schedules set, so the wait below can't miss it
+                self.__ready.clear()
+            await self.__ready.wait()
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {
+                "queued": self.__queued,
+                "dropped": self.__dropped,
+                "peak": self.__peak,
+                "pending": len(self.__events),
+            }
@@ -1,76 +1,214 @@
 import asyncio
-from typing import NoReturn
+import threading
+import time
 
-import lgpio
+from customer.Hardware import backend
+from customer.Hardware.key_events import DROP_NEWEST, KeyEvent, KeyEventQueue
+
+POLL_SCAN = "poll"
+"""Scan every column and row every scan delay."""
+
+EDGE_SCAN = "edge"
+"""Hold every column low and scan only when an edge alert on a row pin signals a change."""
 
 
 class AsyncKeypad:
-    """Keypad class for getting user input from matrix keypad."""
+    """Keypad class for getting user input from matrix keypad.
+
+    Scanning never runs on the event loop, so a runner blocked on the network or the LCD
+    doesn't delay or lose keypresses. Presses are put into a bounded KeyEventQueue as
+    KeyEvents stamped with the time.monotonic() time they were first seen, the runner takes
+    them from there when it gets to them.
+
+    In EDGE_SCAN mode the columns idle low, so pressing any key pulls its row low. lgpio
+    debounces the row pins and raises an alert when one settles at a new level, only then are
+    the rows read and the pressed column found by scanning. An alert only says that something
+    changed, the rows are read again to see what, so alerts caused by the scan itself or
+    delivered late are harmless. The rows are read on lgpio's callback thread. Idle, the
+    driver does not wake up at all.
+
+    POLL_SCAN mode scans every column and row every scan_delay seconds on its own thread.
+
+    Press latency is measured from the moment a press could first be seen by the driver: the
+    alert for EDGE_SCAN, the previous scan pass (an upper bound) for POLL_SCAN.
+    """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         keypad: list[list[str]],
         row_pins: list[int],
         col_pins: list[int],
         chip: int = 0,
         scan_delay: float = 0.05,
+        *,
+        mode: str = EDGE_SCAN,
+        debounce: float = 0.02,
+        queue_size: int = 32,
+        overflow: str = DROP_NEWEST,
     ) -> None:
+        if mode not in (POLL_SCAN, EDGE_SCAN):
+            raise ValueError(f"Unknown keypad scan mode {mode}")
+
         self.keypad = keypad
         self.row_pins = row_pins
         self.col_pins = col_pins
         self.chip = chip
         self.scan_delay = scan_delay
-        self.queue = asyncio.Queue()
+        self.mode = mode
+        self.debounce = debounce
+        self.queue = KeyEventQueue(queue_size, overflow)
 
         # open GPIO chip
-        self.handle = lgpio.gpiochip_open(chip)
+        self.handle = backend.lgpio.gpiochip_open(chip)
 
         for pin in self.row_pins:
             # all row pins need pull up resitor with 3.3 V
-            lgpio.gpio_claim_input(self.handle, pin)
+            if mode == EDGE_SCAN:
+                backend.lgpio.gpio_claim_alert(self.handle, pin, backend.lgpio.BOTH_EDGES)
+                backend.lgpio.gpio_set_debounce_micros(self.handle, pin, int(debounce * 1_000_000))
+            else:
+                backend.lgpio.gpio_claim_input(self.handle, pin)
 
-        # Cols
+        # Cols, idle low when waiting for edges so that any press pulls its row low
         for pin in self.col_pins:
-            lgpio.gpio_claim_output(self.handle, pin, 1)
+            backend.lgpio.gpio_claim_output(self.handle, pin, 0 if mode == EDGE_SCAN else 1)
+
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._callbacks = []
+        # Alerts of different rows must not scan at the same time
+        self._scan_lock = threading.Lock()
+        # (row, col) of the key held down in EDGE_SCAN mode
+        self._held: tuple[int, int] | None = None
 
-        self._task = None
+        self._presses = 0
+        self._wakeups = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
 
     async def start(self) -> None:
-        self._task = asyncio.create_task(self._scan_loop())
+        self.queue.bind(asyncio.get_running_loop())
+        if self.mode == POLL_SCAN:
+            self._thread = threading.Thread(target=self._scan_loop, name="keypad", daemon=True)
+            self._thread.start()
+            return
+
+        for pin in self.row_pins:
+            self._callbacks.append(
+                backend.lgpio.callback(self.handle, pin, backend.lgpio.BOTH_EDGES, self._on_alert))
+        # A key may already be down
+        self._on_alert(self.chip, self.row_pins[0], 0, 0)
 
     async def get_key(self) -> str:
+        return (await self.queue.get()).key
+
+    async def get_event(self) -> KeyEvent:
         return await self.queue.get()
 
-    async def _scan_loop(self) -> NoReturn:
-        while True:
+    def get_stats(self) -> dict:
+        """Returns presses, times the driver woke up to scan, and press latencies."""
+        return {
+            "mode": self.mode,
+            "presses": self._presses,
+            "wakeups": self._wakeups,
+            "avg_latency": self._total_latency / self._presses if self._presses else 0.0,
+            "max_latency": self._max_latency,
+            **self.queue.get_stats(),
+        }
+
+    def _on_alert(self, _chip: int, _gpio: int, _level: int, _timestamp: int) -> None:
+        # Runs on lgpio's callback thread
+        alerted = time.monotonic()
+        with self._scan_lock:
+            if self.handle is not None:
+                self._check_rows(alerted)
+
+    def _check_rows(self, alerted: float) -> None:
+        self._wakeups += 1
+        if self._held is not None:
+            held_row, held_col = self._held
+            if (
+                backend.lgpio.gpio_read(self.handle, self.row_pins[held_row]) == 0
+                and self._find_col(self.row_pins[held_row]) == held_col
+            ):
+                # Still held down. Checking the column too catches a release and a press of
+                # another key in the same row whose alerts were handled only after both.
+                return
+            self._held = None
+
+        for row_idx, row_pin in enumerate(self.row_pins):
+            if backend.lgpio.gpio_read(self.handle, row_pin) == 0:
+                col_idx = self._find_col(row_pin)
+                if col_idx is not None:
+                    self._held = (row_idx, col_idx)
+                    self._press(self.keypad[row_idx][col_idx], alerted)
+                return
+
+    def _find_col(self, row_pin: int) -> int | None:
+        # Drive one column low at a time, the one that pulls the row low holds the key. The
+        # level changes this causes are shorter than the debounce time, so they raise no alerts
+        for col_pin in self.col_pins:
+            backend.lgpio.gpio_write(self.handle, col_pin, 1)
+        try:
+            for col_idx, col_pin in enumerate(self.col_pins):
+                backend.lgpio.gpio_write(self.handle, col_pin, 0)
+                pressed = backend.lgpio.gpio_read(self.handle, row_pin) == 0
+                backend.lgpio.gpio_write(self.handle, col_pin, 1)
+                if pressed:
+                    return col_idx
+            # Released meanwhile
+            return None
+        finally:
+            for col_pin in self.col_pins:
+                backend.lgpio.gpio_write(self.handle, col_pin, 0)
+
+    def _press(self, key: str, observable: float) -> None:
+        latency = time.monotonic() - observable
+        self._presses += 1
+        self._total_latency += latency
+        self._max_latency = max(self._max_latency, latency)
+        self.queue.put(KeyEvent(key, observable))
+
+    def _scan_loop(self) -> None:
+        # Runs on the keypad thread until close
+        previous_pass = time.monotonic()
+        while not self._stop.is_set():
+            this_pass = time.monotonic()
+            self._wakeups += 1
             for col_idx, col_pin in enumerate(self.col_pins):
-                lgpio.gpio_write(self.handle, col_pin, 0)
+                backend.lgpio.gpio_write(self.handle, col_pin, 0)
 
                 for row_idx, row_pin in enumerate(self.row_pins):
-                    if lgpio.gpio_read(self.handle, row_pin) == 0:
+                    if backend.lgpio.gpio_read(self.handle, row_pin) == 0:
                         key = self.keypad[row_idx][col_idx]
-                        await self.queue.put(key)
+                        self._press(key, previous_pass)
 
                         # Wait for key release
-                        while lgpio.gpio_read(self.handle, row_pin) == 0:  # noqa: ASYNC110
-                            await asyncio.sleep(0.01)
+                        while backend.lgpio.gpio_read(self.handle, row_pin) == 0:
+                            if self._stop.wait(0.01):
+                                return
+                        # Contacts bounce on release too
+                        self._stop.wait(self.debounce)
 
-                lgpio.gpio_write(self.handle, col_pin, 1)
+                backend.lgpio.gpio_write(self.handle, col_pin, 1)
 
-            await asyncio.sleep(self.scan_delay)
+            previous_pass = this_pass
+            self._stop.wait(self.scan_delay)
 
     async def close(self) -> None:
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
-            self._task = None
-
-        if self.handle is not None:
-            try:
-                lgpio.gpiochip_close(self.handle)
-            except lgpio.error as e:
-                print(f"Warning: Tried to close GPIO handle that may already be closed: {e}")
-            self.handle = None
+        for callback in self._callbacks:
+            callback.cancel()
+        self._callbacks = []
+
+        if self._thread is not None:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+        with self._scan_lock:
+            if self.handle is not None:
+                try:
+                    backend.lgpio.gpiochip_close(self.handle)
+                except backend.lgpio.error as e:
+                    print(f"Warning: Tried to close GPIO handle that may already be closed: {e}")
+                self.handle = None
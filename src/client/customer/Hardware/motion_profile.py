@@ -0,0 +1,105 @@
+import math
+
+TRAPEZOIDAL = "trapezoidal"
+"""Constant acceleration from the start rate to the max rate, then constant deceleration."""
+
+S_CURVE = "s_curve"
+"""Acceleration eases in and out (half cosine velocity ramp), gentler on the rotor at the ends."""
+
+
+class MotionProfile:
+    """Acceleration profile of a stepper motor move, as a table of delays between steps.
+
+    A stepper can only start from rest at a low step rate, but once turning it can be
+    stepped much faster. A move starts at start_rate, accelerates to max_rate, cruises and
+    decelerates back symmetrically. Rates are in steps per second, acceleration in steps per
+    second squared (for S_CURVE the peak acceleration, reached half way up the ramp).
+
+    The acceleration ramp is computed once per profile, step delay tables are built from it
+    once per move length and cached, so stepping only indexes a list.
+
+    Attributes
+    ----------
+    shape: str
+        TRAPEZOIDAL or S_CURVE
+    start_rate: float
+        Step rate the motor starts and stops at
+    max_rate: float
+        Cruise step rate
+    acceleration: float
+        Acceleration between start_rate and max_rate
+    ramp: list[float]
+        Delays (seconds) of the steps from start_rate up to max_rate
+
+    Methods
+    -------
+    def from_config(config) -> MotionProfile | None
+        Builds a profile from a hardware_constants profile dict, None for None
+    def delays(self, total_steps) -> list[float]
+        Delay after every step of a move of total_steps steps
+    def duration(self, total_steps) -> float
+        Seconds a move of total_steps steps takes
+
+    """
+
+    def __init__(
+        self, shape: str, start_rate: float, max_rate: float, acceleration: float,
+    ) -> None:
+        if shape not in (TRAPEZOIDAL, S_CURVE):
+            raise ValueError(f"Unknown motion profile shape {shape}")
+        if start_rate <= 0 or max_rate < start_rate or acceleration <= 0:
+            raise ValueError("Motion profile needs 0 < start_rate <= max_rate and acceleration > 0")
+
+        self.shape = shape
+        self.start_rate = start_rate
+        self.max_rate = max_rate
+        self.acceleration = acceleration
+
+        self.ramp = self.__build_ramp()
+        self.__tables: dict[int, list[float]] = {}
+
+    @staticmethod
+    def from_config(config: dict | None) -> "MotionProfile | None":
+        if config is None:
+            return None
+        return MotionProfile(
+            config["shape"], config["start_rate"], config["max_rate"], config["acceleration"])
+
+    def delays(self, total_steps: int) -> list[float]:
+        table = self.__tables.get(total_steps)
+        if table is None:
+            # Moves too short to reach max_rate turn around half way up the ramp
+            ramp = self.ramp[:min(len(self.ramp), total_steps // 2)]
+            cruise = total_steps - 2 * len(ramp)
+            # The odd middle step of a short move stays at the rate reached so far
+            cruise_delay = 1 / self.max_rate if len(ramp) == len(self.ramp) else (
+                ramp[-1] if ramp else 1 / self.start_rate)
+            table = ramp + [cruise_delay] * cruise + ramp[::-1]
+            self.__tables[total_steps] = table
+        return table
+
+    def duration(self, total_steps: int) -> float:
+        return math.fsum(self.delays(total_steps))
+
+    def __build_ramp(self) -> list[float]:
+        # Step through time: each step is taken at the rate reached so far
+        delta = self.max_rate - self.start_rate
+        if self.shape == TRAPEZOIDAL:
+            ramp_time = delta / self.acceleration
+
+            def rate(t: float) -> float:
+                return self.start_rate + self.acceleration * t
+        else:
+            # v = v0 + delta * (1 - cos(pi * t / T)) / 2 peaks at acceleration pi * delta / 2T
+            ramp_time = math.pi * delta / (2 * self.acceleration)
+
+            def rate(t: float) -> float:
+                return self.start_rate + delta * (1 - math.cos(math.pi * t / ramp_time)) / 2
+
+        ramp = []
+        t = 0.0
+        while t < ramp_time:
+            delay = 1 / rate(t)
+            ramp.append(delay)
+            t += delay
+        return ramp
@@ -0,0 +1,39 @@
+"""Terminal front panel of a simulated machine: typed keys tap the keypad, the LCD is printed."""
+from __future__ import annotations
+
+import sys
+import threading
+
+from customer.Hardware.simulated import lgpio
+from customer.Hardware.simulated.keypad_matrix import KeypadMatrix
+from customer.Hardware.simulated.smbus2 import SMBus
+
+
+class Console:
+    """Drives a simulated machine from the terminal.
+
+    Every line typed on stdin is tapped key by key on the keypad (characters that aren't keys
+    are skipped, letters may be lower case). The LCD is printed whenever what it shows changes.
+    """
+
+    def __init__(
+        self, layout: list[list[str]], row_pins: list[int], col_pins: list[int], chip: int = 0,
+    ) -> None:
+        self.keypad = KeypadMatrix(lgpio.get_chip(chip), layout, row_pins, col_pins)
+
+    def attach_display(self, bus: SMBus, address: int) -> None:
+        bus.device(address).add_listener(self.__show)
+
+    def start(self) -> None:
+        threading.Thread(target=self.__read_keys, name="console", daemon=True).start()
+
+    def __read_keys(self) -> None:
+        for line in sys.stdin:
+            for char in line.strip().upper():
+                if char in self.keypad.positions:
+                    self.keypad.tap(char)
+
+    @staticmethod
+    def __show(lines: list[str]) -> None:
+        border = "+" + "-" * len(lines[0]) + "+"
+        print("\n".join([border, *(f"|{line}|" for line in lines), border]))
@@ -0,0 +1,70 @@
+"""Simulated gpiozero: OutputDevice and Button on chip 0 of the simulated lgpio."""
+from __future__ import annotations
+
+from customer.Hardware.simulated import lgpio
+
+
+class OutputDevice:
+    """Output pin, value 1 drives it high (active high)."""
+
+    def __init__(
+        self,
+        pin: int,
+        active_high: bool = True,  # noqa: FBT001, FBT002
+        initial_value: bool = False,  # noqa: FBT001, FBT002
+    ) -> None:
+        self.pin = pin
+        self.active_high = active_high
+        self.__handle = lgpio.gpiochip_open(0)
+        lgpio.gpio_claim_output(self.__handle, pin, self.__level(initial_value))
+        self.__value = int(initial_value)
+
+    @property
+    def value(self) -> int:
+        return self.__value
+
+    @value.setter
+    def value(self, value: int) -> None:
+        self.__value = int(bool(value))
+        lgpio.gpio_write(self.__handle, self.pin, self.__level(value))
+
+    def on(self) -> None:
+        self.value = 1
+
+    def off(self) -> None:
+        self.value = 0
+
+    def close(self) -> None:
+        if self.__handle is not None:
+            lgpio.gpio_free(self.__handle, self.pin)
+            lgpio.gpiochip_close(self.__handle)
+            self.__handle = None
+
+    def __level(self, value: object) -> int:
+        return int(bool(value) == self.active_high)
+
+
+class Button:
+    """Input pin, pressed when pulled to ground (pull_up) or to 3.3V."""
+
+    def __init__(
+        self,
+        pin: int,
+        pull_up: bool = True,  # noqa: FBT001, FBT002
+        bounce_time: float | None = None,
+    ) -> None:
+        self.pin = pin
+        self.pull_up = pull_up
+        self.bounce_time = bounce_time
+        self.__handle = lgpio.gpiochip_open(0)
+        lgpio.gpio_claim_input(self.__handle, pin)
+
+    @property
+    def is_pressed(self) -> bool:
+        return lgpio.gpio_read(self.__handle, self.pin) == (0 if self.pull_up else 1)
+
+    def close(self) -> None:
+        if self.__handle is not None:
+            lgpio.gpio_free(self.__handle, self.pin)
+            lgpio.gpiochip_close(self.__handle)
+            self.__handle = None
@@ -0,0 +1,169 @@
+"""Virtual HD44780 character LCD behind a PCF8574 I2C backpack."""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+
+DDRAM_LINE_LENGTH = 40
+LINE_ADDRESSES = (0x00, 0x40)
+
+# Backpack pins: P0 RS, P1 RW, P2 E, P3 backlight, P4-P7 data D4-D7
+RS = 0x01
+ENABLE = 0x04
+BACKLIGHT = 0x08
+
+CLEAR_TIME = 0.00152
+"""Seconds clear display and return home take, other instructions and writes take 37us."""
+EXECUTION_TIME = 0.000037
+
+
+class HD44780:
+    """Display RAM, cursor and display shift of a HD44780 driven through its backpack.
+
+    Expander bytes are decoded the way the controller sees them: data is latched on the
+    falling edge of E, as whole bytes until function set selects the 4 bit interface, then as
+    nibble pairs. Instructions and characters arriving while the previous one still executes
+    are counted as busy violations (a real LCD would drop or garble them).
+
+    Methods
+    -------
+    def expander_write(self, byte) -> None
+        Feed one byte written to the I2C expander
+    def lines(self) -> list[str]
+        Text the display currently shows, one string per line
+    def add_listener(self, func) -> None
+        Call func(lines) after every I2C transfer that changed what the display shows
+    def get_stats(self) -> dict
+        Returns expander bytes, instructions, characters and busy violations
+
+    """
+
+    def __init__(self, width: int = 16) -> None:
+        self.width = width
+        self.ddram = [" "] * 0x80
+        self.address = 0
+        self.shift = 0
+        self.increment = True
+        self.four_bit = False
+        self.backlight = False
+        self.display_on = False
+
+        self.__pins = 0
+        self.__high_nibble: int | None = None
+        self.__busy_until = 0.0
+        self.__shown = self.lines()
+        self.__listeners: list[Callable[[list[str]], None]] = []
+        self.__lock = threading.Lock()
+
+        self.expander_bytes = 0
+        self.instructions = 0
+        self.characters = 0
+        self.busy_violations = 0
+
+    def expander_write(self, byte: int, at: float | None = None) -> None:
+        """Feed a byte that reached the expander at perf_counter time at, None skips the check
+        for instructions arriving while the LCD is busy.
+        """  # noqa: D205
+        with self.__lock:
+            self.expander_bytes += 1
+            self.backlight = bool(byte & BACKLIGHT)
+            if self.__pins & ENABLE and not byte & ENABLE:
+                self.__latch(byte, at)
+            self.__pins = byte
+
+    def end_transfer(self) -> None:
+        """Called by the bus after every transfer, notifies listeners of changes."""
+        lines = self.lines()
+        if lines != self.__shown:
+            self.__shown = lines
+            for listener in self.__listeners:
+                listener(lines)
+
+    def lines(self) -> list[str]:
+        return [
+            "".join(
+                self.ddram[base + (col + self.shift) % DDRAM_LINE_LENGTH]
+                for col in range(self.width)
+            )
+            for base in LINE_ADDRESSES
+        ]
+
+    def add_listener(self, func: Callable[[list[str]], None]) -> None:
+        self.__listeners.append(func)
+
+    def get_stats(self) -> dict:
+        return {
+            "expander_bytes": self.expander_bytes,
+            "instructions": self.instructions,
+            "characters": self.characters,
+            "busy_violations": self.busy_violations,
+        }
+
+    def __latch(self, byte: int, at: float | None) -> None:
+        nibble = byte & 0xF0
+        if not self.four_bit:
+            # 8 bit interface, the low data lines aren't connected and read 0
+            self.__execute(nibble, byte & RS, at)
+            return
+        if self.__high_nibble is None:
+            self.__high_nibble = nibble
+            return
+        value = self.__high_nibble | nibble >> 4
+        self.__high_nibble = None
+        self.__execute(value, byte & RS, at)
+
+    def __execute(self, value: int, data: int, at: float | None) -> None:
+        now = time.perf_counter() if at is None else at
+        if at is not None and now < self.__busy_until:
+            self.busy_violations += 1
+        duration = EXECUTION_TIME
+
+        if data:
+            self.characters += 1
+            self.ddram[self.address] = chr(value)
+            self.__move_address()
+        else:
+            self.instructions += 1
+            duration = self.__instruction(value)
+        self.__busy_until = now + duration
+
+    def __instruction(self, value: int) -> float:  # noqa: C901
+        if value & 0x80:
+            self.address = value & 0x7F
+        elif value & 0x40:
+            pass  # CGRAM address, custom characters aren't simulated
+        elif value & 0x20:
+            self.four_bit = not value & 0x10
+            self.__high_nibble = None
+        elif value & 0x10:
+            if value & 0x08:
+                self.shift = (self.shift + (-1 if value & 0x04 else 1)) % DDRAM_LINE_LENGTH
+            else:
+                self.__move_address(forward=bool(value & 0x04))
+        elif value & 0x08:
+            self.display_on = bool(value & 0x04)
+        elif value & 0x04:
+            self.increment = bool(value & 0x02)
+        elif value & 0x02:
+            self.address = 0
+            self.shift = 0
+            return CLEAR_TIME
+        elif value & 0x01:
+            self.ddram = [" "] * 0x80
+            self.address = 0
+            self.shift = 0
+            self.increment = True
+            return CLEAR_TIME
+        return EXECUTION_TIME
+
+    def __move_address(self, *, forward: bool | None = None) -> None:
+        # Two line mode: 0x00-0x27 then 0x40-0x67, wrapping around
+        forward = self.increment if forward is None else forward
+        line = 0x40 if self.address >= 0x40 else 0x00
+        col = (self.address - line + (1 if forward else -1)) % DDRAM_LINE_LENGTH
+        if forward and col == 0:
+            line ^= 0x40
+        elif not forward and col == DDRAM_LINE_LENGTH - 1:
+            line ^= 0x40
+        self.address = line + col
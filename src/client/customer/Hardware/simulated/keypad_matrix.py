@@ -0,0 +1,89 @@
+"""Virtual matrix keypad wired to a simulated lgpio chip, pressed by scripts."""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterable
+
+from customer.Hardware.simulated.lgpio import Chip
+
+TAP_HOLD = 0.08
+"""Seconds a scripted tap holds a key down, about as long as a quick human press."""
+
+
+class KeypadMatrix:
+    """Keys connect a row pin to a column pin while held, like a membrane keypad.
+
+    A row reads low when a held key of that row sits on a column the driver drives low, high
+    (pulled up) otherwise. Presses and releases notify the chip, which raises the debounced
+    alerts an edge triggered driver waits for.
+
+    Methods
+    -------
+    def press(self, key) -> None
+        Hold a key down
+    def release(self, key) -> None
+        Let go of a key
+    def tap(self, key, hold) -> float
+        Press and release a key, blocking, returns the time.monotonic() time of the press
+    def play(self, script) -> threading.Thread
+        Tap (delay, key) pairs on a background thread, each after delay seconds
+    def type_text(self, text, gap) -> None
+        Tap every key of text, blocking
+
+    """
+
+    def __init__(
+        self, chip: Chip, layout: list[list[str]], row_pins: list[int], col_pins: list[int],
+    ) -> None:
+        self.chip = chip
+        self.row_pins = row_pins
+        self.col_pins = col_pins
+        self.positions = {
+            key: (row, col) for row, keys in enumerate(layout) for col, key in enumerate(keys)
+        }
+        self.__held: set[tuple[int, int]] = set()
+        self.__lock = threading.Lock()
+
+        for row, pin in enumerate(row_pins):
+            chip.input_sources[pin] = lambda row=row: self.__row_level(row)
+
+    def press(self, key: str) -> None:
+        with self.__lock:
+            self.__held.add(self.positions[key])
+        self.chip.inputs_changed()
+
+    def release(self, key: str) -> None:
+        with self.__lock:
+            self.__held.discard(self.positions[key])
+        self.chip.inputs_changed()
+
+    def tap(self, key: str, hold: float = TAP_HOLD) -> float:
+        pressed = time.monotonic()
+        self.press(key)
+        time.sleep(hold)
+        self.release(key)
+        return pressed
+
+    def play(self, script: Iterable[tuple[float, str]]) -> threading.Thread:
+        def run() -> None:
+            for delay, key in script:
+                time.sleep(delay)
+                self.tap(key)
+
+        thread = threading.Thread(target=run, name="keypad-script", daemon=True)
+        thread.start()
+        return thread
+
+    def type_text(self, text: str, gap: float = 0.05) -> None:
+        for key in text:
+            self.tap(key)
+            time.sleep(gap)
+
+    def __row_level(self, row: int) -> int:
+        with self.__lock:
+            held = [col for held_row, col in self.__held if held_row == row]
+        for col in held:
+            if self.chip.outputs.get(self.col_pins[col], 1) == 0:
+                return 0
+        return 1
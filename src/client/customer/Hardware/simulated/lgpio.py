@@ -0,0 +1,304 @@
+"""Simulated lgpio: the subset of the lgpio API the drivers use, on virtual GPIO chips.
+
+Every chip number opens the same virtual Chip, shared by all handles like a real gpiochip.
+Output levels are stored, input levels come from devices attached to the chip (a
+KeypadMatrix) and read high otherwise, as if pulled up. Alerts are debounced like lgpio does:
+a callback fires once a pin has kept a new level for its debounce time, judged by when the
+level changed rather than by when the timer thread gets to run, so a loaded test machine
+doesn't swallow edges. Group writes are recorded with their time, so the step timing of
+stepper motors can be checked.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections.abc import Callable
+
+RISING_EDGE = 0
+FALLING_EDGE = 1
+BOTH_EDGES = 2
+
+SET_PULL_UP = 32
+GROUP_ALL = 0xFFFFFFFFFFFFFFFF
+
+
+class error(Exception):  # noqa: N801
+    """Raised like lgpio.error for invalid handles and pins that are busy or not claimed."""
+
+
+class StepRecorder:
+    """Times of the group writes of one pin group, a stepper motor's coils."""
+
+    def __init__(self) -> None:
+        self.writes: list[tuple[float, int]] = []
+
+    def record(self, bits: int) -> None:
+        self.writes.append((time.perf_counter(), bits))
+
+    def step_times(self) -> list[float]:
+        # Writes that energize coils, writing 0 turns the motor off
+        return [stamp for stamp, bits in self.writes if bits]
+
+    def get_stats(self) -> dict:
+        """Returns steps, achieved step rate and the spread of the intervals between steps."""
+        times = self.step_times()
+        intervals = [later - earlier for earlier, later in itertools.pairwise(times)]
+        if not intervals:
+            return {"steps": len(times), "rate": 0.0, "min_interval": 0.0, "max_interval": 0.0}
+        return {
+            "steps": len(times),
+            "rate": len(intervals) / (times[-1] - times[0]) if times[-1] > times[0] else 0.0,
+            "min_interval": min(intervals),
+            "max_interval": max(intervals),
+        }
+
+
+class LevelChange:
+    """A change of a watched pin to level, ended is set by the next change of the pin."""
+
+    __slots__ = ("at", "ended", "level", "number")
+
+    def __init__(self, number: int, level: int, at: float) -> None:
+        self.number = number
+        self.level = level
+        self.at = at
+        self.ended: float | None = None
+
+
+class Chip:
+    """Virtual GPIO chip: pin levels, claims, alerts and group writes."""
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.outputs: dict[int, int] = {}
+        self.inputs: set[int] = set()
+        self.input_sources: dict[int, Callable[[], int]] = {}
+        self.groups: dict[int, list[int]] = {}
+        self.recorders: dict[int, StepRecorder] = {}
+
+        self.__debounce: dict[int, float] = {}
+        self.__alerted: dict[int, int] = {}
+        # Last change seen of every watched pin and the number of the last change alerted.
+        # Changes are numbered across watches, so timers left over from a pin's earlier claim
+        # are ignored.
+        self.__changes: dict[int, LevelChange] = {}
+        self.__alerted_change: dict[int, int] = {}
+        self.__change_numbers = itertools.count(1)
+        self.__callbacks: dict[int, list[Callback]] = {}
+        self.__callback_lock = threading.RLock()
+        self.__lock = threading.RLock()
+
+    def level(self, pin: int) -> int:
+        if pin in self.outputs:
+            return self.outputs[pin]
+        source = self.input_sources.get(pin)
+        return source() if source is not None else 1
+
+    def claim(self, pin: int, level: int | None) -> None:
+        with self.__lock:
+            if pin in self.outputs or pin in self.inputs:
+                raise error("GPIO busy")
+            if level is None:
+                self.inputs.add(pin)
+            else:
+                self.outputs[pin] = level
+
+    def free(self, pin: int) -> None:
+        with self.__lock:
+            self.outputs.pop(pin, None)
+            self.inputs.discard(pin)
+            self.__debounce.pop(pin, None)
+            self.__changes.pop(pin, None)
+            self.__callbacks.pop(pin, None)
+
+    def write(self, pin: int, level: int) -> None:
+        if pin not in self.outputs:
+            raise error("GPIO not claimed for output")
+        self.outputs[pin] = level
+        self.inputs_changed()
+
+    def watch(self, pin: int, debounce: float) -> None:
+        with self.__lock:
+            self.__debounce[pin] = debounce
+            change = LevelChange(next(self.__change_numbers), self.level(pin), time.monotonic())
+            self.__changes[pin] = change
+            self.__alerted[pin] = change.level
+            self.__alerted_change[pin] = change.number
+
+    def add_callback(self, pin: int, callback: Callback) -> None:
+        with self.__lock:
+            self.__callbacks.setdefault(pin, []).append(callback)
+
+    def remove_callback(self, pin: int, callback: Callback) -> None:
+        with self.__lock:
+            if callback in self.__callbacks.get(pin, []):
+                self.__callbacks[pin].remove(callback)
+
+    def inputs_changed(self) -> None:
+        """Called by attached devices (and output writes) when input levels may have changed."""
+        now = time.monotonic()
+        for pin, debounce in list(self.__debounce.items()):
+            level = self.level(pin)
+            with self.__lock:
+                previous = self.__changes.get(pin)
+                if previous is None or level == previous.level:
+                    continue
+                previous.ended = now
+                change = LevelChange(next(self.__change_numbers), level, now)
+                self.__changes[pin] = change
+            timer = threading.Timer(debounce, self.__settle, (pin, change, debounce))
+            timer.daemon = True
+            timer.start()
+
+    def __settle(self, pin: int, change: LevelChange, debounce: float) -> None:
+        # Like lgpio's debounce: alert only if the pin kept the level for the debounce time.
+        # Timers of a loaded machine may run late or out of order, a level that lasted long
+        # enough is still alerted unless a later change already was.
+        with self.__callback_lock:
+            if change.ended is not None and change.ended - change.at < debounce:
+                return
+            if (
+                change.number < self.__alerted_change.get(pin, 0)
+                or self.__alerted.get(pin) == change.level
+            ):
+                return
+            self.__alerted[pin] = level = change.level
+            self.__alerted_change[pin] = change.number
+            stamp = time.monotonic_ns()
+            for callback in list(self.__callbacks.get(pin, [])):
+                callback.fire(self.number, pin, level, stamp)
+
+
+class Callback:
+    """Returned by callback, cancel stops it."""
+
+    def __init__(self, chip: Chip, pin: int, edge: int, func: Callable) -> None:
+        self.chip = chip
+        self.pin = pin
+        self.edge = edge
+        self.func = func
+        self.tally = 0
+
+    def fire(self, chip_number: int, pin: int, level: int, stamp: int) -> None:
+        if self.edge == BOTH_EDGES or (self.edge == RISING_EDGE) == (level == 1):
+            self.tally += 1
+            self.func(chip_number, pin, level, stamp)
+
+    def cancel(self) -> None:
+        self.chip.remove_callback(self.pin, self)
+
+
+_chips: dict[int, Chip] = {}
+_handles: dict[int, Chip] = {}
+_claims: dict[int, set[int]] = {}
+_next_handle = itertools.count()
+
+
+def get_chip(number: int = 0) -> Chip:
+    """Returns the virtual chip, to attach devices to it or inspect it."""
+    if number not in _chips:
+        _chips[number] = Chip(number)
+    return _chips[number]
+
+
+def _chip(handle: int) -> Chip:
+    if handle not in _handles:
+        raise error("bad handle")
+    return _handles[handle]
+
+
+def _claim(handle: int, gpio: int, level: int | None) -> Chip:
+    chip = _chip(handle)
+    chip.claim(gpio, level)
+    _claims[handle].add(gpio)
+    return chip
+
+
+def gpiochip_open(gpiochip: int) -> int:
+    handle = next(_next_handle)
+    _handles[handle] = get_chip(gpiochip)
+    _claims[handle] = set()
+    return handle
+
+
+def gpiochip_close(handle: int) -> None:
+    # Like lgpio, closing a handle releases the GPIO it still claims
+    chip = _chip(handle)
+    for gpio in _claims.pop(handle):
+        chip.free(gpio)
+    del _handles[handle]
+
+
+def gpio_claim_input(handle: int, gpio: int, lFlags: int = 0) -> None:  # noqa: N803
+    _claim(handle, gpio, None)
+
+
+def gpio_claim_output(
+    handle: int, gpio: int, level: int = 0, lFlags: int = 0,  # noqa: N803
+) -> None:
+    _claim(handle, gpio, level)
+
+
+def gpio_claim_alert(
+    handle: int,
+    gpio: int,
+    eFlags: int,  # noqa: N803
+    lFlags: int = 0,  # noqa: N803
+    notify_handle: int | None = None,
+) -> None:
+    _claim(handle, gpio, None).watch(gpio, 0.0)
+
+
+def gpio_set_debounce_micros(handle: int, gpio: int, debounce_micros: int) -> None:
+    _chip(handle).watch(gpio, debounce_micros / 1_000_000)
+
+
+def gpio_free(handle: int, gpio: int) -> None:
+    _chip(handle).free(gpio)
+    _claims[handle].discard(gpio)
+
+
+def gpio_read(handle: int, gpio: int) -> int:
+    return _chip(handle).level(gpio)
+
+
+def gpio_write(handle: int, gpio: int, level: int) -> None:
+    _chip(handle).write(gpio, level)
+
+
+def callback(
+    handle: int, gpio: int, edge: int = RISING_EDGE, func: Callable | None = None,
+) -> Callback:
+    chip = _chip(handle)
+    cb = Callback(chip, gpio, edge, func or (lambda *_: None))
+    chip.add_callback(gpio, cb)
+    return cb
+
+
+def group_claim_output(
+    handle: int, gpio: list[int], levels: list[int] | None = None, lFlags: int = 0,  # noqa: N803
+) -> None:
+    chip = _chip(handle)
+    levels = levels or [0] * len(gpio)
+    for pin, level in zip(gpio, levels):
+        _claim(handle, pin, level)
+    chip.groups[gpio[0]] = list(gpio)
+    chip.recorders[gpio[0]] = StepRecorder()
+
+
+def group_write(handle: int, gpio: int, group_bits: int, group_mask: int = GROUP_ALL) -> None:
+    chip = _chip(handle)
+    if gpio not in chip.groups:
+        raise error("GPIO not a group leader")
+    for bit, pin in enumerate(chip.groups[gpio]):
+        if group_mask >> bit & 1:
+            chip.outputs[pin] = group_bits >> bit & 1
+    chip.recorders[gpio].record(group_bits & group_mask)
+
+
+def group_free(handle: int, gpio: int) -> None:
+    chip = _chip(handle)
+    for pin in chip.groups.pop(gpio, []):
+        chip.free(pin)
+        _claims[handle].discard(pin)
@@ -0,0 +1,91 @@
+"""Simulated smbus2: an I2C bus where every address answers as an LCD backpack.
+
+Transfers take as long as they would on the wire (9 bit times per byte plus the address
+byte at bus_hz), so timing measured against the simulated bus is close to the pi's. The
+calling thread sleeps meanwhile, like in the kernel's i2c ioctl, so many simulated machines
+can share one process. Set a bus's bus_hz to 0 to skip the wait.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from customer.Hardware.simulated.hd44780 import HD44780
+
+BUS_HZ = 100_000
+"""I2C clock of the pi's bus 1 by default."""
+
+BITS_PER_BYTE = 9
+"""Eight data bits and the acknowledge."""
+
+
+class i2c_msg:  # noqa: N801
+    """Write message for i2c_rdwr, smbus2's i2c_msg.write."""
+
+    def __init__(self, addr: int, buf: list[int]) -> None:
+        self.addr = addr
+        self.buf = list(buf)
+
+    @staticmethod
+    def write(address: int, buf: list[int] | bytes) -> i2c_msg:
+        return i2c_msg(address, buf)
+
+
+class SMBus:
+    """I2C bus with a virtual HD44780 behind every address, created on first use.
+
+    Attributes
+    ----------
+    devices: dict[int, HD44780]
+        Displays by I2C address
+    bytes_written: int
+        Bytes sent over the bus, address bytes included
+    transfers: int
+        I2C transactions
+
+    """
+
+    def __init__(self, bus: int | None = None, bus_hz: int = BUS_HZ) -> None:
+        self.bus = bus
+        self.bus_hz = bus_hz
+        self.devices: dict[int, HD44780] = {}
+        self.bytes_written = 0
+        self.transfers = 0
+        self.__lock = threading.Lock()
+
+    def device(self, address: int) -> HD44780:
+        if address not in self.devices:
+            self.devices[address] = HD44780()
+        return self.devices[address]
+
+    def write_byte(self, i2c_addr: int, value: int, force: bool | None = None) -> None:
+        self.__transfer(i2c_addr, [value])
+
+    def write_i2c_block_data(
+        self, i2c_addr: int, register: int, data: list[int], force: bool | None = None,
+    ) -> None:
+        self.__transfer(i2c_addr, [register, *data])
+
+    def i2c_rdwr(self, *i2c_msgs: i2c_msg) -> None:
+        for msg in i2c_msgs:
+            self.__transfer(msg.addr, msg.buf)
+
+    def close(self) -> None:
+        pass
+
+    def __transfer(self, address: int, data: list[int]) -> None:
+        with self.__lock:
+            start = time.perf_counter()
+            device = self.device(address)
+            byte_time = BITS_PER_BYTE / self.bus_hz if self.bus_hz else 0.0
+            for index, byte in enumerate(data):
+                # Every byte reaches the expander after the address byte and those before it
+                device.expander_write(byte, start + (index + 2) * byte_time if byte_time else None)
+            self.bytes_written += len(data) + 1
+            self.transfers += 1
+
+            # Hold the bus for the time the bytes take on the wire, bus_hz 0 doesn't
+            remaining = start + (len(data) + 1) * byte_time - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            device.end_transfer()
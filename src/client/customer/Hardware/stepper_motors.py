@@ -1,10 +1,102 @@
+from __future__ import annotations
+
 import asyncio
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from customer.Hardware import backend
+
+if TYPE_CHECKING:
+    from customer.Hardware.motion_profile import MotionProfile
+
+SPIN_MARGIN = 0.0005
+"""Seconds before a step deadline the stepping thread stops sleeping and spins instead."""
+
+STEP_THREAD_PRIORITY = 10
+"""SCHED_FIFO priority requested for stepping threads (needs CAP_SYS_NICE, else ignored)."""
+
+
+class StepClock:
+    """Absolute deadline timing for a thread that generates motor steps.
+
+    wait() sleeps until SPIN_MARGIN before the next deadline and spins on perf_counter for the
+    rest, so steps land within microseconds of their deadline instead of wherever the event
+    loop or the OS scheduler wakes up. Deadlines are absolute, time spent stepping does not add
+    up; a tick that is more than a whole interval late restarts the schedule instead of
+    bursting steps to catch up. wait_until serves callers that keep their own deadlines, like
+    the motor scheduler running several motors with different step timings.
+    """
+
+    def __init__(self, spin_margin: float = SPIN_MARGIN) -> None:
+        self.spin_margin = spin_margin
+        self.__deadline = 0.0
+        self.__last_tick = 0.0
+
+        self.__ticks = 0
+        self.__target_time = 0.0
+        self.__elapsed = 0.0
+        self.__late_ticks = 0
+        self.__max_lateness = 0.0
+
+    def start(self) -> None:
+        """Starts a run of ticks, deadlines count from now."""
+        self.__last_tick = self.__deadline = time.perf_counter()
 
-from gpiozero import OutputDevice
+    def wait(self, interval: float) -> None:
+        """Blocks until the next deadline, interval after the previous one."""
+        if self.wait_until(self.__deadline + interval) > interval:
+            # Too late to catch up without a burst of steps, restart the schedule from now
+            self.__deadline = self.__last_tick
+
+    def wait_until(self, deadline: float) -> float:
+        """Blocks until deadline (a perf_counter time), returns how late it woke up."""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_margin:
+            time.sleep(remaining - self.spin_margin)
+        while time.perf_counter() < deadline:
+            pass
+
+        now = time.perf_counter()
+        lateness = now - deadline
+        interval = max(deadline - self.__deadline, 0.0)
+        self.__ticks += 1
+        self.__target_time += interval
+        self.__elapsed += now - self.__last_tick
+        self.__max_lateness = max(self.__max_lateness, lateness)
+        if lateness > interval:
+            self.__late_ticks += 1
+        self.__deadline = deadline
+        self.__last_tick = now
+        return lateness
+
+    def get_stats(self) -> dict:
+        """Returns target and achieved step rates (steps per second) and lateness counters."""
+        return {
+            "ticks": self.__ticks,
+            "target_rate": self.__ticks / self.__target_time if self.__target_time else 0.0,
+            "achieved_rate": self.__ticks / self.__elapsed if self.__elapsed else 0.0,
+            "late_ticks": self.__late_ticks,
+            "max_lateness": self.__max_lateness,
+        }
+
+
+def raise_thread_priority() -> None:
+    """Asks for real-time scheduling of the calling thread, keeps normal priority if refused."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(STEP_THREAD_PRIORITY))
+    except (AttributeError, OSError):
+        pass
 
 
 class StepperMotor:
-    """Stepper motor object to control stepper motor with raspberry pi GPIO pins."""
+    """Stepper motor object to control stepper motor with raspberry pi GPIO pins.
+
+    The coil pins are claimed once, as one lgpio group, when the motor is created and stay
+    claimed until close. Every step of the sequence is precomputed into a bitmask (bit i drives
+    pins[i]), so a step is a single group write instead of one write per coil.
+    """
 
     def __init__(
         self,
@@ -12,8 +104,14 @@ class StepperMotor:
         step_delay: float,
         step_sequence: list[list[int]],
         pins: list[int],
+        profile: MotionProfile | None = None,
+        chip: int = 0,
     ) -> None:
-        """Intializes stepper motor object."""
+        """Intializes stepper motor object.
+
+        Without a motion profile every step takes step_delay, with one the motor accelerates
+        from the profile's start rate to its max rate and back.
+        """
         # error checks
 
         # object attributes
@@ -21,34 +119,122 @@ class StepperMotor:
         self.step_delay = step_delay
         self.step_sequence = step_sequence
         self.pins = pins
+        self.profile = profile
         self.moving = False
+        # Worst case number of coils a step energizes, what a running motor costs the
+        # power budget of the motor scheduler
+        self.max_energized_coils = max(sum(step) for step in step_sequence)
+        self.step_masks = [
+            sum(bit << coil for coil, bit in enumerate(step)) for step in step_sequence
+        ]
+        self.group_mask = (1 << len(pins)) - 1
+        self.last_rotation_stats: dict = {}
 
-    async def rotate_motor(self, my_quarter_rotations: int) -> None:
-        """Rotates motor clockwise with quarter rotation precision.
-        When calling use asyncio.run(StepperMotor.rotate_motor(int)).
-        """  # noqa: D205
+        # claim the coils as one group, all off, the first pin addresses the group
+        self.handle = backend.lgpio.gpiochip_open(chip)
+        backend.lgpio.group_claim_output(self.handle, pins, [0] * len(pins))
+
+    def begin(self) -> None:
+        """Marks the motor as moving, rotate_motor and the motor scheduler call this."""
+        self.moving = True
+
+    def step(self, step_num: int) -> None:
+        """Energizes the coils of one step of the sequence."""
+        backend.lgpio.group_write(
+            self.handle, self.pins[0],
+            self.step_masks[step_num % len(self.step_masks)], self.group_mask,
+        )
+
+    def end(self) -> None:
+        """Turns every coil off, the pins stay claimed."""
+        if self.handle is not None:
+            backend.lgpio.group_write(self.handle, self.pins[0], 0, self.group_mask)
+        self.moving = False
+
+    def close(self) -> None:
+        """Turns every coil off and releases the pins."""
+        if self.handle is None:
+            return
+        try:
+            self.end()
+            backend.lgpio.group_free(self.handle, self.pins[0])
+            backend.lgpio.gpiochip_close(self.handle)
+        except backend.lgpio.error as e:
+            print(f"Warning: Tried to release motor pins that may already be released: {e}")
+        self.handle = None
+
+    def total_steps(self, my_quarter_rotations: int) -> int:
+        """Number of steps for an amount of quarter rotations."""
         # error check
         if not isinstance(my_quarter_rotations, int):
             raise TypeError(
                 "Oh no!!, my_quarter_rotations is not of type int,"
                 f"and is {type(my_quarter_rotations)}, value passed: {my_quarter_rotations}",
             )
+        return my_quarter_rotations * self.steps_per_rev
+
+    def step_delays(self, total_steps: int) -> list[float]:
+        """Delay after every step of a move, precomputed by the motion profile."""
+        if self.profile is None:
+            return [self.step_delay] * total_steps
+        return self.profile.delays(total_steps)
 
+    async def rotate_motor(self, my_quarter_rotations: int) -> None:
+        """Rotates motor clockwise with quarter rotation precision.
+        When calling use asyncio.run(StepperMotor.rotate_motor(int)).
+        The steps are generated on a dedicated thread, the coroutine only awaits completion.
+        Step rates of the last rotation are in last_rotation_stats.
+        """  # noqa: D205
         # compute total steps for wanted amount of rotation
-        total_steps = my_quarter_rotations * self.steps_per_rev
-        # coils from gpiozero library for driver
-        coils = [OutputDevice(pin) for pin in self.pins]
+        total_steps = self.total_steps(my_quarter_rotations)
+
+        stop = threading.Event()
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def run() -> None:
+            try:
+                self.run_steps(total_steps, stop)
+            except BaseException as e:  # noqa: BLE001
+                loop.call_soon_threadsafe(_resolve, done, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, done, None)
+
+        threading.Thread(target=run, name="stepper", daemon=True).start()
+        try:
+            await asyncio.shield(done)
+        except asyncio.CancelledError:
+            # Stop stepping, the thread turns the coils off on its way out
+            stop.set()
+            raise
+
+    def run_steps(self, total_steps: int, stop: threading.Event | None = None) -> None:
+        """Blocking rotation for a stepping thread, stops early when stop is set."""
+        raise_thread_priority()
+        clock = StepClock()
+        delays = self.step_delays(total_steps)
 
         # cycle through number of steps
         # try statement used to make sure coils turn off in case of error
-        self.moving = True
+        self.begin()
         try:
-            for step_num in range(total_steps):
-                step = self.step_sequence[step_num % len(self.step_sequence)]
-                for coil, val in zip(coils, step):
-                    coil.value = val
-                await asyncio.sleep(self.step_delay)
-            await asyncio.sleep(self.step_delay)
+            clock.start()
+            for step_num, delay in enumerate(delays):
+                if stop is not None and stop.is_set():
+                    break
+                self.step(step_num)
+                clock.wait(delay)
+            clock.wait(delays[-1] if delays else self.step_delay)
         finally:
-            [coil.off() for coil in coils]
-            self.moving = False
+            self.end()
+            self.last_rotation_stats = clock.get_stats()
+
+
+def _resolve(future: asyncio.Future, error: BaseException | None) -> None:
+    # Runs on the event loop, completes a future from a stepping thread
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+
+from api_constants import JOURNAL_PATH
+from api_operation import async_run_operation
+from async_db_signal import AsyncSignalIO
+from async_inventory_manager import AsyncInventoryManager
+from customer.mqtt import MQTTConnection
+from customer.vending_machine_core import VendingMachineCore
+from enum_types import InventoryManagerMode, SlotNamingScheme
+from inventory_journal import InventoryJournal
+
+
+class AsyncVendingMachine:
+    """Awaitable counterpart of customer.vending_machine.VendingMachine for the asyncio runner.
+
+    The transaction logic is the same VendingMachineCore, its database steps are run here with
+    awaitable calls: every method that reaches the database is a coroutine, purely local
+    operations stay synchronous. Construct with `await AsyncVendingMachine.create(...)` since
+    setup queries the database.
+
+    Attributes
+    ----------
+    inv_man: AsyncInventoryManager
+        Instance of AsyncInventoryManager class that manages vending machine inventory
+    core: VendingMachineCore
+        Holds the current transaction, shared logic with VendingMachine
+    pipeline: TransactionPipeline
+        Runs the charge and the inventory write of end_transaction concurrently, keeps timing
+        stats for every stage
+
+    Methods
+    -------
+    async def create(rows, columns, hardware_id, ...) -> AsyncVendingMachine
+        Register (if needed) and load the vending machine from the database, then subscribe
+        to its restock and mode notifications unless notifications is False
+    def list_options(self) -> str
+        Returns a string representation of the inventory of the vending machine
+    async def start_transaction(self) -> None
+        Sets mode of inv_man to TRANSACTION and gets a stripe payment token
+    def buy_item(self, slot_name) -> str
+        Only callable if mode of inv_man is TRANSACTION, adds price of item to transaction_price
+    async def buy_free_item(self, slot_name) -> str
+        Reserve a free item locally, the stock change is saved to the database in the background
+    async def end_transaction(self) -> float
+        Charge the customer while saving the inventory, then set mode of inv_man back to IDLE.
+        If a stage fails the mode stays TRANSACTION and calling again retries what is left
+    def get_price(self, slot_name) -> float
+        Returns the price of the item in a slot
+    async def reload_data(self) -> list[str]
+        Loads up to date information from the database, returns the names of changed slots
+
+    """
+
+    def __init__(
+        self, rows: int, columns: int, hardware_id: str,
+        slot_naming: SlotNamingScheme | None = None, journal_path: str = JOURNAL_PATH,
+    ) -> None:
+        self.inv_man = AsyncInventoryManager(
+            rows, columns, hardware_id,
+            journal=InventoryJournal(journal_path), slot_naming=slot_naming,
+        )
+        self.core = VendingMachineCore(self.inv_man.core)
+        self.pipeline = self.core.pipeline
+
+    @classmethod
+    async def create(  # noqa: PLR0913, PLR0917
+        cls, rows: int, columns: int, hardware_id: str,
+        slot_naming: SlotNamingScheme | None = None,
+        journal_path: str = JOURNAL_PATH,
+        notifications: bool = True,
+    ) -> AsyncVendingMachine:
+        vending_machine = cls(rows, columns, hardware_id, slot_naming, journal_path)
+        await async_run_operation(vending_machine.core.connect_op(rows, columns), AsyncSignalIO)
+        vending_machine.inv_man.journal_replayer.start()
+        if not notifications:
+            return vending_machine
+
+        # Restock notifications arrive on the MQTT thread, hand the resync back to this loop.
+        # Everything else the thread does uses the blocking core directly.
+        loop = asyncio.get_running_loop()
+        MQTTConnection.start_mqtt_connection(
+            hardware_id,
+            vending_machine.inv_man.core,
+            lambda: asyncio.run_coroutine_threadsafe(
+                vending_machine.inv_man.sync_from_database(), loop),
+        )
+        return vending_machine
+
+    def list_options(self) -> str:
+        return self.core.list_options()
+
+    async def start_transaction(self) -> None:
+        await async_run_operation(self.core.start_transaction_op(), AsyncSignalIO)
+
+    def buy_item(self, slot_name: str) -> str:
+        return self.core.buy_item(slot_name)
+
+    async def buy_free_item(self, slot_name: str) -> str:
+        return await async_run_operation(self.core.buy_free_item_op(slot_name), AsyncSignalIO)
+
+    async def end_transaction(self) -> float:
+        due = self.core.amount_due()
+
+        async def charge() -> None:
+            await async_run_operation(self.core.charge_op(due), AsyncSignalIO)
+
+        await self.pipeline.run_async(
+            charge if due > 0 else None,
+            self.inv_man.save_inventory_to_db,
+            lambda: self.inv_man.set_mode(InventoryManagerMode.IDLE),
+        )
+        return self.core.finish_transaction()
+
+    def get_price(self, slot_name: str) -> float:
+        return self.core.get_price(slot_name)
+
+    async def reload_data(self) -> list[str]:
+        return await async_run_operation(self.core.reload_data_op(), AsyncSignalIO)
@@ -1,48 +1,472 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+from customer.Hardware.hardware_constants import (
+    DISPENSE_QUARTER_ROTATIONS,
+    KEYPAD_DEBOUNCE,
+    KEYPAD_OVERFLOW,
+    KEYPAD_QUEUE_SIZE,
+    KEYPAD_SCAN_MODE,
+    MAX_ENERGIZED_COILS,
+)
 from customer.Hardware.keypad import AsyncKeypad
 from customer.Hardware.LCD_display import LCDDisplay
-from customer.Hardware.stepper_motors import StepperMotor
+from customer.Hardware.stepper_motors import StepClock, StepperMotor, raise_thread_priority
 
 
 class InputManager:
-    """Handles UI input from keypad."""
+    """Handles UI input from keypad.
+
+    Input latency is measured from the moment a press was first seen by the keypad to the
+    runner taking the key, so it includes the time keys typed ahead wait while the runner is
+    busy.
+    """
 
-    def __init__(self, layout: list[list[str]], rows: int, cols: int) -> None:
-        self.keypad = AsyncKeypad(layout, rows, cols)
+    def __init__(  # noqa: PLR0913
+        self,
+        layout: list[list[str]],
+        rows: int,
+        cols: int,
+        mode: str = KEYPAD_SCAN_MODE,
+        debounce: float = KEYPAD_DEBOUNCE,
+        queue_size: int = KEYPAD_QUEUE_SIZE,
+        overflow: str = KEYPAD_OVERFLOW,
+        chip: int = 0,
+    ) -> None:
+        self.keypad = AsyncKeypad(
+            layout, rows, cols,
+            mode=mode, debounce=debounce, queue_size=queue_size, overflow=overflow, chip=chip,
+        )
+        self.__keys = 0
+        self.__total_latency = 0.0
+        self.__max_latency = 0.0
 
     async def start(self) -> None:
         await self.keypad.start()
 
     async def get_key(self) -> str:
-        return await self.keypad.get_key()
+        event = await self.keypad.get_event()
+        latency = time.monotonic() - event.timestamp
+        self.__keys += 1
+        self.__total_latency += latency
+        self.__max_latency = max(self.__max_latency, latency)
+        return event.key
+
+    def get_stats(self) -> dict:
+        return {
+            **self.keypad.get_stats(),
+            "input_latency": self.__total_latency / self.__keys if self.__keys else 0.0,
+            "max_input_latency": self.__max_latency,
+        }
 
     async def close(self) -> None:
         await self.keypad.close()
 
 
+class Rotation:
+    """One rotation requested from the MotorScheduler."""
+
+    __slots__ = ("cancelled", "delays", "future", "loop", "motor", "next_step", "step_num")
+
+    def __init__(
+        self, motor: StepperMotor, steps: int, loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        self.motor = motor
+        # Precomputed by the motor's motion profile, the stepping thread only indexes it
+        self.delays = motor.step_delays(steps)
+        self.step_num = 0
+        self.next_step = 0.0
+        self.loop = loop
+        self.future = loop.create_future()
+        self.cancelled = False
+
+    def resolve(self, error: BaseException | None = None) -> None:
+        # Called from the stepping thread, the future belongs to the event loop
+        self.loop.call_soon_threadsafe(_resolve, self.future, error)
+
+
+class MotorScheduler:
+    """Runs several stepper motors at once within a power budget, on one timing source.
+
+    Rotations wait in FIFO order until their motor is free and enough of the budget
+    (max_coils, coils energized at the same time) is left for the motor's worst case step.
+    A dedicated stepping thread keeps the next step deadline of every running motor (each
+    follows its own motion profile) and sleeps on one StepClock until the earliest, so the
+    step sequences of all motors interleave on the same clock, with absolute deadlines that
+    the event loop (LCD, keypad, network) cannot stretch. Coroutines only await completion.
+
+    Methods
+    -------
+    async def rotate(self, motor, quarter_rotations) -> None
+        Rotate a motor once it is admitted, returns when the rotation has finished
+    def get_stats(self) -> dict
+        Returns target and achieved step rates, the most motors run at once and peak coil use
+    def close(self) -> None
+        Stop the stepping thread, running motors are turned off
+
+    """
+
+    def __init__(self, max_coils: int = MAX_ENERGIZED_COILS) -> None:
+        self.max_coils = max_coils
+        self.clock = StepClock()
+
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__closed = False
+        self.__thread: threading.Thread | None = None
+
+        self.__waiting: list[Rotation] = []
+        self.__running: list[Rotation] = []
+        self.__coils_in_use = 0
+
+        self.__peak_motors = 0
+        self.__peak_coils = 0
+
+    async def rotate(self, motor: StepperMotor, quarter_rotations: int) -> None:
+        rotation = Rotation(
+            motor, motor.total_steps(quarter_rotations), asyncio.get_running_loop())
+        with self.__lock:
+            self.__waiting.append(rotation)
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__step_loop, name="motor-scheduler", daemon=True)
+                self.__thread.start()
+        self.__wake.set()
+
+        try:
+            await asyncio.shield(rotation.future)
+        except asyncio.CancelledError:
+            # The stepping thread stops the motor at its next tick
+            rotation.cancelled = True
+            raise
+
+    def get_stats(self) -> dict:
+        return {
+            **self.clock.get_stats(),
+            "peak_motors": self.__peak_motors,
+            "peak_coils": self.__peak_coils,
+        }
+
+    def close(self) -> None:
+        self.__closed = True
+        self.__wake.set()
+
+    def __admit(self) -> None:
+        # Caller holds the lock
+        busy = {id(rotation.motor) for rotation in self.__running}
+        for rotation in list(self.__waiting):
+            motor = rotation.motor
+            if rotation.cancelled:
+                self.__waiting.remove(rotation)
+                continue
+            if id(motor) in busy:
+                continue
+            # A motor that needs more than the whole budget still runs, but only alone
+            fits = self.__coils_in_use + motor.max_energized_coils <= self.max_coils
+            if not fits and self.__running:
+                break
+            self.__waiting.remove(rotation)
+            try:
+                motor.begin()
+            except Exception as e:  # noqa: BLE001
+                rotation.resolve(e)
+                continue
+            busy.add(id(motor))
+            self.__coils_in_use += motor.max_energized_coils
+            rotation.next_step = time.perf_counter()
+            self.__running.append(rotation)
+
+        self.__peak_motors = max(self.__peak_motors, len(self.__running))
+        self.__peak_coils = max(self.__peak_coils, self.__coils_in_use)
+
+    def __finish(self, rotation: Rotation, error: BaseException | None = None) -> None:
+        # Caller holds the lock
+        self.__running.remove(rotation)
+        self.__coils_in_use -= rotation.motor.max_energized_coils
+        try:
+            rotation.motor.end()
+        finally:
+            rotation.resolve(error)
+
+    def __step_loop(self) -> None:
+        raise_thread_priority()
+        while not self.__closed:
+            self.__wake.wait()
+            self.__wake.clear()
+            with self.__lock:
+                self.__admit()
+                running = bool(self.__running)
+            if running:
+                self.__run_ticks()
+
+        with self.__lock:
+            for rotation in list(self.__running):
+                self.__finish(rotation, asyncio.CancelledError())
+            for rotation in self.__waiting:
+                rotation.resolve(asyncio.CancelledError())
+            self.__waiting = []
+            self.__thread = None
+
+    def __run_ticks(self) -> None:
+        self.clock.start()
+        while True:
+            with self.__lock:
+                self.__admit()
+                if not self.__running:
+                    return
+                deadline = min(rotation.next_step for rotation in self.__running)
+
+            self.clock.wait_until(deadline)
+
+            with self.__lock:
+                now = time.perf_counter()
+                for rotation in list(self.__running):
+                    if rotation.next_step > deadline and not self.__closed:
+                        continue
+                    if (
+                        self.__closed or rotation.cancelled
+                        or rotation.step_num == len(rotation.delays)
+                    ):
+                        # The wait after the last step has passed, same as rotate_motor
+                        self.__finish(rotation)
+                        continue
+                    try:
+                        rotation.motor.step(rotation.step_num)
+                    except Exception as e:  # noqa: BLE001
+                        self.__finish(rotation, e)
+                        continue
+                    delay = rotation.delays[rotation.step_num]
+                    rotation.step_num += 1
+                    if now - rotation.next_step > delay:
+                        # Too late to catch up without a burst of steps, restart the schedule
+                        # from now like StepClock.wait
+                        rotation.next_step = now
+                    rotation.next_step += delay
+
+
+def _resolve(future: asyncio.Future, error: BaseException | None) -> None:
+    if future.done():
+        return
+    if isinstance(error, asyncio.CancelledError):
+        future.cancel()
+    elif error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(None)
+
+
 class DispenserManager:
-    """Handles running motors for item dispensing."""
+    """Handles running motors for item dispensing.
+
+    Motors run through a MotorScheduler, so dispenses of different slots overlap as far as the
+    power budget allows. A budget of one motor's worth of coils dispenses serially.
+    """
 
-    def __init__(self, motor_grid: list[list[StepperMotor]]) -> None:
+    def __init__(
+        self, motor_grid: list[list[StepperMotor]], max_coils: int = MAX_ENERGIZED_COILS,
+    ) -> None:
         self.motors = motor_grid
+        self.scheduler = MotorScheduler(max_coils)
 
     async def dispense(self, row: int, col: int) -> None:
         motor = self.motors[row][col]
         print(motor.pins)
-        await motor.rotate_motor(4)
+        await self.scheduler.rotate(motor, DISPENSE_QUARTER_ROTATIONS)
+
+    async def dispense_many(self, slots: list[tuple[int, int]]) -> None:
+        await asyncio.gather(*(self.dispense(row, col) for row, col in slots))
+
+    def close(self) -> None:
+        self.scheduler.close()
+        for row in self.motors:
+            for motor in row:
+                motor.close()
+
+
+class DispenseQueue:
+    """Dispense jobs waiting for the motors, handed to the dispenser by a worker task.
+
+    Selections are queued as soon as they are paid for, so the customer can keep choosing
+    items while the motors turn instead of waiting out every rotation. Queued jobs run as soon
+    as the dispenser's motor scheduler admits them, several at once within its power budget.
+
+    Methods
+    -------
+    async def start(self) -> None
+        Start the worker task
+    def submit(self, slot_name, row, col) -> int
+        Queue a dispense, returns the number of dispenses queued or running including it
+    def pending(self) -> int
+        Number of dispenses queued or running
+    async def join(self) -> None
+        Wait until every queued dispense has finished
+    def get_stats(self) -> dict
+        Returns dispense counters and throughput in items per minute of dispensing
+    async def close(self) -> None
+        Stop the worker task
+
+    """
+
+    def __init__(self, dispenser: DispenserManager) -> None:
+        self.dispenser = dispenser
+        self.__queue: asyncio.Queue[tuple[str, int, int]] = asyncio.Queue()
+        self.__worker: asyncio.Task | None = None
+
+        self.__pending = 0
+        self.__dispensed = 0
+        self.__failures = 0
+        self.__busy_time = 0.0
+        self.__busy_since: float | None = None
+
+    async def start(self) -> None:
+        if self.__worker is None:
+            self.__worker = asyncio.create_task(self.__run())
+
+    def submit(self, slot_name: str, row: int, col: int) -> int:
+        if self.__busy_since is None:
+            self.__busy_since = time.perf_counter()
+        self.__queue.put_nowait((slot_name, row, col))
+        self.__pending += 1
+        return self.__pending
+
+    def pending(self) -> int:
+        return self.__pending
+
+    async def join(self) -> None:
+        await self.__queue.join()
+
+    def get_stats(self) -> dict:
+        busy_time = self.__busy_time
+        if self.__busy_since is not None:
+            busy_time += time.perf_counter() - self.__busy_since
+        return {
+            "pending": self.pending(),
+            "dispensed": self.__dispensed,
+            "failures": self.__failures,
+            "busy_time": busy_time,
+            "items_per_minute": self.__dispensed * 60 / busy_time if busy_time else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self.__worker is not None:
+            self.__worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.__worker
+            self.__worker = None
+
+    async def __run(self) -> None:
+        # Jobs are handed to the dispenser as they arrive, its motor scheduler decides how many
+        # run at once
+        jobs: set[asyncio.Task] = set()
+        try:
+            while True:
+                job = await self.__queue.get()
+                task = asyncio.create_task(self.__dispense(*job))
+                jobs.add(task)
+                task.add_done_callback(jobs.discard)
+        finally:
+            for task in jobs:
+                task.cancel()
+
+    async def __dispense(self, slot_name: str, row: int, col: int) -> None:
+        try:
+            await self.dispenser.dispense(row, col)
+            self.__dispensed += 1
+            print(f"Dispensed slot {slot_name}, {self.__pending - 1} left in queue")
+        except Exception as e:  # noqa: BLE001
+            # The sale is already recorded, keep the queue moving for the other items
+            self.__failures += 1
+            print(f"Error dispensing slot {slot_name}: ", e)
+        finally:
+            self.__pending -= 1
+            self.__queue.task_done()
+            if self.__pending == 0 and self.__busy_since is not None:
+                self.__busy_time += time.perf_counter() - self.__busy_since
+                self.__busy_since = None
 
 
 class DisplayManager:
-    """Handles displaying text on LCD display."""
+    """Handles displaying text on LCD display.
+
+    The display is an actor: show_text posts the desired contents of a line and returns
+    immediately, a single render task draws them. Texts posted for a line while the LCD is
+    still busy replace each other, only the newest one is drawn, so keypad handling never waits
+    on the LCD and stale frames are never drawn.
+
+    Methods
+    -------
+    async def start(self) -> None
+        Initialize the LCD and start the render task
+    def show_text(self, text, line) -> None
+        Post the text a line should show
+    def clear_text(self, line) -> None
+        Post an empty line
+    async def flush(self) -> None
+        Wait until every posted text has been drawn
+    def get_stats(self) -> dict
+        Returns how many texts were posted, drawn and skipped for a newer one
+    async def close(self) -> None
+        Stop the render task
+
+    """
 
     def __init__(self, lcd_config: dict) -> None:
         self.lcd = LCDDisplay(**lcd_config)
+        self.__pending: dict[int, str] = {}
+        self.__wake = asyncio.Event()
+        self.__drawn_all = asyncio.Event()
+        self.__drawn_all.set()
+        self.__renderer: asyncio.Task | None = None
+
+        self.__posted = 0
+        self.__drawn = 0
 
     async def start(self) -> None:
         await self.lcd.init()
+        if self.__renderer is None:
+            self.__renderer = asyncio.create_task(self.__render())
+
+    def show_text(self, text: str, line: int) -> None:
+        self.__pending[line] = text
+        self.__posted += 1
+        self.__drawn_all.clear()
+        self.__wake.set()
+
+    def clear_text(self, line: int) -> None:
+        self.show_text("", line)
 
-    async def show_text(self, text: str, line: int) -> None:
-        await self.lcd.clear_line(line)
-        await self.lcd.write(text, line=line)
+    async def flush(self) -> None:
+        await self.__drawn_all.wait()
+
+    def get_stats(self) -> dict:
+        return {
+            "posted": self.__posted,
+            "drawn": self.__drawn,
+            "coalesced": self.__posted - self.__drawn - len(self.__pending),
+        }
+
+    async def close(self) -> None:
+        if self.__renderer is not None:
+            self.__renderer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.__renderer
+            self.__renderer = None
 
-    async def clear_text(self, line: int) -> None:
-        await self.lcd.clear_line(line)
+    async def __render(self) -> None:
+        while True:
+            await self.__wake.wait()
+            self.__wake.clear()
+            # Lines are drawn in the order they were first posted, each with its newest text
+            while self.__pending:
+                line = next(iter(self.__pending))
+                text = self.__pending.pop(line)
+                try:
+                    # Only the characters that changed are sent, drawing the same text is free
+                    await self.lcd.write(text, line=line)
+                except Exception as e:  # noqa: BLE001
+                    # A failed frame is replaced by the next one, keep rendering
+                    print("Error drawing display: ", e)
+                self.__drawn += 1
+            self.__drawn_all.set()
@@ -1,47 +1,76 @@
 # customer/mqtt.py
 
-import threading
-import time
 import json
-import requests
-import subprocess
-import shutil
 import os
-from typing import Optional, Dict, Any
+import shutil
+import subprocess
+import threading
+import time
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 import paho.mqtt.client as mqtt
+import requests
 from api_constants import BROKER_HOST, GEO_API_KEY
 from inventory_manager import InventoryManager
 
+
 class MQTTConnection:
     """Service handling restocks, health checks, and precise location reporting."""
 
     @staticmethod
-    def start_mqtt_connection(hardware_id: str, inv_man: InventoryManager) -> None:
+    def handle_message(
+        hardware_id: str,
+        inv_man: InventoryManager,
+        on_restock: Callable[[], Any],
+        topic: str,
+        payload: bytes,
+    ) -> None:
+        """Handle a message on one of the topics of this vending machine."""
+        if topic == f"vm/restocked/{hardware_id}":
+            print("Restocked, syncing from database:")
+            on_restock()
+        elif topic == f"vm/mode/{hardware_id}":
+            # The payload is the mode the database now has (i, r or t)
+            inv_man.apply_remote_mode(payload.decode())
+
+    @staticmethod
+    def start_mqtt_connection(
+        hardware_id: str,
+        inv_man: InventoryManager,
+        on_restock: Callable[[], Any] | None = None,
+    ) -> None:
+        # on_restock runs on the MQTT thread; by default it resyncs inv_man synchronously
+        if on_restock is None:
+            on_restock = inv_man.sync_from_database
+
         # 1) Standard MQTT setup
         client = mqtt.Client(client_id=hardware_id, clean_session=False)
-        client.on_message = lambda c, u, m: (
-            print("Restocked, syncing from database:") or
-            inv_man.sync_from_database()
-            if m.topic == f"vm/restocked/{hardware_id}" else None
-        )
+
+        def on_message(_c: mqtt.Client, _u: object, m: mqtt.MQTTMessage) -> None:
+            MQTTConnection.handle_message(hardware_id, inv_man, on_restock, m.topic, m.payload)
+
+        client.on_message = on_message
+        # Mode notifications can be missed while disconnected, so stop trusting the cache
+        client.on_disconnect = lambda _c, _u, _rc: inv_man.mode_notifications_lost()
 
         status_topic = f"vm/status/{hardware_id}"
         client.will_set(status_topic, "offline", qos=1, retain=True)
-        client.on_connect = lambda c, u, f, rc: (
+        client.on_connect = lambda c, _u, _f, _rc: (
             c.publish(status_topic, "online", qos=1, retain=True)
         )
 
         client.connect(BROKER_HOST, 3306, 60)
         client.subscribe(f"vm/restocked/{hardware_id}", qos=1)
+        client.subscribe(f"vm/mode/{hardware_id}", qos=1)
         threading.Thread(target=client.loop_forever, daemon=True).start()
 
         # 2) Prepare HTTP session for geolocation and IP lookup
         session = requests.Session()
         session.headers.update({'Content-Type': 'application/json'})
 
-        def fetch_public_ip() -> Optional[str]:
+        def fetch_public_ip() -> str | None:
             resp = session.get('https://api.ipify.org?format=json', timeout=5)
             resp.raise_for_status()
             ip = resp.json().get('ip')
@@ -102,10 +131,10 @@ class MQTTConnection:
                 print(f"Unexpected live Wi-Fi scan failure: {e}")
                 return []
 
-        def fetch_geolocation(wifi_aps: Optional[list] = None) -> Optional[Dict[str, Any]]:
+        def fetch_geolocation(wifi_aps: list | None = None) -> dict[str, Any] | None:
             """Call Google's Geolocation API with Wi-Fi hints for maximum accuracy."""
             # Prepare request body
-            body: Dict[str, Any] = {'considerIp': not bool(wifi_aps)}
+            body: dict[str, Any] = {'considerIp': not bool(wifi_aps)}
             if wifi_aps:
                 body['wifiAccessPoints'] = wifi_aps
 
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import exceptions as err
+from api_constants import BAD_REQUEST
+from enum_types import InventoryManagerMode
+from transaction_pipeline import TransactionPipeline
+
+if TYPE_CHECKING:
+    from api_operation import Operation
+    from inventory_manager import InventoryManager
+
+
+class VendingMachineCore:
+    """Transaction logic shared by VendingMachine and AsyncVendingMachine.
+
+    Holds the state of the current transaction. Steps that reach the database are defined once
+    as operations (see api_operation), VendingMachine runs them with blocking I/O and
+    AsyncVendingMachine with awaitable I/O.
+
+    Attributes
+    ----------
+    inv_man: InventoryManager
+        Inventory manager whose operations the transaction steps are built from
+    pipeline: TransactionPipeline
+        Runs the charge and the inventory write of end_transaction concurrently, keeps timing
+        stats for every stage
+
+    Methods
+    -------
+    def connect_op(self, rows, columns) -> Operation[None]
+        Register the machine if the database has no dimensions for it, send sales journaled
+        before a restart and load its data from the database
+    def list_options(self) -> str
+        Returns a string representation of the inventory of the vending machine
+    def start_transaction_op(self) -> Operation[None]
+        Sets mode of inv_man to TRANSACTION and gets a stripe payment token
+    def buy_item(self, slot_name) -> str
+        Only callable if mode of inv_man is TRANSACTION, adds price of item to transaction_price
+    def buy_free_item_op(self, slot_name) -> Operation[str]
+        Dispense a free item, reserved locally and saved in the background when there is a
+        journal and the mode is confirmed (see InventoryManager.mode_confirmed), otherwise in a
+        transaction of its own
+    def amount_due(self) -> float
+        Only callable if mode of inv_man is TRANSACTION, returns the part of transaction_price
+        an earlier end_transaction attempt did not charge yet
+    def charge_op(self, due) -> Operation[None]
+        Charge due to the customer's payment method and record it as paid
+    def finish_transaction(self) -> float
+        Clear transaction_price and stripe_payment_token, returns total purchase price
+    def get_price(self, slot_name) -> float
+        Returns the price of the item in a slot
+    def reload_data_op(self) -> Operation[list[str]]
+        Loads up to date information from the database, returns the names of changed slots
+
+    """
+
+    def __init__(self, inv_man: InventoryManager) -> None:
+        self.inv_man = inv_man
+        self.pipeline = TransactionPipeline()
+
+        self.__stripe_payment_token: str = None
+        self.__transaction_price: float = 0
+        self.__paid_price: float = 0
+
+
+    def connect_op(self, rows: int, columns: int) -> Operation[None]:
+        hardware_id = self.inv_man.hardware_id
+
+        # Check if vending machine is registered in database, if not register it
+        vm_db = yield "get_vending_machine", (hardware_id,)
+        if(vm_db["vm_row_count"] == 0 or vm_db["vm_column_count"] == 0):
+            try:
+                yield "register_vending_machine", (hardware_id, rows, columns)
+            except err.QueryFailureError as e:
+                # If error code is 400, vending machine exists so we ignore the error.
+                if e.status_code != BAD_REQUEST:
+                    raise
+
+        # Send sales journaled before a restart, then load data from database
+        if self.inv_man.journal is not None:
+            yield "replay_journal", (self.inv_man.journal_replayer,)
+        yield from self.inv_man.sync_from_database_op()
+
+
+    def list_options(self) -> str:
+        return self.inv_man.get_stock_information()
+
+
+    def start_transaction_op(self) -> Operation[None]:
+        # set_mode will check that mode is in correct state(IDLE), throws error otherwise
+        yield from self.inv_man.set_mode_op(InventoryManagerMode.TRANSACTION)
+
+        # Temporary function to get card info
+        # card_number, exp_month, exp_year, cvc = CardInfo.get_card_info()  # noqa: ERA001
+        card_number, exp_month, exp_year, cvc = "","","",""
+
+        # stripe API implementation to log user in and obtain API token
+        try:
+            self.__stripe_payment_token = yield "get_payment_token", (
+                card_number, exp_month, exp_year, cvc)
+        except err.BackendUnavailableError:
+            # Payments need the API, don't leave the machine stuck in TRANSACTION
+            yield from self.inv_man.set_mode_op(InventoryManagerMode.IDLE)
+            raise
+
+
+    def buy_item(self, slot_name: str) -> str:
+        if self.inv_man.get_mode() is not InventoryManagerMode.TRANSACTION:
+            raise err.InvalidModeError(
+                "buy_item() can only be called when transaction is "
+                "in progress. Call start_transaction() first",
+            )
+
+        purchase_price = self.inv_man.change_stock(slot_name, -1)
+        self.__transaction_price = round(self.__transaction_price + purchase_price, 2)
+        return self.inv_man.get_item(slot_name).get_name()
+
+
+    def buy_free_item_op(self, slot_name: str) -> Operation[str]:
+        item = self.inv_man.get_item(slot_name)
+
+        # Ensure that the item that you're dispensing for free is ACTUALLY free.
+        if item.get_cost() != 0:
+            raise err.NotFreeItemError("Cost of slot must be 0 to use this function.")
+
+        if self.inv_man.journal is None or not self.inv_man.mode_confirmed():
+            # Without a journal the sale is only durable once the database has it. Without a
+            # leased mode that MQTT confirmed, a remote mode change may not have reached us yet,
+            # so the database has to approve the dispense with a compare-and-set.
+            yield from self.inv_man.set_mode_op(InventoryManagerMode.TRANSACTION)
+            self.inv_man.change_stock(slot_name, -1)
+            yield from self.inv_man.save_inventory_to_db_op()
+            yield from self.inv_man.set_mode_op(InventoryManagerMode.IDLE)
+            return item.get_name()
+
+        # Fast path: nothing is charged, so there is no transaction to hold the machine for.
+        # The cached mode is confirmed, the unit is reserved locally and journaled, the motor can
+        # start right away and the replayer saves the stock change (merging it with concurrent
+        # writes) in the background.
+        self.__check_free_item_mode()
+        self.inv_man.change_stock(slot_name, -1)
+        self.inv_man.defer_inventory_save()
+
+        return item.get_name()
+
+
+    def amount_due(self) -> float:
+        # This check is necessary because we want to make sure inv_man is in the correct state but
+        # we want to change to IDLE only AFTER all operations (api and variables reset) are done.
+        if self.inv_man.get_mode() is not InventoryManagerMode.TRANSACTION:
+            raise err.InvalidModeError(
+                "Transaction is not currently in progress, start a transaction first",
+            )
+
+        # Only what an earlier attempt did not charge yet is due
+        return round(self.__transaction_price - self.__paid_price, 2)
+
+    def charge_op(self, due: float) -> Operation[None]:
+        # Use stripe API to charge the amount due with self.stripe_payment_token
+        yield "charge", (self.__stripe_payment_token, int(due * 100))
+        self.__paid_price = round(self.__paid_price + due, 2)
+
+    def finish_transaction(self) -> float:
+        out = self.__transaction_price
+        self.__transaction_price = 0
+        self.__paid_price = 0
+        self.__stripe_payment_token = None
+        return out
+
+
+    def get_price(self, slot_name: str) -> float:
+        return self.inv_man.get_item(slot_name).get_cost()
+
+
+    def reload_data_op(self) -> Operation[list[str]]:
+        yield from self.inv_man.sync_from_database_op()
+        return self.inv_man.last_sync_changes
+
+
+    def __check_free_item_mode(self) -> None:
+        # Same rule set_mode(TRANSACTION) would enforce, checked against the cached mode
+        if self.inv_man.get_mode() is not InventoryManagerMode.IDLE:
+            raise err.InvalidModeError(
+                "Free items can only be dispensed while IDLE, not " + str(self.inv_man.get_mode()))
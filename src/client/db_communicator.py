@@ -1,17 +1,26 @@
 #TODO: put into env file
 from __future__ import annotations  # noqa: F404
 
+import json
+from typing import TYPE_CHECKING
+
 import exceptions as err
 import requests
 import stripe
 from api_constants import (
     BACKEND_HOST,
+    BAD_REQUEST,
+    CONFLICT,
     INVENTORY_ROUTE,
     ITEMS_ROUTE,
     MACHINES_ROUTE,
     REQUEST_HEADERS,
-    TIMEOUT,
+    STRIPE_ROUTE,
 )
+from http_transport import get_transport
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 
 def string_builder(*args):
@@ -19,8 +28,47 @@ def string_builder(*args):
 
 #This class should only be used in the inventory manager file allowing complete filtered request
 #to be made to the server side mySQL on the docker.
-
-class VMs:
+#All requests go through the shared keep-alive transport so connections to the API are reused.
+#The endpoints are defined once and shared with async_db_communicator, each instance sends its
+#requests through the send function it was built with.
+
+def send(
+    method: str, route: tuple[str, ...], payload: object = None, params: dict | None = None,
+) -> (dict | list | None):
+    """Send a request to BACKEND_HOST/route and return the decoded response body."""
+    api_route = string_builder(BACKEND_HOST, *route)
+    kwargs = {} if payload is None else {"json": payload, "headers": REQUEST_HEADERS}
+    try:
+        response = get_transport().request(method, api_route, params=params, **kwargs)
+    except requests.exceptions.Timeout as e:
+        raise TimeoutError(f"API request timed out: {e}") from e
+    except requests.exceptions.ConnectionError as e:
+        raise ConnectionError(f"Failed to connect to API: {e}") from e
+    except requests.exceptions.RequestException as e:
+        raise err.QueryFailureError("Error: " + str(e), status_code=None) from e
+
+    body = decode(response.text)
+    check_status(response.status_code, body, api_route)
+    return body
+
+
+def decode(text: str) -> object:
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return text
+
+
+def check_status(status: int, body: object, api_route: str) -> None:
+    """Raise the error the API answered with, shared with async_db_communicator."""
+    if status == CONFLICT and isinstance(body, dict) and "conflicts" in body:
+        # Rows with a stale expected_version, the body holds the current rows
+        raise err.InventoryConflictError(f"Error: {status} for url: {api_route}", body["conflicts"])
+    if status >= BAD_REQUEST:
+        raise err.QueryFailureError(f"Error: {status} for url: {api_route}", status_code=status)
+
+
+class VMRoutes:
     """Class for all api calls pertaining to vending machine IDs and set up.
 
     Methods
@@ -31,47 +79,34 @@ class VMs:
         Pull specific VM based on the UNIQUEID on the Vending_machines table
     post_machine(self, id:str, name:str, row:int, column:int, vm_mode:str)
         Insert new machine into the Vending_machines table
+    register_machine(self, id:str, row:int, column:int)
+        Register hardware side dimensions of a machine
     delete_machine(self, id:str)
         Remove a specific machine based on it's UNIQUEID on the VM table
-    alter_mode(self, id:str,mode:str)
-        Change the mode of a specific machine
+    alter_mode(self, id:str,mode:str,expected_mode:str)
+        Change the mode of a specific machine, only if it is expected_mode when given
     alter_name(self, id:str, name:str)
         Update name of a machine by ID
 
     """
 
+    def __init__(self, send: Callable) -> None:
+        self.__send = send
+
     #Pull all VMs
-    @staticmethod
-    def get_machines() -> (dict | None):
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE)
-        try:
-            response = requests.get(api_route, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+    def get_machines(self) -> (dict | None):
+        return self.__send("GET", (MACHINES_ROUTE,))
 
     #Pull specific VM based on the UNIQUEID on the Vending_machines table
-    @staticmethod
-    def get_single_machine(hardware_id:str) -> dict:
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id)
-        try:
-            response = requests.get(api_route, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+    def get_single_machine(self, hardware_id:str) -> dict:
+        return self.__send("GET", (MACHINES_ROUTE, hardware_id))
 
     #Insert new machine into the Vending_machines table
     #example machine json format:
     # [vm_id:id, vm_name"name, vm_row_count:cnt, vm_column_count:cnt, vm_mode:mode]
     #Directly relates to columns in mySQL server
-    @staticmethod
-    def post_machine(hardware_id:str, name:str, row:int, column:int, vm_mode:str) -> dict:
+    def post_machine(
+        self, hardware_id:str, name:str, row:int, column:int, vm_mode:str) -> dict:
         new_info = {
             'vm_id':hardware_id,
             'vm_name':name,
@@ -79,81 +114,33 @@ class VMs:
             'vm_column_count': column,
             'vm_mode':vm_mode,
         }
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE)
-        try:
-            response = requests.post(api_route, json=new_info, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
-
+        return self.__send("POST", (MACHINES_ROUTE,), new_info)
 
     # Register hardware side vending machine
-    @staticmethod
-    def register_machine(hardware_id:str, row:int, column: int) -> dict:
+    def register_machine(self, hardware_id:str, row:int, column: int) -> dict:
         new_info = {
             'vm_row_count':row,
             'vm_column_count': column,
         }
-
-        api_route = string_builder(BACKEND_HOST, MACHINES_ROUTE, hardware_id, "register")
-        try:
-            response = requests.patch(api_route, json=new_info, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
-
+        return self.__send("PATCH", (MACHINES_ROUTE, hardware_id, "register"), new_info)
 
     #Remove a specific machine based on it's UNIQUEID on the VM table
-    @staticmethod
-    def delete_machine(hardware_id:str) -> dict:
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id)
-
-        try:
-            response = requests.delete(api_route, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+    def delete_machine(self, hardware_id:str) -> dict:
+        return self.__send("DELETE", (MACHINES_ROUTE, hardware_id))
 
     #enum_types of MODE: i, r, t
-    @staticmethod
-    def alter_mode(hardware_id:str, mode:str) -> dict:
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id,'mode')
+    def alter_mode(self, hardware_id:str, mode:str, expected_mode:str | None = None) -> dict:
         payload = {"vm_mode": mode}
-
-        try:
-            response = requests.patch(api_route, json=payload, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+        # Compare-and-set, the API answers 409 if the mode is no longer expected_mode
+        if expected_mode is not None:
+            payload["expected_mode"] = expected_mode
+        return self.__send("PATCH", (MACHINES_ROUTE, hardware_id, 'mode'), payload)
 
     #Update name of a machine by ID
-    @staticmethod
-    def alter_name(hardware_id:str, name:str) -> dict:
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id,'name')
-        payload = {"vm_name": name}
-
-        try:
-            response = requests.patch(api_route, json=payload, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
-
-class AllItems:
+    def alter_name(self, hardware_id:str, name:str) -> dict:
+        return self.__send("PATCH", (MACHINES_ROUTE, hardware_id, 'name'), {"vm_name": name})
+
+class AllItemsRoutes:
     """Class for all items available for stocking.
 
     Methods
@@ -163,80 +150,56 @@ class AllItems:
 
     """
 
+    def __init__(self, send: Callable) -> None:
+        self.__send = send
+
     #Query all available items for stocking
-    @staticmethod
-    def get_items() -> dict:
-        api_route = string_builder(BACKEND_HOST,ITEMS_ROUTE)
-
-        try:
-            response = requests.get(api_route, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
-
-class VMItems:
+    def get_items(self) -> dict:
+        return self.__send("GET", (ITEMS_ROUTE,))
+
+class VMItemsRoutes:
     """Class for items within specific machines.
 
     Methods
     -------
-    get_items(self, id:str)
-        Gets all items within a specific machine
-    add_to_slot(self, id:str, slot_name:str)
-        Add an item to a specific slot
-    update_item_in_slot(self, id:str, slot_name:str, item:str)
-        Update an item in a specific slot
-    delete_item_in_slot(self, id:str, slot_name:str, item:str)
-        Delete an item in a specific slot
+    get_items(self, id:str, since:int)
+        Gets all items within a specific machine, or only those changed after version since
     update_vm_inv(self, id:str,inventory:list[dict])
-        Update the inventory of a specific machine with changelog
+        Update the inventory of a specific machine with changelog, raises
+        InventoryConflictError if a row's expected_version is stale
 
     """
 
-    @staticmethod
-    def get_items(hardware_id:str) -> (dict | None):
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id,INVENTORY_ROUTE)
-
-        try:
-            response = requests.get(api_route, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+    def __init__(self, send: Callable) -> None:
+        self.__send = send
 
-    @staticmethod
-    def update_vm_inv(hardware_id:str,updated_inventory:list[dict]) -> (dict | None):
-        api_route = string_builder(BACKEND_HOST,MACHINES_ROUTE,hardware_id,INVENTORY_ROUTE)
+    def get_items(self, hardware_id:str, since:int | None = None) -> (dict | list | None):
+        params = None if since is None else {"since": since}
+        return self.__send("GET", (MACHINES_ROUTE, hardware_id, INVENTORY_ROUTE), params=params)
 
-        try:
-            response = requests.post(
-                api_route, json=updated_inventory, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+    def update_vm_inv(self, hardware_id:str,updated_inventory:list[dict]) -> (dict | None):
+        return self.__send(
+            "POST", (MACHINES_ROUTE, hardware_id, INVENTORY_ROUTE), updated_inventory)
 
 
-class Stripe:
+class StripeRoutes:
     """Class for handling stripe payment tokens.
 
     Methods
     -------
     create_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int)
-        Creates a payment token for a card
+        Creates a payment token for a card, client side so never awaited
     charge_card(amount: int, payment_token: str = "")
         Charges a payment method for a certain amount
 
     """
 
+    def __init__(self, send: Callable) -> None:
+        self.__send = send
+
     @staticmethod
-    def create_payment_token(card_number: str, exp_month: int, exp_year: int, cvc: str) -> (str | None):
+    def create_payment_token(
+        card_number: str, exp_month: int, exp_year: int, cvc: str) -> (str | None):  # noqa: ARG004
         # try:
         #     token = stripe.Token.create(
         #     card={
@@ -253,19 +216,15 @@ class Stripe:
 
         return "placeholdertoken"
 
-    @staticmethod
-    def charge_card(amount: int, payment_token: str = "") -> (dict | None):
-        api_route = string_builder(BACKEND_HOST, "stripes", "pay")
+    def charge_card(self, amount: int, payment_token: str = "") -> (dict | None):
         payload = {"amount": amount, "token": payment_token}
+        return self.__send("POST", (STRIPE_ROUTE, "pay"), payload)
+
 
-        try:
-            response = requests.post(api_route, json=payload, headers=REQUEST_HEADERS, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.ConnectionError as e:
-            raise ConnectionError(f"Failed to connect to API: {e}") from e
-        except requests.exceptions.RequestException as e:
-            raise err.QueryFailureError("Error: " + str(e), status_code=response.status_code) from e
+VMs = VMRoutes(send)
+AllItems = AllItemsRoutes(send)
+VMItems = VMItemsRoutes(send)
+Stripe = StripeRoutes(send)
 
 func_dict = {
         'get_machines': VMs.get_machines,
@@ -289,7 +248,7 @@ param_dict = {
     'alter_mode': "id, mode(i, j, t)",
     'alter_name': "id, name",
     'get_items': "none",
-    'get_vm_items': "id",
+    'get_vm_items': "id, since(optional)",
     'update_vm_inv': "id:str,update:str",
     'create_payment_token': "card_number, exp_month, exp_year, cvc",
     'charge_card': "amount, payment_token",
@@ -1,43 +1,157 @@
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
 from functools import wraps
 
+import exceptions as err
 import requests
 from api_constants import (
     BACKEND_HOST,
+    HEALTH_PROBE_INTERVAL,
+    HEALTH_ROUTE,
     SUCCESS,
 )
+from circuit_breaker import CircuitBreaker, get_breaker
+from enum_types import CircuitState
+from http_transport import get_transport
 
 
-# Repeatedly pings health endpoint of api until valid response is received
-def ping_endpoint():
-    print("Connecting...")
-    while(True):
-        try:
-            response = requests.get(BACKEND_HOST + "/health", timeout=5)
-            if response.status_code == SUCCESS:
-                print("Connection success!")
-                return
-            print("Connection failed: retrying...")
-        except requests.exceptions.RequestException:
-            pass
-        time.sleep(5)
+# Decorator for all endpoint calling functions. Calls go through the shared circuit breaker:
+# failures are recorded, retries are spaced out with jittered exponential backoff, and while the
+# API is known to be down calls either wait for the next trial or, in fail fast mode, raise
+# BackendUnavailableError immediately instead of blocking the caller.
+def circuit_breaker_guard():
+    def decorator(func):  # noqa: ANN001, ANN202
+        @wraps(func)
+        def wrapper(*args, **kwargs):  # noqa: ANN003, ANN202
+            breaker = get_breaker()
+            while True:
+                if not breaker.allow_request():
+                    if breaker.fail_fast:
+                        raise err.BackendUnavailableError(
+                            "API is unavailable", retry_in=breaker.time_until_retry())
+                    print(f"API unavailable. Retrying in {breaker.time_until_retry():.1f}s...")
+                    breaker.wait_until_available()
+                    continue
+
+                try:
+                    result = func(*args, **kwargs)
+                except err.BackendUnavailableError:
+                    # Raised by a nested guarded call that already updated the breaker
+                    raise
+                except (ConnectionError, TimeoutError) as e:
+                    breaker.record_failure()
+                    if breaker.fail_fast and breaker.get_state() is CircuitState.OPEN:
+                        raise err.BackendUnavailableError(
+                            "Lost connection to API", retry_in=breaker.time_until_retry(),
+                        ) from e
+                    print("Lost connection. Retrying request...")
+                    time.sleep(breaker.failure_delay())
+                    continue
+                except Exception:
+                    # The API answered (e.g. 404), so it is reachable
+                    breaker.record_success()
+                    raise
+
+                breaker.record_success()
+                return result
+        return wrapper
+    return decorator
 
 
-# Decorator for all endpoint calling functions that tries to call the endpoint
-# If the initial call fails, we ping the api till reconnection, then call it again
-def ping_endpoint_till_connect():
+# Awaitable version of circuit_breaker_guard, waits on the event loop instead of sleeping
+def async_circuit_breaker_guard():
     def decorator(func):  # noqa: ANN001, ANN202
         @wraps(func)
-        def wrapper(*args, **kwargs):  # noqa: ANN003, ANN202
+        async def wrapper(*args, **kwargs):  # noqa: ANN003, ANN202
+            breaker = get_breaker()
             while True:
+                if not breaker.allow_request():
+                    if breaker.fail_fast:
+                        raise err.BackendUnavailableError(
+                            "API is unavailable", retry_in=breaker.time_until_retry())
+                    print(f"API unavailable. Retrying in {breaker.time_until_retry():.1f}s...")
+                    await breaker.async_wait_until_available()
+                    continue
+
                 try:
-                    return func(*args, **kwargs)
-                except (ConnectionError, TimeoutError):  # noqa: PERF203
-                    print("Lost connection. Waiting for API to recover...")
-                    ping_endpoint()
-                    print("Retrying request...")
-                    # Loop will re-call func after API is back
+                    result = await func(*args, **kwargs)
+                except err.BackendUnavailableError:
+                    raise
+                except (ConnectionError, TimeoutError) as e:
+                    breaker.record_failure()
+                    if breaker.fail_fast and breaker.get_state() is CircuitState.OPEN:
+                        raise err.BackendUnavailableError(
+                            "Lost connection to API", retry_in=breaker.time_until_retry(),
+                        ) from e
+                    print("Lost connection. Retrying request...")
+                    await asyncio.sleep(breaker.failure_delay())
+                    continue
+                except Exception:
+                    breaker.record_success()
+                    raise
+
+                breaker.record_success()
+                return result
         return wrapper
     return decorator
+
+
+class HealthProber:
+    """Background thread that polls the health endpoint and keeps the circuit breaker current.
+
+    While the API is reachable it probes every interval seconds, so an outage opens the breaker
+    before a customer request runs into it. While the breaker is open it probes as soon as the
+    backoff allows, so the breaker closes again as soon as the API recovers.
+
+    Methods
+    -------
+    def start(self) -> None
+        Start probing on a daemon thread
+    def stop(self) -> None
+        Stop probing
+    def probe_once(self) -> bool
+        Probe the health endpoint once, update the breaker and return whether the API is up
+
+    """
+
+    def __init__(
+        self, breaker: CircuitBreaker | None = None, interval: float = HEALTH_PROBE_INTERVAL,
+    ) -> None:
+        self.breaker = breaker if breaker is not None else get_breaker()
+        self.interval = interval
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+
+    def probe_once(self) -> bool:
+        try:
+            response = get_transport().get(BACKEND_HOST + "/" + HEALTH_ROUTE)
+            healthy = response.status_code == SUCCESS
+        except requests.exceptions.RequestException:
+            healthy = False
+
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return healthy
+
+    def __run(self) -> None:
+        delay = 0.0
+        while not self.__stop.wait(delay):
+            if self.probe_once():
+                delay = self.interval
+            else:
+                delay = max(self.breaker.failure_delay(), self.breaker.base_delay)
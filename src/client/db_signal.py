@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import db_communicator
 import exceptions as err
 from api_constants import (
     NOT_FOUND,
 )
-from db_ping import ping_endpoint_till_connect
+from db_ping import circuit_breaker_guard
+
+if TYPE_CHECKING:
+    from inventory_journal import JournalReplayer
 
 
 class VendingMachines:
@@ -20,8 +25,9 @@ class VendingMachines:
     create_vending_machine(
             hardware_id: str, rowCount: int, columnCount: int, name:str = None, mode: str = "i")
         Create a new database entry for a vending machine
-    set_mode(hardware_id:str, new_mode: str)
-        Set the operating mode of vending machine in database
+    set_mode(hardware_id:str, new_mode: str, expected_mode: str)
+        Set the operating mode of vending machine in database, only if it is expected_mode
+        when given
     rename(hardware_id:str, new_name: str)
         Set the name of the vending machine in database
     delete_vending_machine(hardware_id:str)
@@ -30,7 +36,7 @@ class VendingMachines:
     """
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def vending_machine_exists(hardware_id:str) -> bool:
         try:
             VendingMachines.get_vending_machine(hardware_id)
@@ -40,28 +46,29 @@ class VendingMachines:
         else: return True
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def get_vending_machine(hardware_id:str) -> (dict | None):
         return db_communicator.VMs.get_single_machine(hardware_id)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def register_vending_machine(
         hardware_id:str, row_count:int, column_count:int) -> (dict | None):
         return db_communicator.VMs.register_machine(hardware_id, row_count, column_count)
 
     @staticmethod
-    @ping_endpoint_till_connect()
-    def set_mode(hardware_id:str, new_mode:str) -> (dict | None):
-        return db_communicator.VMs.alter_mode(hardware_id, new_mode)
+    @circuit_breaker_guard()
+    def set_mode(
+        hardware_id:str, new_mode:str, expected_mode:str | None = None) -> (dict | None):
+        return db_communicator.VMs.alter_mode(hardware_id, new_mode, expected_mode)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def rename(hardware_id:str, new_name:str) -> (dict | None):
         return db_communicator.VMs.alter_name(hardware_id, new_name)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def delete_vending_machine(hardware_id:str) -> (dict | None):
         res = db_communicator.VMs.delete_machine(hardware_id)
 
@@ -89,20 +96,21 @@ class Inventory:
 
     Methods
     -------
-    get_inventory_of_vending_machine(hardware_id: str)
-        Get all items associated with a vending machine
+    get_inventory_of_vending_machine(hardware_id: str, since: int)
+        Get all items associated with a vending machine, or only those changed after since
     update_database(hardware_id: str, inventory: list[dict[str, str]])
         Upload local changes stored in change_log to database
 
     """
 
     @staticmethod
-    @ping_endpoint_till_connect()
-    def get_inventory_of_vending_machine(hardware_id: str) -> (list[dict] | None):
-        return db_communicator.VMItems.get_items(hardware_id)
+    @circuit_breaker_guard()
+    def get_inventory_of_vending_machine(
+        hardware_id: str, since: int | None = None) -> (dict | list[dict] | None):
+        return db_communicator.VMItems.get_items(hardware_id, since)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def update_database(hardware_id: str, inventory: list[dict[str, str]]) -> (dict | None):
         return db_communicator.VMItems.update_vm_inv(hardware_id, inventory)
 
@@ -120,20 +128,80 @@ class Stripe:
     """
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def get_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int) -> str:
         return db_communicator.Stripe.create_payment_token(card_number, exp_month, exp_year, cvc)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def charge(token: str, amount: int) -> (dict | None):
         if(amount == 0): return None
         return db_communicator.Stripe.charge_card(min(amount, 50), token)
 
     @staticmethod
-    @ping_endpoint_till_connect()
+    @circuit_breaker_guard()
     def make_payment(
         card_number:str, exp_month:str, exp_year:int, cvc:int, amount:float,
         ) -> (dict | None):
         return Stripe.charge(
             Stripe.get_payment_token(card_number, exp_month, exp_year, cvc), amount)
+
+
+class SignalIO:
+    """Blocking I/O adapter that answers the requests of operations (see api_operation).
+
+    Methods
+    -------
+    get_vending_machine(hardware_id: str)
+        VendingMachines.get_vending_machine
+    register_vending_machine(hardware_id: str, row_count: int, column_count: int)
+        VendingMachines.register_vending_machine
+    set_mode(hardware_id: str, new_mode: str, expected_mode: str)
+        VendingMachines.set_mode
+    get_inventory_of_vending_machine(hardware_id: str, since: int)
+        Inventory.get_inventory_of_vending_machine
+    update_database(hardware_id: str, inventory: list[dict[str, str]])
+        Inventory.update_database
+    get_payment_token(card_number:str, exp_month:str, exp_year:int, cvc:int)
+        Stripe.get_payment_token
+    charge(token: str, amount: int)
+        Stripe.charge
+    replay_journal(replayer: JournalReplayer)
+        Send journaled changes, returns False while they are still pending
+
+    """
+
+    @staticmethod
+    def get_vending_machine(hardware_id: str) -> (dict | None):
+        return VendingMachines.get_vending_machine(hardware_id)
+
+    @staticmethod
+    def register_vending_machine(
+        hardware_id: str, row_count: int, column_count: int) -> (dict | None):
+        return VendingMachines.register_vending_machine(hardware_id, row_count, column_count)
+
+    @staticmethod
+    def set_mode(
+        hardware_id: str, new_mode: str, expected_mode: str | None = None) -> (dict | None):
+        return VendingMachines.set_mode(hardware_id, new_mode, expected_mode)
+
+    @staticmethod
+    def get_inventory_of_vending_machine(
+        hardware_id: str, since: int | None = None) -> (dict | list[dict] | None):
+        return Inventory.get_inventory_of_vending_machine(hardware_id, since)
+
+    @staticmethod
+    def update_database(hardware_id: str, inventory: list[dict[str, str]]) -> (dict | None):
+        return Inventory.update_database(hardware_id, inventory)
+
+    @staticmethod
+    def get_payment_token(card_number: str, exp_month: str, exp_year: int, cvc: int) -> str:
+        return Stripe.get_payment_token(card_number, exp_month, exp_year, cvc)
+
+    @staticmethod
+    def charge(token: str, amount: int) -> (dict | None):
+        return Stripe.charge(token, amount)
+
+    @staticmethod
+    def replay_journal(replayer: JournalReplayer) -> bool:
+        return replayer.replay_once()
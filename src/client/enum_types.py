@@ -5,3 +5,14 @@ class InventoryManagerMode(Enum):  # noqa: D101
     IDLE = 1
     TRANSACTION = 2
     RESTOCKING = 3
+
+
+class CircuitState(Enum):  # noqa: D101
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class SlotNamingScheme(Enum):  # noqa: D101
+    DIGITS = 1
+    ALPHANUMERIC = 2
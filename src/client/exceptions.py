@@ -41,6 +41,24 @@ class QueryFailureError(Exception):
     def __str__(self):
         return self.message + "; Status code: " + str(self.status_code)
 
+class InventoryConflictError(QueryFailureError):
+    """Thrown when an inventory write is rejected because its slots changed in the database."""
+
+    def __init__(self, message: str, rows: list[dict]):
+        super().__init__(message, status_code=409)
+        self.rows = rows
+
 class NotFreeItemError(Exception):
     """Thrown when tring to dispense free item that is not free."""
-    pass
\ No newline at end of file
+    pass
+
+class BackendUnavailableError(Exception):
+    """Thrown when a request is refused because the circuit breaker knows the API is down."""
+
+    def __init__(self, message: str, retry_in: float = 0):
+        super().__init__(message)
+        self.message = message
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return self.message + f"; Retry in {self.retry_in:.1f}s"
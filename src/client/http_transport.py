@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from api_constants import (
+    KEEP_ALIVE,
+    POOL_CONNECTIONS,
+    POOL_MAXSIZE,
+    ROUTE_TIMEOUTS,
+    TIMEOUT,
+)
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport:
+    """Connection-pooled HTTP transport shared by every database communicator class.
+
+    All requests go through one requests.Session, so TCP connections to BACKEND_HOST are kept
+    alive and reused between calls instead of doing a new handshake for every request.
+
+    Attributes
+    ----------
+    session: requests.Session
+        Session holding the keep-alive connection pools
+    route_timeouts: dict[str, float]
+        Timeout (in seconds) for each API route, routes not listed use default_timeout
+    default_timeout: float
+        Timeout (in seconds) used for routes without an entry in route_timeouts
+
+    Methods
+    -------
+    def request(self, method, url, timeout=None, **kwargs) -> requests.Response
+        Send a request through the pooled session
+    def get/post/patch/delete(self, url, **kwargs) -> requests.Response
+        Shorthands for request() with the matching HTTP method
+    def timeout_for(self, url) -> float
+        Returns the timeout for the route that url points to
+    def get_stats(self) -> dict
+        Returns request, latency and connection reuse counters
+    def reset_stats(self) -> None
+        Zeroes all counters
+    def close(self) -> None
+        Closes all pooled connections
+
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        keep_alive: bool = KEEP_ALIVE,
+        route_timeouts: dict[str, float] | None = None,
+        default_timeout: float = TIMEOUT,
+    ) -> None:
+        self.route_timeouts = dict(ROUTE_TIMEOUTS if route_timeouts is None else route_timeouts)
+        self.default_timeout = default_timeout
+        self.keep_alive = keep_alive
+
+        self.__adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("http://", self.__adapter)
+        self.session.mount("https://", self.__adapter)
+        if not keep_alive:
+            self.session.headers.update({"Connection": "close"})
+
+        self.__lock = threading.Lock()
+        self.reset_stats()
+
+
+    def request(
+        self, method: str, url: str, timeout: float | None = None, **kwargs,  # noqa: ANN003
+        ) -> requests.Response:
+        if timeout is None:
+            timeout = self.timeout_for(url)
+
+        start = time.perf_counter()
+        try:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = self.__route_of(url)
+            with self.__lock:
+                self.__requests += 1
+                self.__total_time += elapsed
+                count, total = self.__route_stats.get(route, (0, 0.0))
+                self.__route_stats[route] = (count + 1, total + elapsed)
+
+    def get(self, url: str, **kwargs) -> requests.Response:  # noqa: ANN003
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:  # noqa: ANN003
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:  # noqa: ANN003
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:  # noqa: ANN003
+        return self.request("DELETE", url, **kwargs)
+
+
+    def timeout_for(self, url: str) -> float:
+        return self.route_timeouts.get(self.__route_of(url), self.default_timeout)
+
+
+    def get_stats(self) -> dict:
+        opened, sent = self.__pool_counters()
+        with self.__lock:
+            requests_made = self.__requests
+            total_time = self.__total_time
+            routes = {
+                route: {"requests": count, "avg_latency": total / count}
+                for route, (count, total) in self.__route_stats.items()
+            }
+
+        return {
+            "requests": requests_made,
+            "connections_opened": opened,
+            # Every request urllib3 sent that did not need a new connection reused a live one
+            "connections_reused": max(sent - opened, 0),
+            "reuse_ratio": (sent - opened) / sent if sent else 0.0,
+            "total_time": total_time,
+            "avg_latency": total_time / requests_made if requests_made else 0.0,
+            "routes": routes,
+        }
+
+
+    def reset_stats(self) -> None:
+        with self.__lock:
+            self.__requests = 0
+            self.__total_time = 0.0
+            self.__route_stats: dict[str, tuple[int, float]] = {}
+            self.__opened_offset, self.__sent_offset = self.__pool_counters(raw=True)
+
+
+    def close(self) -> None:
+        self.session.close()
+
+
+    def __pool_counters(self, raw: bool = False) -> tuple[int, int]:
+        # urllib3 keeps a running count of new connections and requests sent per host pool
+        pools = self.__adapter.poolmanager.pools
+        opened = 0
+        sent = 0
+        for key in pools.keys():  # noqa: SIM118
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            sent += pool.num_requests
+
+        if raw:
+            return opened, sent
+        return opened - self.__opened_offset, sent - self.__sent_offset
+
+
+    def __route_of(self, url: str) -> str:
+        # The innermost path segment that names a known route decides the route,
+        # e.g. /vending-machines/<id>/inventory is an inventory request.
+        segments = [s for s in urlsplit(url).path.split("/") if s]
+        for segment in reversed(segments):
+            if segment in self.route_timeouts:
+                return segment
+        return segments[0] if segments else ""
+
+
+_transport: HttpTransport | None = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process wide transport, creating it with default settings on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
+
+
+def configure_transport(**settings) -> HttpTransport:  # noqa: ANN003
+    """Replace the process wide transport with one built from settings (see HttpTransport)."""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = HttpTransport(**settings)
+        return _transport
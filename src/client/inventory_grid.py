@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from array import array
+
+import exceptions as err
+
+# Name id of a slot with no item in it
+EMPTY = -1
+
+
+class InventoryGrid:
+    """Struct-of-arrays storage for the items of a vending machine.
+
+    Every slot has a flat index (row * width + column). Instead of an Item object per slot the
+    grid keeps three parallel typed arrays: an interned item-name id, the price in cents and the
+    stock. Scans over the whole machine read contiguous integers instead of chasing one object
+    and one __dict__ per slot, and a grid of thousands of slots costs a few bytes per slot.
+    Every write records its slot in dirty, so views derived from the grid (like the rendered
+    stock listing) can update only the slots that changed.
+
+    Attributes
+    ----------
+    size: int
+        Number of slots in the grid
+    name_ids: array
+        Interned item name id of every slot, EMPTY for an empty slot
+    prices: array
+        Price in cents of every slot
+    stocks: array
+        Stock of every slot
+    names: list[str]
+        Interned item names, indexed by name id
+    dirty: set[int]
+        Indices of slots written since the owner last cleared the set
+
+    Methods
+    -------
+    def intern(self, item_name) -> int
+        Returns the name id of an item name, interning it if needed
+    def is_empty(self, index) -> bool
+        Returns whether the slot at index holds no item
+    def get_name(self, index) -> str | None
+        Returns the item name of a slot
+    def get_cost(self, index) -> float
+        Returns the cost (in dollars) of a slot
+    def get_stock(self, index) -> int
+        Returns the stock of a slot
+    def set_item(self, index, item_name, cost, stock) -> None
+        Put a new item in a slot, replacing whatever was there
+    def clear(self, index) -> None
+        Remove the item from a slot
+    def clear_all(self) -> None
+        Remove every item
+    def set_cost(self, index, cost) -> None
+        Set the cost (in dollars) of a slot
+    def adjust_stock(self, index, adjustment_amount) -> None
+        Update the stock of a slot (can be positive or negative value)
+    def view(self, index) -> ItemView
+        Returns an Item-like view of a slot
+
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+        self.name_ids = array("l", [EMPTY]) * size
+        self.prices = array("l", [0]) * size
+        self.stocks = array("l", [0]) * size
+
+        self.names: list[str] = []
+        self.__name_lookup: dict[str, int] = {}
+
+        self.dirty: set[int] = set(range(size))
+
+
+    def intern(self, item_name: str) -> int:
+        name_id = self.__name_lookup.get(item_name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(item_name)
+            self.__name_lookup[item_name] = name_id
+        return name_id
+
+
+    def is_empty(self, index: int) -> bool:
+        return self.name_ids[index] == EMPTY
+
+    def get_name(self, index: int) -> str | None:
+        name_id = self.name_ids[index]
+        return None if name_id == EMPTY else self.names[name_id]
+
+    def get_cost(self, index: int) -> float:
+        return self.prices[index] / 100
+
+    def get_stock(self, index: int) -> int:
+        return self.stocks[index]
+
+
+    def set_item(self, index: int, item_name: str, cost: float, stock: int = 0) -> None:
+        if cost < 0:
+            raise err.NegativeCostError("Cost of item must be >= 0")
+        if stock < 0:
+            raise err.NegativeStockError("Value of must be >= 0")
+
+        self.name_ids[index] = self.intern(item_name)
+        self.prices[index] = to_cents(cost)
+        self.stocks[index] = stock
+        self.dirty.add(index)
+
+    def clear(self, index: int) -> None:
+        self.name_ids[index] = EMPTY
+        self.prices[index] = 0
+        self.stocks[index] = 0
+        self.dirty.add(index)
+
+    def clear_all(self) -> None:
+        self.name_ids = array("l", [EMPTY]) * self.size
+        self.prices = array("l", [0]) * self.size
+        self.stocks = array("l", [0]) * self.size
+        self.dirty.update(range(self.size))
+
+
+    def set_cost(self, index: int, cost: float) -> None:
+        if cost < 0:
+            raise err.NegativeCostError("Cost of item must be >= 0")
+        self.prices[index] = to_cents(cost)
+        self.dirty.add(index)
+
+    def adjust_stock(self, index: int, adjustment_amount: int) -> None:
+        if self.stocks[index] + adjustment_amount < 0:
+            raise err.NegativeStockError("Value of stock cannot go below 0")
+        self.stocks[index] += adjustment_amount
+        self.dirty.add(index)
+
+
+    def view(self, index: int) -> ItemView:
+        return ItemView(self, index)
+
+
+class ItemView:
+    """Item-like view of one slot of an InventoryGrid.
+
+    Has the same methods as item.Item, reads and writes go straight to the grid arrays. A view
+    follows its slot: if the slot is restocked with a different item the view shows the new one.
+
+    Methods
+    -------
+    def get_name(self) -> str
+        Get the name of the item.
+    def get_cost(self) -> float
+        Get the cost of the item.
+    def get_stock(self) -> int
+        Get the stock of the item
+    def set_cost(self, cost) -> None
+        Set the cost of the item
+    def adjust_stock(self, adjustment_amount) -> None
+        Update the stock of the item (can be positive or negative value)
+
+    """
+
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid: InventoryGrid, index: int) -> None:
+        self.grid = grid
+        self.index = index
+
+    def get_name(self) -> str:
+        return self.grid.get_name(self.index)
+
+    def get_cost(self) -> float:
+        return self.grid.get_cost(self.index)
+
+    def get_stock(self) -> int:
+        return self.grid.get_stock(self.index)
+
+    def set_cost(self, cost: float) -> None:
+        self.grid.set_cost(self.index, cost)
+
+    def adjust_stock(self, adjustment_amount: int) -> None:
+        self.grid.adjust_stock(self.index, adjustment_amount)
+
+
+def to_cents(cost: float) -> int:
+    # Costs are stored in whole cents, same precision as Item's round(cost, 2)
+    return round(cost * 100)
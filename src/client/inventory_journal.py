@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import db_communicator
+import exceptions as err
+from api_constants import (
+    CONFLICT,
+    INVENTORY_SAVE_ATTEMPTS,
+    JOURNAL_BATCH_SLOTS,
+    JOURNAL_COMPACT_BYTES,
+    JOURNAL_REPLAY_INTERVAL,
+)
+from circuit_breaker import get_breaker
+from enum_types import CircuitState
+from inventory_merge import coalesce_row, rebase_rows
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Errors that mean the API cannot be reached right now, journaled work is kept for later
+OFFLINE_ERRORS = (err.BackendUnavailableError, ConnectionError, TimeoutError)
+
+INVENTORY_RECORD = "inventory"
+MODE_RECORD = "mode"
+ACK_RECORD = "ack"
+
+
+class InventoryJournal:
+    """Durable, append-only journal of inventory change log entries and mode transitions.
+
+    Each record is one JSON line, flushed and fsync'd before append returns, so a sale recorded
+    here survives both an API outage and the process dying. Records are numbered, replayed
+    records are acknowledged with an ack record, and the file is compacted (acknowledged records
+    dropped, pending records coalesced per slot) once it grows past compact_bytes. Batches the API
+    rejects are moved to a dead letter file next to the journal, so they are kept for an operator
+    without blocking the records behind them.
+
+    Attributes
+    ----------
+    path: str
+        Location of the journal file
+    rejected_path: str
+        Location of the dead letter file for rejected batches (path + ".rejected" by default)
+    compact_bytes: int
+        File size that triggers compaction
+
+    Methods
+    -------
+    def append_changes(self, rows) -> int
+        Journal change log rows (same format as the inventory update request body)
+    def append_mode(self, mode) -> int
+        Journal a mode transition (character representation i, r, t)
+    def has_pending(self) -> bool
+        Returns whether there are records that have not been replayed yet
+    def pending_rows(self) -> list[dict]
+        Returns the latest pending row of every slot
+    def pending_mode(self) -> str | None
+        Returns the latest pending mode transition
+    def next_batch(self, max_slots) -> tuple[list[dict], str | None, int] | None
+        Coalesce the oldest pending records into one batch of at most max_slots slots
+    def acknowledge(self, seq) -> None
+        Mark every record up to and including seq as replayed
+    def reject(self, rows, mode, error) -> None
+        Write a batch the API rejected to the dead letter file
+    def compact(self) -> None
+        Rewrite the file with only the coalesced pending records
+    def size_bytes(self) -> int
+        Returns the size of the journal file
+    def get_stats(self) -> dict
+        Returns journal size and record counters
+
+    """
+
+    def __init__(
+        self, path: str, compact_bytes: int = JOURNAL_COMPACT_BYTES,
+        rejected_path: str | None = None,
+    ) -> None:
+        self.path = path
+        self.rejected_path = rejected_path if rejected_path is not None else path + ".rejected"
+        self.compact_bytes = compact_bytes
+
+        self.__lock = threading.Lock()
+        self.__pending: list[dict] = []
+        self.__seq = 0
+        self.__appended = 0
+        self.__compactions = 0
+        self.__rejected = 0
+
+        self.__load()
+        self.__file = open(self.path, "a", encoding="utf-8")  # noqa: PTH123, SIM115
+
+
+    def append_changes(self, rows: list[dict]) -> int:
+        return self.__append({"type": INVENTORY_RECORD, "rows": rows})
+
+    def append_mode(self, mode: str) -> int:
+        return self.__append({"type": MODE_RECORD, "mode": mode})
+
+
+    def has_pending(self) -> bool:
+        with self.__lock:
+            return bool(self.__pending)
+
+    def pending_rows(self) -> list[dict]:
+        with self.__lock:
+            return list(self.__coalesce(self.__pending)[0].values())
+
+    def pending_mode(self) -> str | None:
+        with self.__lock:
+            return self.__coalesce(self.__pending)[1]
+
+
+    def next_batch(self, max_slots: int) -> tuple[list[dict], str | None, int] | None:
+        with self.__lock:
+            records = []
+            slots = set()
+            for record in self.__pending:
+                if record["type"] == INVENTORY_RECORD:
+                    new_slots = {row["slot_name"] for row in record["rows"]} - slots
+                    if slots and len(slots) + len(new_slots) > max_slots:
+                        break
+                    slots |= new_slots
+                records.append(record)
+
+            if not records:
+                return None
+            rows, mode = self.__coalesce(records)
+            return list(rows.values()), mode, records[-1]["seq"]
+
+
+    def acknowledge(self, seq: int) -> None:
+        with self.__lock:
+            self.__write({"type": ACK_RECORD, "seq": seq})
+            self.__pending = [record for record in self.__pending if record["seq"] > seq]
+            if not self.__pending or self.__file.tell() >= self.compact_bytes:
+                self.__compact()
+
+
+    def reject(self, rows: list[dict], mode: str | None, error: str) -> None:
+        record = {"rows": rows, "mode": mode, "error": error, "time": time.time()}
+        with self.__lock, open(self.rejected_path, "a", encoding="utf-8") as file:  # noqa: PTH123
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+            self.__rejected += 1
+
+
+    def compact(self) -> None:
+        with self.__lock:
+            self.__compact()
+
+
+    def size_bytes(self) -> int:
+        with self.__lock:
+            return self.__file.tell()
+
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {
+                "pending_records": len(self.__pending),
+                "journal_bytes": self.__file.tell(),
+                "appended_records": self.__appended,
+                "compactions": self.__compactions,
+                "rejected_batches": self.__rejected,
+            }
+
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__file.close()
+
+
+    def __append(self, record: dict) -> int:
+        with self.__lock:
+            self.__seq += 1
+            record["seq"] = self.__seq
+            self.__write(record)
+            self.__pending.append(record)
+            self.__appended += 1
+
+            # Keep the journal bounded during long outages
+            if self.__file.tell() >= self.compact_bytes:
+                self.__compact()
+            return record["seq"]
+
+    def __write(self, record: dict) -> None:
+        # Caller holds the lock
+        self.__file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def __load(self) -> None:
+        if not os.path.exists(self.path):  # noqa: PTH110
+            return
+
+        acked = 0
+        records = []
+        with open(self.path, encoding="utf-8") as file:  # noqa: PTH123
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash, everything before it is intact
+                    break
+                self.__seq = max(self.__seq, record["seq"])
+                if record["type"] == ACK_RECORD:
+                    acked = max(acked, record["seq"])
+                else:
+                    records.append(record)
+
+        self.__pending = [record for record in records if record["seq"] > acked]
+
+    def __compact(self) -> None:
+        # Caller holds the lock. Write the coalesced pending records to a new file and swap it in
+        # atomically, so a crash during compaction leaves either the old or the new journal.
+        compacted = []
+        rows, mode = self.__coalesce(self.__pending)
+        inventory = [r for r in self.__pending if r["type"] == INVENTORY_RECORD]
+        modes = [r for r in self.__pending if r["type"] == MODE_RECORD]
+        if rows:
+            compacted.append({
+                "type": INVENTORY_RECORD, "rows": list(rows.values()), "seq": inventory[-1]["seq"],
+            })
+        if mode is not None:
+            compacted.append({"type": MODE_RECORD, "mode": mode, "seq": modes[-1]["seq"]})
+        compacted.sort(key=lambda record: record["seq"])
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:  # noqa: PTH123
+            file.writelines(
+                json.dumps(record, separators=(",", ":")) + "\n" for record in compacted)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.__file.close()
+        os.replace(temp_path, self.path)  # noqa: PTH105
+        self.__fsync_directory()
+        self.__file = open(self.path, "a", encoding="utf-8")  # noqa: PTH123, SIM115
+
+        self.__pending = compacted
+        self.__compactions += 1
+
+    def __fsync_directory(self) -> None:
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)  # noqa: PTH100, PTH120
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    @staticmethod
+    def __coalesce(records: list[dict]) -> tuple[dict[str, dict], str | None]:
+        # One row per slot: a full row replaces older ones, stock deltas are added up
+        rows: dict[str, dict] = {}
+        mode = None
+        for record in records:
+            if record["type"] == INVENTORY_RECORD:
+                for row in record["rows"]:
+                    rows[row["slot_name"]] = coalesce_row(rows.get(row["slot_name"]), row)
+            elif record["type"] == MODE_RECORD:
+                mode = record["mode"]
+        return rows, mode
+
+
+class JournalReplayer:
+    """Drains an InventoryJournal to the API in coalesced batches once it is reachable.
+
+    Replays go straight to db_communicator (VMItems.update_vm_inv, VMs.alter_mode) through the
+    shared circuit breaker, so a replay attempt during an outage fails immediately instead of
+    waiting. A daemon thread retries every interval seconds while records are pending. Batches
+    rejected with a version conflict are rebased onto the current rows and sent again. A batch
+    the API still rejects (any other error response, or conflicts on every attempt) is moved to
+    the journal's dead letter file and reported, and replay carries on with the records behind it.
+
+    Attributes
+    ----------
+    on_replayed: Callable[[list[dict], dict], None] | None
+        Called with the rows and the API response after every batch the database accepted
+
+    Methods
+    -------
+    def replay_once(self, wait) -> bool
+        Send all pending records, returns False if records are still pending (API offline)
+    async def async_replay_once(self) -> bool
+        Awaitable replay_once for callers on the event loop, replays on a worker thread
+    def replay_soon(self) -> None
+        Wake the background thread to replay now instead of after the interval
+    def start(self) -> None
+        Start replaying in the background
+    def stop(self) -> None
+        Stop replaying in the background
+    def get_stats(self) -> dict
+        Returns replay throughput counters together with the journal stats
+
+    """
+
+    def __init__(
+        self,
+        journal: InventoryJournal,
+        hardware_id: str,
+        batch_slots: int = JOURNAL_BATCH_SLOTS,
+        interval: float = JOURNAL_REPLAY_INTERVAL,
+        on_replayed: Callable[[list[dict], dict], None] | None = None,
+    ) -> None:
+        self.journal = journal
+        self.hardware_id = hardware_id
+        self.batch_slots = batch_slots
+        self.interval = interval
+        self.on_replayed = on_replayed
+
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__wake = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+        self.__replayed_rows = 0
+        self.__replayed_batches = 0
+        self.__replay_time = 0.0
+        self.__rejected_batches = 0
+        self.__last_error: str | None = None
+
+
+    def replay_once(self, wait: bool = True) -> bool:
+        # Only one replay at a time. Callers that need the outcome wait for a replay in flight
+        # (and then send what it left) instead of mistaking it for an outage.
+        if not self.__lock.acquire(blocking=wait):
+            return False
+        self.__last_error = None
+        try:
+            while (batch := self.journal.next_batch(self.batch_slots)) is not None:
+                rows, mode, seq = batch
+                start = time.perf_counter()
+                rows = self.__send(rows, mode)
+                self.__record_batch(rows, seq, time.perf_counter() - start)
+        except OFFLINE_ERRORS as e:
+            self.__last_error = str(e)
+            return False
+        finally:
+            self.__lock.release()
+        return True
+
+
+    async def async_replay_once(self) -> bool:
+        # Replays are rare and small, sending them from a worker thread keeps a single
+        # implementation without blocking the event loop
+        return await asyncio.to_thread(self.replay_once)
+
+
+    def start(self) -> None:
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def replay_soon(self) -> None:
+        self.start()
+        self.__wake.set()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        self.__wake.set()
+
+
+    def get_stats(self) -> dict:
+        return {
+            **self.journal.get_stats(),
+            "replayed_rows": self.__replayed_rows,
+            "replayed_batches": self.__replayed_batches,
+            "replay_time": self.__replay_time,
+            "rows_per_second": (
+                self.__replayed_rows / self.__replay_time if self.__replay_time else 0.0),
+            "rejected_batches": self.__rejected_batches,
+            "last_error": self.__last_error,
+        }
+
+
+    def __send(self, rows: list[dict], mode: str | None) -> list[dict]:
+        # Returns the rows the database accepted. Rows and mode are rejected separately, so a
+        # mode transition is not lost with rows the API refused.
+        breaker = get_breaker()
+        breaker.before_call()
+        try:
+            try:
+                rows = self.__send_rows(rows)
+            except err.QueryFailureError as e:
+                self.__reject(rows, None, e)
+                rows = []
+            if mode is not None:
+                try:
+                    db_communicator.VMs.alter_mode(self.hardware_id, mode)
+                except err.QueryFailureError as e:
+                    self.__reject([], mode, e)
+        except (ConnectionError, TimeoutError):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return rows
+
+    def __send_rows(self, rows: list[dict]) -> list[dict]:
+        for _ in range(INVENTORY_SAVE_ATTEMPTS):
+            if not rows:
+                return rows
+            try:
+                response = db_communicator.VMItems.update_vm_inv(self.hardware_id, rows)
+            except err.InventoryConflictError as e:
+                rows = rebase_rows(rows, e.rows)
+                continue
+            self.__replayed(rows, response)
+            return rows
+        raise self.__conflict_error()  # noqa: RSE102
+
+    def __reject(self, rows: list[dict], mode: str | None, error: err.QueryFailureError) -> None:
+        # The API will not accept this part of the batch however often it is sent, keep it for
+        # an operator instead of blocking the journal behind it
+        self.journal.reject(rows, mode, str(error))
+        self.__rejected_batches += 1
+        self.__last_error = str(error)
+        print(f"Inventory journal batch rejected, moved to {self.journal.rejected_path}: {error}")
+
+    def __replayed(self, rows: list[dict], response: dict) -> None:
+        if self.on_replayed is not None:
+            self.on_replayed(rows, response)
+
+    @staticmethod
+    def __conflict_error() -> err.QueryFailureError:
+        return err.QueryFailureError(
+            "Inventory kept changing concurrently, batch not replayed", status_code=CONFLICT)
+
+    def __record_batch(self, rows: list[dict], seq: int, elapsed: float) -> None:
+        self.journal.acknowledge(seq)
+        self.__replayed_rows += len(rows)
+        self.__replayed_batches += 1
+        self.__replay_time += elapsed
+
+    def __run(self) -> None:
+        while not self.__stop.is_set():
+            self.__wake.wait(self.interval)
+            self.__wake.clear()
+            if self.__stop.is_set():
+                return
+            if self.journal.has_pending() and get_breaker().get_state() is not CircuitState.OPEN:
+                self.replay_once(wait=False)
@@ -1,12 +1,29 @@
-import exceptions as err  # noqa: INP001
-from db_signal import Inventory, VendingMachines
-from enum_types import InventoryManagerMode
-from item import Item
+from __future__ import annotations  # noqa: INP001
+
+import time
+from array import array
+from typing import TYPE_CHECKING
+
+import exceptions as err
+from api_constants import CONFLICT, INVENTORY_SAVE_ATTEMPTS, MODE_LEASE_SECONDS
+from api_operation import run_operation
+from db_signal import SignalIO
+from enum_types import InventoryManagerMode, SlotNamingScheme
+from inventory_grid import EMPTY, InventoryGrid, ItemView, to_cents
+from inventory_journal import OFFLINE_ERRORS, InventoryJournal, JournalReplayer
+from inventory_merge import apply_delta, is_delta, rebase_rows
+from slot_addressing import SlotAddressing
+
+if TYPE_CHECKING:
+    from api_operation import Operation
 
 
 class InventoryManager:
     """Item management logic for vending machine.
 
+    Every database method is written once as an operation (see api_operation) and run with
+    blocking I/O here, AsyncInventoryManager runs the same operations with awaitable I/O.
+
     Attributes
     ----------
     hardware_id: str
@@ -15,30 +32,62 @@ class InventoryManager:
         Number of rows in vending machine
     width: int
         Number of columns in vending machine
-    items: Item[][]
-        2d List of all items
-    change_log: dict
-        Dictionary of changes to items to be saved to database
+    grid: InventoryGrid
+        Struct-of-arrays storage of all items, indexed by flat slot index (row * width + column)
+    slots: SlotAddressing
+        Precomputed slot name <-> flat slot index tables for the machine's naming scheme
+    change_log: set[int]
+        Flat indices of slots with changes to be saved to database
+    slot_versions: array
+        Database version of every slot as of the last sync or save, sent as expected_version
+        so the API rejects writes made against stale rows
     mode
         Operating mode of inventory manager, is either IDLE, TRANSACTION, or RESTOCKING
     mode_map
         Mapping between character representations of mode (i, r, t) and their ENUM counterparts
+    journal: InventoryJournal | None
+        Optional write-ahead journal, when set saves and mode changes are journaled first and
+        complete locally while the API is unreachable
+    journal_replayer: JournalReplayer | None
+        Sends journaled changes to the database once the API is reachable
+    inventory_version: int
+        Database inventory version of the last sync, only rows written after it are fetched on
+        the next sync (0 fetches everything)
+    last_sync_changes: list[str]
+        Names of the slots the last sync changed
 
     Methods
     -------
     def sync_from_database() -> None
         Check if dimensions match between local and db, load inventory of vending machine,
         and sync mode with database
-    def load_inventory_from_db(self) -> None
-        Load items from database
+    def load_inventory_from_db(self) -> list[str]
+        Load changed items from database, returns the names of the slots that changed
     def save_inventory_to_db(self) -> None
-        Save items to database
+        Save items to database (through the journal if there is one), slots that changed in
+        the database meanwhile are merged and sent again
+    def defer_inventory_save(self) -> bool
+        Journal the change log and let the replayer send it in the background, returns False
+        (and does nothing) without a journal
     def get_mode(self) -> Mode
         Returns the operating mode of this inventory manager
     def load_mode_from_db(self) -> None
-        Set the local mode to the mode that is on the db
+        Set the local mode to the mode that is on the db, skipped while the mode lease is valid
     def set_mode(self, new_mode) -> None
         Sets the operating mode of this inventory manager
+    def compare_and_set_mode(self, expected_mode, new_mode) -> bool
+        Change the mode on the db only if it is still expected_mode, returns whether it was
+    def sync_from_database_op(self), load_inventory_from_db_op(self), ... -> Operation
+        The database methods above as operations, for AsyncInventoryManager and callers
+        composing them into operations of their own
+    def invalidate_mode_lease(self) -> None
+        Stop trusting the cached mode, e.g. because the mode was changed elsewhere
+    def apply_remote_mode(self, db_mode) -> None
+        Take the mode the database announced (vm/mode/<id>) as the cached mode
+    def mode_notifications_lost(self) -> None
+        Stop trusting the cached mode until the database announces it again
+    def mode_confirmed(self) -> bool
+        Whether the cached mode is leased and was confirmed by a mode announcement
     def get_stock_information(self, show_empty_slots) -> str
         Return a string of all stock information
     def change_stock(self, slot_name, item_stock) -> float
@@ -52,30 +101,39 @@ class InventoryManager:
         Removes the item from a named slot
     def set_cost(self, slot_name, new_cost) -> None
         Sets a new cost for a given slot
-    def get_item(self, slot_name) -> Item
-        Returns the item at a slot
+    def get_item(self, slot_name) -> ItemView
+        Returns a view of the item at a slot
     def get_coordinates_from_slotname(self, slot_name) -> tuple[int, int]
         Given a slot_name in the form of a string, returns the coordinates in items
 
     """
 
-    MAXHEIGHT = 10
-    MAXWIDTH = 10
-    SLOTNAMELENGTH = 2
-
-    def __init__(self, height: int, width: int, hardware_id: str) -> None:
-        """Initialize an InventoryManager with a 2d list of items and set mode to IDLE."""
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        hardware_id: str,
+        journal: InventoryJournal | None = None,
+        slot_naming: SlotNamingScheme | None = None,
+    ) -> None:
+        """Initialize an InventoryManager with an empty inventory grid and set mode to IDLE.
+
+        slot_naming defaults to DIGITS for machines up to 10x10 and ALPHANUMERIC for larger ones.
+        """
         self.hardware_id = hardware_id
 
-        # Set rows and columns of inventory
-        if height <= 0 or width <= 0 or height > self.MAXHEIGHT or width > self.MAXWIDTH:
-            raise err.InvalidDimensionsError("Width and Height must be 0 < x < 11")
-
+        # Set rows and columns of inventory, the naming scheme validates the dimensions
+        self.slots = SlotAddressing(height, width, slot_naming)
         self.height = height
         self.width = width
 
-        # Create items 2d list
-        self.__items = [[None for i in range(width)] for j in range(height)]
+        # Create item storage, slots are addressed by flat index row * width + column
+        self.grid = InventoryGrid(height * width)
+
+        # Rendered stock listing line of every slot, kept current from grid.dirty
+        self.__lines: list[str] = [""] * (height * width)
+        self.__in_stock = bytearray(height * width)
+        self.__rendered: dict[bool, str] = {}
 
         # Create mode map for mode functions and set mode to IDLE
         self.mode_map = {
@@ -88,52 +146,96 @@ class InventoryManager:
         }
         self.__mode = InventoryManagerMode.IDLE
 
-        self.__change_log = {}
+        # The mode is cached under a lease: while it holds the mode is not read from the API.
+        # Every invalidation bumps the lease version, so a request that was in flight during an
+        # invalidation cannot renew the lease with a mode that may already be stale.
+        self.__lease_expires = 0.0
+        self.__lease_version = 0
+        # Whether mode announcements arrive, set by the first one and cleared when they are lost
+        self.__mode_notified = False
+
+        # Slots whose only unsaved change is their stock are saved as relative deltas, so
+        # concurrent sales from other writers add up instead of being overwritten
+        self.__change_log: set[int] = set()
+        self.__stock_deltas: dict[int, int] = {}
+        self.slot_versions = array("l", [0]) * (height * width)
+
+        self.journal = journal
+        self.journal_replayer = JournalReplayer(
+            journal, hardware_id, on_replayed=self._record_saved) if journal else None
+
+        self.inventory_version = 0
+        self.last_sync_changes: list[str] = []
 
 
     def sync_from_database(self) -> dict:
-        vm_db = VendingMachines.get_vending_machine(self.hardware_id)
-        if(vm_db is None):
-            raise err.QueryFailureError("sync_to_database failed because vending machine DNE")
+        return run_operation(self.sync_from_database_op(), SignalIO)
 
-        # Check that dimensions match between database and local
-        if(vm_db["vm_row_count"] != self.height or vm_db["vm_column_count"] != self.width):
-            raise(err.InvalidDimensionsError("Dimensions mismatch between local and database."))
+    def sync_from_database_op(self) -> Operation[dict]:
+        lease = self._mode_lease_version()
+        vm_db = yield "get_vending_machine", (self.hardware_id,)
+        self._check_vm_record(vm_db)
 
         # Load inventory from database
-        self.load_inventory_from_db()
+        yield from self.load_inventory_from_db_op()
 
         # Load current mode from database
-        self.__mode = self.mode_map[vm_db["vm_mode"]]
+        self._apply_db_mode(vm_db["vm_mode"], lease)
 
         return vm_db
 
 
-    def load_inventory_from_db(self) -> None:
-        self.__items = [[None for i in range(self.width)] for j in range(self.height)]
-        inventory: list[dict] = Inventory.get_inventory_of_vending_machine(self.hardware_id)
-        if(inventory is None):
-            raise err.QueryFailureError("get_inventory_of_vending_machine failed")
+    def load_inventory_from_db(self) -> list[str]:
+        return run_operation(self.load_inventory_from_db_op(), SignalIO)
 
-        for item in inventory:
-            row, col = self.get_coordinates_from_slotname(item["slot_name"])
-            self.__items[row][col] = Item(
-                item["item_name"], float(item["price"]), int(item["stock"]))
+    def load_inventory_from_db_op(self) -> Operation[list[str]]:
+        inventory = yield "get_inventory_of_vending_machine", (
+            self.hardware_id, self.inventory_version)
+        return self._apply_inventory(inventory)
 
     def save_inventory_to_db(self) -> None:
-        req_body = [
-        {
-            "slot_name": slot_name,
-            "item_name": item.get_name() if item else None,
-            "price": item.get_cost() if item else None,
-            "stock": item.get_stock() if item else None,
-        }
-        for slot_name, item in self.__change_log.items()]
-
-        if(Inventory.update_database(self.hardware_id, req_body) is None):
-            raise err.QueryFailureError("update_database failed")
-
-        self.__change_log = {}
+        run_operation(self.save_inventory_to_db_op(), SignalIO)
+
+    def save_inventory_to_db_op(self) -> Operation[None]:
+        if self.journal is not None:
+            # Write ahead: the change log is durable before any request is made, if the API
+            # cannot be reached the replayer sends it later
+            self._journal_change_log()
+            yield "replay_journal", (self.journal_replayer,)
+            return
+
+        rows = self._pending_changes()
+        if not rows:
+            # Nothing changed since the last save, don't spend a request on it
+            return
+
+        for _ in range(INVENTORY_SAVE_ATTEMPTS):
+            try:
+                res = yield "update_database", (self.hardware_id, rows)
+            except err.InventoryConflictError as e:
+                rows = self._merge_conflicts(rows, e.rows)
+                if not rows:
+                    # Every rejected row was dropped, e.g. a sale of an item that was replaced
+                    return
+                continue
+
+            if(res is None):
+                raise err.QueryFailureError("update_database failed")
+            self._record_saved(rows, res)
+            self._clear_change_log()
+            return
+
+        raise self._save_conflict_error()
+
+
+    def defer_inventory_save(self) -> bool:
+        if self.journal is None:
+            return False
+
+        # Durable once journaled, only the request is left to the replayer thread
+        self._journal_change_log()
+        self.journal_replayer.replay_soon()
+        return True
 
 
     def get_mode(self) -> InventoryManagerMode:
@@ -141,16 +243,224 @@ class InventoryManager:
 
 
     def load_mode_from_db(self) -> None:
-        res = VendingMachines.get_vending_machine(self.hardware_id)
+        run_operation(self.load_mode_from_db_op(), SignalIO)
+
+    def load_mode_from_db_op(self) -> Operation[None]:
+        if self._mode_lease_valid():
+            return
+
+        lease = self._mode_lease_version()
+        res = yield "get_vending_machine", (self.hardware_id,)
         if(res is None):
             raise err.QueryFailureError("get_vending_machine failed")
 
-        self.__mode = self.mode_map[res["vm_mode"]]
+        self._apply_db_mode(res["vm_mode"], lease)
 
 
     def set_mode(self, new_mode: InventoryManagerMode) -> None:
-        self.load_mode_from_db()
+        run_operation(self.set_mode_op(new_mode), SignalIO)
+
+    def set_mode_op(self, new_mode: InventoryManagerMode) -> Operation[None]:
+        if self.journal is not None and not (yield "replay_journal", (self.journal_replayer,)):
+            # Earlier journaled work has not reached the API, queue this transition behind it
+            self._set_mode_offline(new_mode)
+            return
+
+        try:
+            # Validate against the cached mode and let the API check it is still current, one
+            # request unless the mode was changed elsewhere. A cached mode without a lease may
+            # be stale, so it is read again first.
+            yield from self.load_mode_from_db_op()
+            self._validate_mode_change(new_mode)
+            if not (yield from self.compare_and_set_mode_op(self.__mode, new_mode)):
+                yield from self.load_mode_from_db_op()
+                self._validate_mode_change(new_mode)
+                if not (yield from self.compare_and_set_mode_op(self.__mode, new_mode)):
+                    raise err.InvalidModeError("Mode changed concurrently, try again")
+        except OFFLINE_ERRORS:
+            if self.journal is None:
+                raise
+            self._set_mode_offline(new_mode)
+
+
+    def compare_and_set_mode(
+        self, expected_mode: InventoryManagerMode, new_mode: InventoryManagerMode,
+    ) -> bool:
+        return run_operation(self.compare_and_set_mode_op(expected_mode, new_mode), SignalIO)
+
+    def compare_and_set_mode_op(
+        self, expected_mode: InventoryManagerMode, new_mode: InventoryManagerMode,
+    ) -> Operation[bool]:
+        lease = self._mode_lease_version()
+        try:
+            res = yield "set_mode", (
+                self.hardware_id, self.mode_map[new_mode], self.mode_map[expected_mode])
+        except err.QueryFailureError as e:
+            if e.status_code != CONFLICT:
+                raise
+            self.invalidate_mode_lease()
+            return False
+
+        if(res is None):
+            raise err.QueryFailureError("set_mode failed")
+        self._commit_mode(new_mode, lease)
+        return True
+
+
+    def invalidate_mode_lease(self) -> None:
+        self.__lease_version += 1
+        self.__lease_expires = 0.0
+
+
+    def apply_remote_mode(self, db_mode: str) -> None:
+        self.__mode_notified = True
+        pending_mode = self.journal.pending_mode() if self.journal is not None else None
+        mode = self.mode_map.get(pending_mode or db_mode)
+        if mode is None:
+            # Not a mode we know, read it from the database on the next operation
+            self.invalidate_mode_lease()
+            return
+        if mode is self.__mode:
+            return
+
+        # The announcement is newer than any request in flight, those must not renew the lease
+        self.invalidate_mode_lease()
+        self._commit_mode(mode, self._mode_lease_version())
+
 
+    def mode_notifications_lost(self) -> None:
+        # Announcements can be missed until the next one arrives
+        self.__mode_notified = False
+        self.invalidate_mode_lease()
+
+
+    def mode_confirmed(self) -> bool:
+        return self.__mode_notified and self._mode_lease_valid()
+
+
+    # Network independent steps of the operations above
+    def _check_vm_record(self, vm_db: dict | None) -> None:
+        if(vm_db is None):
+            raise err.QueryFailureError("sync_to_database failed because vending machine DNE")
+
+        # Check that dimensions match between database and local
+        if(vm_db["vm_row_count"] != self.height or vm_db["vm_column_count"] != self.width):
+            raise(err.InvalidDimensionsError("Dimensions mismatch between local and database."))
+
+    def _apply_inventory(self, inventory: dict | list[dict] | None) -> list[str]:
+        if(inventory is None):
+            raise err.QueryFailureError("get_inventory_of_vending_machine failed")
+
+        # A versioned response holds either every slot or only those written after our version,
+        # a plain list is a full snapshot from an API without versioning
+        if isinstance(inventory, dict):
+            rows, full, version = inventory["rows"], inventory["full"], inventory["version"]
+        else:
+            rows, full, version = inventory, True, 0
+
+        target = {self.__get_index(row["slot_name"]): row for row in rows}
+        for index, row in target.items():
+            self.slot_versions[index] = row.get("version", 0)
+
+        # Journaled changes the database has not seen yet take precedence over its rows. Stock
+        # deltas are added to the rows the database sent, slots it didn't send already show them.
+        if self.journal is not None:
+            for row in self.journal.pending_rows():
+                index = self.__get_index(row["slot_name"])
+                if not is_delta(row):
+                    target[index] = row
+                elif index in target:
+                    target[index] = apply_delta(target[index], row)
+
+        # Only slots whose contents differ are written, so caches keyed on grid.dirty stay valid
+        changed = [index for index, row in target.items() if self.__apply_row(index, row)]
+        if full:
+            # Slots missing from a snapshot are empty
+            for index, name_id in enumerate(self.grid.name_ids):
+                if name_id != EMPTY and index not in target:
+                    self.grid.clear(index)
+                    self.slot_versions[index] = 0
+                    changed.append(index)
+
+        self.inventory_version = version
+        self.last_sync_changes = [self.slots.names[index] for index in sorted(changed)]
+        return self.last_sync_changes
+
+    def _pending_changes(self) -> list[dict]:
+        grid = self.grid
+        rows = []
+        for index in sorted(self.__change_log):
+            row = {"slot_name": self.slots.names[index], "item_name": grid.get_name(index)}
+            if index in self.__stock_deltas:
+                row["stock_delta"] = self.__stock_deltas[index]
+            else:
+                row["price"] = None if grid.is_empty(index) else grid.get_cost(index)
+                row["stock"] = None if grid.is_empty(index) else grid.get_stock(index)
+            row["expected_version"] = self.slot_versions[index]
+            rows.append(row)
+        return rows
+
+    def _merge_conflicts(self, rows: list[dict], current_rows: list[dict]) -> list[dict]:
+        # Rebase rejected rows onto the current database rows and show the merged result
+        # locally, only the conflicting slots are touched instead of resyncing the machine
+        rows = rebase_rows(rows, current_rows)
+        sent = {row["slot_name"]: row for row in rows}
+        for current in current_rows:
+            index = self.__get_index(current["slot_name"])
+            row = sent.get(current["slot_name"])
+            if row is None or is_delta(row):
+                # Full rows are local edits that win, otherwise the database row is the base
+                self.__apply_row(index, current if row is None else apply_delta(current, row))
+            if row is None:
+                self.__change_log.discard(index)
+                self.__stock_deltas.pop(index, None)
+            self.slot_versions[index] = current["version"]
+        return rows
+
+    def _record_saved(self, rows: list[dict], res: dict) -> None:
+        # The API answers with the version the rows were written at
+        version = res.get("version") if isinstance(res, dict) else None
+        if version is None:
+            return
+        for row in rows:
+            self.slot_versions[self.__get_index(row["slot_name"])] = version
+
+    def _save_conflict_error(self) -> err.QueryFailureError:
+        return err.QueryFailureError(
+            "Inventory kept changing concurrently, save failed", status_code=CONFLICT)
+
+    def _clear_change_log(self) -> None:
+        self.__change_log = set()
+        self.__stock_deltas = {}
+
+    def _journal_change_log(self) -> None:
+        if self.__change_log:
+            self.journal.append_changes(self._pending_changes())
+        self._clear_change_log()
+
+    def _mode_lease_version(self) -> int:
+        # Taken before a mode request, passed back to _commit_mode/_apply_db_mode afterwards
+        return self.__lease_version
+
+    def _mode_lease_valid(self) -> bool:
+        return time.monotonic() < self.__lease_expires
+
+    def _commit_mode(self, mode: InventoryManagerMode, lease: int | None = None) -> None:
+        self.__mode = mode
+        if lease is not None and lease == self.__lease_version:
+            self.__lease_expires = time.monotonic() + MODE_LEASE_SECONDS
+
+    def _apply_db_mode(self, db_mode: str, lease: int | None = None) -> None:
+        pending_mode = self.journal.pending_mode() if self.journal is not None else None
+        self._commit_mode(self.mode_map[pending_mode or db_mode], lease)
+
+    def _set_mode_offline(self, new_mode: InventoryManagerMode) -> None:
+        self._validate_mode_change(new_mode)
+        self.invalidate_mode_lease()
+        self.__mode = new_mode
+        self.journal.append_mode(self.mode_map[new_mode])
+
+    def _validate_mode_change(self, new_mode: InventoryManagerMode) -> None:
         if new_mode is InventoryManagerMode.IDLE and self.__mode is InventoryManagerMode.IDLE:
             raise err.InvalidModeError("Cannot change mode from IDLE to IDLE")
 
@@ -164,86 +474,116 @@ class InventoryManager:
                 + str(self.__mode),
             )
 
-        self.__mode = new_mode
-        if(VendingMachines.set_mode(self.hardware_id, self.mode_map[new_mode]) is None):
-            raise err.QueryFailureError("set_mode failed")
-
     def get_stock_information(self, show_empty_slots: bool = False) -> str:
-        out = ""
+        self.__render_dirty_slots()
 
-        for r in range(len(self.__items)):
-            for c in range(len(self.__items[0])):
-                item: Item = self.__items[r][c]
-                if item is None:
-                    if show_empty_slots:
-                        out += f"{r}{c}: <EMPTY>\n"
-                elif (item.get_stock() != 0) or show_empty_slots:
-                    out = (
-                        out + f"{r}{c}: "
-                        f"{item.get_name()}, "
-                        f"Price: {item.get_cost()}, "
-                        f"Left in Stock: {item.get_stock()}\n"
-                    )
+        # Whole listings are cached until a slot changes, repeated calls in between are free
+        out = self.__rendered.get(show_empty_slots)
+        if out is None:
+            if show_empty_slots:
+                lines = self.__lines
+            else:
+                lines = [line for line, shown in zip(self.__lines, self.__in_stock) if shown]
+            out = "\n".join(lines).strip()
+            self.__rendered[show_empty_slots] = out
 
-        return out.strip()
+        return out
 
 
     def change_stock(self, slot_name: str, item_stock: int) -> float:
-        itemrow, itemcol = self.get_coordinates_from_slotname(slot_name)
+        index = self.__get_occupied_index(slot_name)
+        self.grid.adjust_stock(index, item_stock)
 
-        item: Item = self.__items[itemrow][itemcol]
-        if item is None:
-            raise err.EmptySlotError("No item at slot " + slot_name)
-        item.adjust_stock(item_stock)
-
-        self.__change_log[slot_name] = item
+        # Other unsaved edits of the slot make it a full row, which includes the new stock
+        if index not in self.__change_log or index in self.__stock_deltas:
+            self.__stock_deltas[index] = self.__stock_deltas.get(index, 0) + item_stock
+        self.__change_log.add(index)
 
         if item_stock < 0:
-            return round(-1 * item_stock * item.get_cost(), 2)
+            return round(-1 * item_stock * self.grid.get_cost(index), 2)
         return 0
 
 
     def add_item(self, slot_name: str, item_name: str, item_stock: int, item_cost: float) -> None:
-        itemrow, itemcol = self.get_coordinates_from_slotname(slot_name)
-        new_item: Item = Item(item_name, item_cost, item_stock)
-        self.__items[itemrow][itemcol] = new_item
-        self.__change_log[slot_name] = new_item
+        index = self.__get_index(slot_name)
+        self.grid.set_item(index, item_name, item_cost, item_stock)
+        self.__stock_deltas.pop(index, None)
+        self.__change_log.add(index)
 
 
     def clear_slot(self, slot_name: str) -> None:
-        itemrow, itemcol = self.get_coordinates_from_slotname(slot_name)
-        self.__items[itemrow][itemcol] = None
-        self.__change_log[slot_name] = None
+        index = self.__get_index(slot_name)
+        self.grid.clear(index)
+        self.__stock_deltas.pop(index, None)
+        self.__change_log.add(index)
 
 
     def set_cost(self, slot_name: str, new_cost: float) -> None:
-        itemrow, itemcol = self.get_coordinates_from_slotname(slot_name)
-
-        item: Item = self.__items[itemrow][itemcol]
-        if item is None:
-            raise err.EmptySlotError("No item at slot " + slot_name)
+        index = self.__get_occupied_index(slot_name)
+        self.grid.set_cost(index, new_cost)
+        self.__stock_deltas.pop(index, None)
+        self.__change_log.add(index)
 
-        item.set_cost(new_cost)
-        self.__change_log[slot_name] = item
 
-
-    def get_item(self, slot_name: str) -> Item:
-        itemrow, itemcol = self.get_coordinates_from_slotname(slot_name)
-
-        item: Item = self.__items[itemrow][itemcol]
-        if item is None:
-            raise err.EmptySlotError("No item at slot " + slot_name)
-
-        return item
+    def get_item(self, slot_name: str) -> ItemView:
+        return self.grid.view(self.__get_occupied_index(slot_name))
 
 
     def get_coordinates_from_slotname(self, slot_name: str) -> tuple[int, int]:
-        if len(slot_name) != self.SLOTNAMELENGTH:
-            raise err.InvalidSlotNameError("Slot name must be 2 characters long")
-        row: int = ord(slot_name[0]) - ord("0")
-        col: int = ord(slot_name[1]) - ord("0")
+        return self.slots.get_coordinates(slot_name)
+
+
+    def __render_dirty_slots(self) -> None:
+        # Re-render only the slots written since the last call, see InventoryGrid.dirty
+        grid = self.grid
+        if not grid.dirty:
+            return
+
+        # Swap the set out first so writes from another thread land in the next pass
+        dirty, grid.dirty = grid.dirty, set()
+        names, name_ids = grid.names, grid.name_ids
+        prices, stocks = grid.prices, grid.stocks
+        for index in dirty:
+            slot_name = self.slots.names[index]
+            name_id = name_ids[index]
+            if name_id < 0:
+                self.__lines[index] = f"{slot_name}: <EMPTY>"
+                self.__in_stock[index] = False
+            else:
+                self.__lines[index] = (
+                    f"{slot_name}: "
+                    f"{names[name_id]}, "
+                    f"Price: {prices[index] / 100}, "
+                    f"Left in Stock: {stocks[index]}"
+                )
+                self.__in_stock[index] = stocks[index] != 0
+
+        self.__rendered = {}
+
+    def __apply_row(self, index: int, row: dict) -> bool:
+        # Write one database row into the grid if it differs, returns whether it did
+        grid = self.grid
+        if row["item_name"] is None:
+            if grid.is_empty(index):
+                return False
+            grid.clear(index)
+            return True
+
+        cost, stock = float(row["price"]), int(row["stock"])
+        if (
+            grid.name_ids[index] == grid.intern(row["item_name"])
+            and grid.prices[index] == to_cents(cost)
+            and grid.stocks[index] == stock
+        ):
+            return False
+        grid.set_item(index, row["item_name"], cost, stock)
+        return True
 
-        if row < 0 or col < 0 or row >= len(self.__items) or col >= len(self.__items[0]):
-            raise err.InvalidSlotNameError("Invalid slot name")
+    def __get_index(self, slot_name: str) -> int:
+        return self.slots.get_index(slot_name)
 
-        return row, col
+    def __get_occupied_index(self, slot_name: str) -> int:
+        index = self.__get_index(slot_name)
+        if self.grid.is_empty(index):
+            raise err.EmptySlotError("No item at slot " + slot_name)
+        return index
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+# Inventory rows sent to the API come in two forms. A full row sets a slot to
+# {item_name, price, stock} (item_name None empties it); a delta row {item_name, stock_delta}
+# adds to the stock the database holds, so sales from several writers add up instead of
+# overwriting each other. Both carry the expected_version of the slot they were made against.
+# The helpers below fold rows together and rebase them onto the current database rows after
+# the API rejected them with a version conflict.
+
+
+def is_delta(row: dict) -> bool:
+    return "stock_delta" in row
+
+
+def coalesce_row(previous: dict | None, row: dict) -> dict:
+    # Fold a later row of a slot into an earlier one. Both were made against the version of the
+    # earlier row, so that one's expected_version is kept.
+    if previous is None:
+        return row
+
+    if not is_delta(row):
+        merged = dict(row)
+    elif is_delta(previous):
+        merged = {**previous, "stock_delta": previous["stock_delta"] + row["stock_delta"]}
+    elif previous["item_name"] is None:
+        # Nothing to add the delta to, can't happen since only occupied slots change stock
+        merged = dict(previous)
+    else:
+        merged = {**previous, "stock": previous["stock"] + row["stock_delta"]}
+
+    if "expected_version" in previous:
+        merged["expected_version"] = previous["expected_version"]
+    return merged
+
+
+def apply_delta(current: dict, row: dict) -> dict:
+    # Current database row of a slot with a delta row's sales added, unchanged if the slot now
+    # holds a different item
+    if current["item_name"] is None or current["item_name"] != row["item_name"]:
+        return current
+    return {**current, "stock": max(int(current["stock"]) + row["stock_delta"], 0)}
+
+
+def rebase_rows(rows: list[dict], current_rows: list[dict]) -> list[dict]:
+    """Rebase rows rejected with a version conflict onto the current rows of their slots.
+
+    Full rows are explicit edits and still win, they are only moved to the current version.
+    Delta rows are re-applied to the current stock, clamped so it doesn't go below 0. A delta
+    whose slot has been given a different item is dropped, the database content wins.
+    """
+    current = {row["slot_name"]: row for row in current_rows}
+
+    rebased = []
+    for row in rows:
+        now = current.get(row["slot_name"])
+        if now is None:
+            rebased.append(row)
+            continue
+
+        if is_delta(row):
+            if now["item_name"] is None or now["item_name"] != row["item_name"]:
+                continue
+            delta = max(row["stock_delta"], -int(now["stock"]))
+            row = {**row, "stock_delta": delta}  # noqa: PLW2901
+        rebased.append({**row, "expected_version": now["version"]})
+    return rebased
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import async_db_communicator
+import db_communicator
+import db_ping
+from api_constants import (
+    BAD_REQUEST,
+    CONFLICT,
+    HEALTH_ROUTE,
+    INVENTORY_ROUTE,
+    MACHINES_ROUTE,
+    NOT_FOUND,
+    STRIPE_ROUTE,
+    SUCCESS,
+)
+
+# Modules that build API urls from BACKEND_HOST, pointed at the stand in while it runs
+CLIENT_MODULES = (async_db_communicator, db_communicator, db_ping)
+
+
+class LocalBackend:
+    """In memory stand in for the vending machine API, served over HTTP on localhost.
+
+    Implements the routes the machine uses with the API's semantics (see src/server/api): mode
+    changes with compare and set, versioned inventory reads (?since) and writes that are
+    rejected with the current rows on a version conflict, stock deltas, and payments that
+    always succeed. Machines and their inventory are added before the machines connect. Every
+    request waits latency seconds before it is answered, standing in for the network and the
+    database, so the machine's requests are timed end to end over real connections.
+
+    Attributes
+    ----------
+    latency: float
+        Seconds every request waits before it is answered
+    url: str
+        Address the stand in serves on once started
+
+    Methods
+    -------
+    def add_machine(self, hardware_id, rows, columns, inventory) -> None
+        Register a machine, inventory maps slot names to (item_name, price, stock)
+    def start(self) -> str
+        Serve on a free localhost port and point the API clients at it, returns the url
+    def stop(self) -> None
+        Stop serving and point the API clients back at BACKEND_HOST
+    def get_mode(self, hardware_id) -> str
+        Returns the mode a machine has in the stand in's database
+    def get_stock(self, hardware_id, slot_name) -> int
+        Returns the stock of a slot in the stand in's database
+    def get_stats(self) -> dict
+        Returns request counts per route, payment counters and the number of version conflicts
+
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.url = ""
+
+        self.__lock = threading.Lock()
+        self.__machines: dict[str, dict] = {}
+        self.__inventories: dict[str, dict] = {}
+        self.__server: ThreadingHTTPServer | None = None
+        self.__hosts: dict[object, str] = {}
+
+        self.__requests: dict[str, int] = {}
+        self.__conflicts = 0
+        self.__charges = 0
+        self.__charged = 0
+
+
+    def add_machine(
+        self, hardware_id: str, rows: int, columns: int,
+        inventory: dict[str, tuple[str, float, int]],
+    ) -> None:
+        with self.__lock:
+            self.__machines[hardware_id] = {
+                "vm_id": hardware_id,
+                "vm_name": hardware_id,
+                "vm_row_count": rows,
+                "vm_column_count": columns,
+                "vm_mode": "i",
+            }
+            self.__inventories[hardware_id] = {
+                "version": 1,
+                "deleted_version": 0,
+                "slots": {
+                    slot_name: {
+                        "slot_name": slot_name,
+                        "item_name": item_name,
+                        "price": f"{price:.2f}",
+                        "stock": stock,
+                        "version": 1,
+                    }
+                    for slot_name, (item_name, price, stock) in inventory.items()
+                },
+            }
+
+
+    def start(self) -> str:
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                backend._serve(self, "GET")
+
+            def do_POST(self) -> None:  # noqa: N802
+                backend._serve(self, "POST")
+
+            def do_PATCH(self) -> None:  # noqa: N802
+                backend._serve(self, "PATCH")
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.__server.server_address[1]}"
+
+        for module in CLIENT_MODULES:
+            self.__hosts[module] = module.BACKEND_HOST
+            module.BACKEND_HOST = self.url
+        return self.url
+
+    def stop(self) -> None:
+        for module, host in self.__hosts.items():
+            module.BACKEND_HOST = host
+        self.__hosts = {}
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+
+    def get_mode(self, hardware_id: str) -> str:
+        with self.__lock:
+            return self.__machines[hardware_id]["vm_mode"]
+
+    def get_stock(self, hardware_id: str, slot_name: str) -> int:
+        with self.__lock:
+            return self.__inventories[hardware_id]["slots"][slot_name]["stock"]
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {
+                "requests": sum(self.__requests.values()),
+                "routes": dict(self.__requests),
+                "conflicts": self.__conflicts,
+                "charges": self.__charges,
+                "charged": self.__charged / 100,
+            }
+
+
+    def _serve(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlsplit(handler.path)
+        segments = [segment for segment in url.path.split("/") if segment]
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length)) if length else None
+
+        if self.latency:
+            time.sleep(self.latency)
+        with self.__lock:
+            route = self.__route_of(segments)
+            self.__requests[route] = self.__requests.get(route, 0) + 1
+            status, response = self.__route(method, segments, parse_qs(url.query), body)
+
+        data = json.dumps(response).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    @staticmethod
+    def __route_of(segments: list[str]) -> str:
+        if segments[:1] == [MACHINES_ROUTE] and len(segments) > 2:  # noqa: PLR2004
+            return segments[2]
+        return segments[0] if segments else ""
+
+    def __route(  # noqa: PLR0911, C901
+        self, method: str, segments: list[str], query: dict, body: object,
+    ) -> tuple[int, object]:
+        # Caller holds the lock
+        if segments == [HEALTH_ROUTE] and method == "GET":
+            return SUCCESS, {"status": "ok"}
+
+        if segments == [STRIPE_ROUTE, "pay"] and method == "POST":
+            if not body or not body.get("amount"):
+                return BAD_REQUEST, {"error": "Amount is required"}
+            self.__charges += 1
+            self.__charged += body["amount"]
+            return SUCCESS, {"success": True}
+
+        if len(segments) < 2 or segments[0] != MACHINES_ROUTE:  # noqa: PLR2004
+            return NOT_FOUND, {"error": "Unknown route"}
+        machine = self.__machines.get(segments[1])
+        if machine is None:
+            return NOT_FOUND, {"error": "Vending machine not found"}
+
+        action = (tuple(segments[2:]), method)
+        inventory = self.__inventories[machine["vm_id"]]
+        if action == ((), "GET"):
+            return SUCCESS, dict(machine)
+        if action == (("register",), "PATCH"):
+            machine["vm_row_count"] = body["vm_row_count"]
+            machine["vm_column_count"] = body["vm_column_count"]
+            return SUCCESS, {"message": "success"}
+        if action == (("mode",), "PATCH"):
+            return self.__set_mode(machine, body)
+        if action == ((INVENTORY_ROUTE,), "GET"):
+            since = query.get("since")
+            return SUCCESS, self.__read_inventory(
+                inventory, None if since is None else int(since[0]))
+        if action == ((INVENTORY_ROUTE,), "POST"):
+            conflicts = self.__conflicting_slots(inventory, body)
+            if conflicts:
+                self.__conflicts += 1
+                return CONFLICT, {
+                    "error": "Inventory rows were changed concurrently",
+                    "conflicts": [self.__slot_row(inventory, name) for name in conflicts],
+                }
+            version = self.__write_inventory(inventory, body)
+            return SUCCESS, {"message": "Items updated successfully", "version": version}
+        return NOT_FOUND, {"error": "Unknown route"}
+
+    @staticmethod
+    def __set_mode(machine: dict, body: dict) -> tuple[int, dict]:
+        modes = ("i", "r", "t")
+        expected = body.get("expected_mode")
+        if body.get("vm_mode") not in modes or (expected is not None and expected not in modes):
+            return BAD_REQUEST, {"error": "Invalid vending machine mode, must be 'i', 'r', or 't'"}
+        if expected is not None and machine["vm_mode"] != expected:
+            return CONFLICT, {
+                "error": "Vending machine mode has changed", "vm_mode": machine["vm_mode"]}
+        machine["vm_mode"] = body["vm_mode"]
+        return SUCCESS, {"message": "Vending machine mode updated successfully"}
+
+    @staticmethod
+    def __read_inventory(inventory: dict, since: int | None) -> dict | list[dict]:
+        rows = list(inventory["slots"].values())
+        if since is None:
+            return [dict(row) for row in rows]
+
+        version = inventory["version"]
+        full = since <= 0 or since < inventory["deleted_version"] or since > version
+        if not full:
+            rows = [row for row in rows if row["version"] > since]
+        return {"version": version, "full": full, "rows": [dict(row) for row in rows]}
+
+    @staticmethod
+    def __conflicting_slots(inventory: dict, rows: list[dict]) -> list[str]:
+        # Slots not at their expected_version, or whose stock a delta would take below 0
+        slots = inventory["slots"]
+        conflicts = []
+        for row in rows:
+            current = slots.get(row["slot_name"])
+            expected = row.get("expected_version")
+            if expected is not None and (current["version"] if current else 0) != expected:
+                conflicts.append(row["slot_name"])
+            elif "stock_delta" in row and (
+                current is None or current["stock"] + row["stock_delta"] < 0
+            ):
+                conflicts.append(row["slot_name"])
+        return conflicts
+
+    @staticmethod
+    def __write_inventory(inventory: dict, rows: list[dict]) -> int:
+        # All rows are written at one new version
+        slots = inventory["slots"]
+        version = inventory["version"] + 1
+        for row in rows:
+            name = row["slot_name"]
+            if "stock_delta" in row:
+                slots[name] = {
+                    **slots[name], "stock": slots[name]["stock"] + row["stock_delta"],
+                    "version": version,
+                }
+            elif row["item_name"] is None:
+                slots.pop(name, None)
+                inventory["deleted_version"] = version
+            else:
+                slots[name] = {
+                    "slot_name": name, "item_name": row["item_name"],
+                    "price": f"{float(row['price']):.2f}", "stock": row["stock"],
+                    "version": version,
+                }
+        inventory["version"] = version
+        return version
+
+    @staticmethod
+    def __slot_row(inventory: dict, slot_name: str) -> dict:
+        # Slots without an item are sent as empty rows at version 0, like the API
+        row = inventory["slots"].get(slot_name)
+        if row is None:
+            return {
+                "slot_name": slot_name, "item_name": None, "price": None, "stock": None,
+                "version": 0,
+            }
+        return dict(row)
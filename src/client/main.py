@@ -1,5 +1,7 @@
+import argparse
 import asyncio
 
+from customer.Hardware import backend
 from customer.Hardware.hardware_constants import (
     I2C_ADDR,
     KEYPAD_COL_PINS,
@@ -17,13 +19,25 @@ from customer.Hardware.hardware_constants import (
     STEP_DELAY,
     STEP_SEQUENCE,
     STEPPER_PINS,
+    STEPPER_PROFILES,
     STEPS_PER_QUARTER_REV,
 )
+from customer.Hardware.motion_profile import MotionProfile
 from customer.Hardware.stepper_motors import StepperMotor
 from customer.hardware_manager import DispenserManager, DisplayManager, InputManager
 from vm_runner import VendingMachineRunner
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the vending machine. With simulated hardware keys are typed on stdin.")
+    backend.add_argument(parser)
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Print request, pipeline, dispensing and input telemetry after every transaction")
+    args = parser.parse_args()
+    # Before any hardware is created
+    backend.select(args.hardware)
+
     input_mgr = InputManager(KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS)
     display_mgr = DisplayManager(
         {
@@ -41,13 +55,27 @@ if __name__ == "__main__":
     )
 
     motors = [
-        [StepperMotor(STEPS_PER_QUARTER_REV, STEP_DELAY, STEP_SEQUENCE, pins) for pins in row]
-        for row in STEPPER_PINS
+        [
+            StepperMotor(
+                STEPS_PER_QUARTER_REV, STEP_DELAY, STEP_SEQUENCE, pins,
+                MotionProfile.from_config(profile),
+            )
+            for pins, profile in zip(row, profile_row, strict=True)
+        ]
+        for row, profile_row in zip(STEPPER_PINS, STEPPER_PROFILES, strict=True)
     ]
 
     dispenser_mgr = DispenserManager(motors)
 
+    if args.hardware == backend.SIMULATED:
+        from customer.Hardware.simulated.console import Console
+
+        console = Console(KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS)
+        console.attach_display(display_mgr.lcd.bus, I2C_ADDR)
+        console.start()
+
     config_file = "customer/configuration.json"
 
-    vm_hw = VendingMachineRunner(input_mgr, display_mgr, dispenser_mgr, config_file)
+    vm_hw = VendingMachineRunner(
+        input_mgr, display_mgr, dispenser_mgr, config_file, show_stats=args.stats)
     asyncio.run(vm_hw.run())
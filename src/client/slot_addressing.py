@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from string import ascii_uppercase
+
+import exceptions as err
+from api_constants import MAX_SLOTS, SLOT_NAME_LENGTH
+from enum_types import SlotNamingScheme
+
+# Row labels of the alphanumeric scheme are one or two letters: A - Z, then AA - ZZ
+MAX_ROW_LETTERS = 2
+
+
+class SlotAddressing:
+    """Precomputed mapping between slot names and flat slot indices (row * width + column).
+
+    Both directions are plain table lookups built once per machine, so resolving a slot name
+    costs the same on a 3 slot machine as on a 10,000 slot locker.
+
+    Naming schemes
+    --------------
+    DIGITS
+        Original naming, row digit followed by column digit, both 0 based ("00" - "99").
+        Limited to 10x10.
+    ALPHANUMERIC
+        Row letters (A - Z, then AA - ZZ) followed by the 1 based column number, padded to the
+        width of the largest column (e.g. "AB12" or "C03" on a machine with 12 columns). Lookups
+        also accept lowercase letters and unpadded column numbers ("c3").
+
+    Attributes
+    ----------
+    height: int
+        Number of rows
+    width: int
+        Number of columns
+    scheme: SlotNamingScheme
+        How slots are named
+    names: list[str]
+        Slot name of every flat slot index
+
+    Methods
+    -------
+    def default_scheme(height, width) -> SlotNamingScheme
+        DIGITS if the dimensions fit in it, ALPHANUMERIC otherwise
+    def max_dimensions(scheme) -> tuple[int, int]
+        Largest number of rows and columns a scheme can name
+    def get_index(self, slot_name) -> int
+        Returns the flat index of a slot
+    def get_name(self, index) -> str
+        Returns the slot name of a flat index
+    def get_coordinates(self, slot_name) -> tuple[int, int]
+        Returns the row and column of a slot
+
+    """
+
+    def __init__(
+        self, height: int, width: int, scheme: SlotNamingScheme | None = None,
+    ) -> None:
+        if scheme is None:
+            scheme = self.default_scheme(height, width)
+
+        max_height, max_width = self.max_dimensions(scheme)
+        if (
+            height <= 0 or width <= 0 or height > max_height or width > max_width
+            or height * width > MAX_SLOTS
+        ):
+            raise err.InvalidDimensionsError(
+                f"{scheme.name} slot names support 0 < height <= {max_height}, "
+                f"0 < width <= {max_width} and at most {MAX_SLOTS} slots",
+            )
+
+        self.height = height
+        self.width = width
+        self.scheme = scheme
+
+        if scheme is SlotNamingScheme.DIGITS:
+            self.names = [f"{r}{c}" for r in range(height) for c in range(width)]
+            aliases = {}
+        else:
+            digits = len(str(width))
+            rows = [row_label(r) for r in range(height)]
+            self.names = [f"{row}{c + 1:0{digits}d}" for row in rows for c in range(width)]
+            # Unpadded spellings of the padded column numbers ("A1" for "A01")
+            aliases = {
+                f"{row}{c + 1}": r * width + c
+                for r, row in enumerate(rows) for c in range(min(width, 9)) if digits > 1
+            }
+
+        self.__lookup = {name: index for index, name in enumerate(self.names)}
+        self.__lookup.update(aliases)
+
+
+    @staticmethod
+    def default_scheme(height: int, width: int) -> SlotNamingScheme:
+        max_height, max_width = SlotAddressing.max_dimensions(SlotNamingScheme.DIGITS)
+        if height <= max_height and width <= max_width:
+            return SlotNamingScheme.DIGITS
+        return SlotNamingScheme.ALPHANUMERIC
+
+    @staticmethod
+    def max_dimensions(scheme: SlotNamingScheme) -> tuple[int, int]:
+        if scheme is SlotNamingScheme.DIGITS:
+            return 10, 10
+
+        # Names have to fit in the database column, letters first then digits
+        letters = len(ascii_uppercase)
+        return letters + letters ** 2, 10 ** (SLOT_NAME_LENGTH - MAX_ROW_LETTERS) - 1
+
+
+    def get_index(self, slot_name: str) -> int:
+        index = self.__lookup.get(slot_name)
+        if index is None:
+            index = self.__lookup.get(slot_name.upper())
+            if index is None:
+                raise err.InvalidSlotNameError("Invalid slot name " + slot_name)
+        return index
+
+    def get_name(self, index: int) -> str:
+        return self.names[index]
+
+    def get_coordinates(self, slot_name: str) -> tuple[int, int]:
+        return divmod(self.get_index(slot_name), self.width)
+
+
+def row_label(row: int) -> str:
+    # Bijective base 26: 0 -> A, 25 -> Z, 26 -> AA, 701 -> ZZ
+    label = ""
+    row += 1
+    while row > 0:
+        row, remainder = divmod(row - 1, len(ascii_uppercase))
+        label = ascii_uppercase[remainder] + label
+    return label
+
+
+def slot_naming_from_config(config: dict) -> SlotNamingScheme | None:
+    # Optional "slot_naming" key of customer/configuration.json ("digits" or "alphanumeric"),
+    # None picks the default scheme for the machine's dimensions
+    if config.get("slot_naming") is None:
+        return None
+    try:
+        return SlotNamingScheme[config["slot_naming"].upper()]
+    except KeyError:
+        raise err.InvalidDimensionsError(
+            "Unknown slot naming scheme " + config["slot_naming"]) from None
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+CHARGE_STAGE = "charge"
+SAVE_STAGE = "save"
+COMMIT_STAGE = "commit"
+STAGES = (CHARGE_STAGE, SAVE_STAGE, COMMIT_STAGE)
+
+
+class TransactionPipeline:
+    """Completes a transaction in stages: the charge and the inventory write run concurrently,
+    the mode transition is committed once both have succeeded.
+
+    The customer waits for max(charge, save) + commit instead of charge + save + commit.
+
+    Rollback / compensation
+    -----------------------
+    Items are already dispensed when a transaction ends, so a completed stage is never undone:
+    a sale that was written stays written and a card that was charged stays charged. If either
+    concurrent stage fails the commit is skipped, the machine stays in TRANSACTION and the
+    first error is raised (the charge's before the save's). The caller records which stages
+    completed and passes None for those on the next attempt, so retrying never charges twice
+    and the transaction only ends once every stage has succeeded.
+
+    Methods
+    -------
+    def run(self, charge, save, commit) -> None
+        Run the stages from a synchronous caller, the charge runs on a worker thread
+    async def run_async(self, charge, save, commit) -> None
+        Run the stages as coroutines on the event loop
+    def get_stats(self) -> dict
+        Returns run counters and the last and average duration of every stage
+
+    """
+
+    def __init__(self) -> None:
+        self.__executor: ThreadPoolExecutor | None = None
+
+        self.__runs = 0
+        self.__rollbacks = 0
+        self.__overlap_saved = 0.0
+        self.__count = dict.fromkeys(STAGES, 0)
+        self.__failures = dict.fromkeys(STAGES, 0)
+        self.__total = dict.fromkeys(STAGES, 0.0)
+        self.__last = dict.fromkeys(STAGES, 0.0)
+        self.__current = dict.fromkeys(STAGES, 0.0)
+
+
+    def run(
+        self,
+        charge: Callable[[], object] | None,
+        save: Callable[[], object] | None,
+        commit: Callable[[], object],
+    ) -> None:
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="charge")
+
+        self.__current = dict.fromkeys(STAGES, 0.0)
+        start = time.perf_counter()
+        future = self.__executor.submit(self.__timed, CHARGE_STAGE, charge) if charge else None
+        save_error = self.__capture(self.__timed, SAVE_STAGE, save) if save else None
+        charge_error = future.exception() if future else None
+
+        self.__settle(charge_error, save_error, start)
+        self.__timed(COMMIT_STAGE, commit)
+        self.__runs += 1
+
+
+    async def run_async(
+        self,
+        charge: Callable[[], Awaitable[object]] | None,
+        save: Callable[[], Awaitable[object]] | None,
+        commit: Callable[[], Awaitable[object]],
+    ) -> None:
+        self.__current = dict.fromkeys(STAGES, 0.0)
+        start = time.perf_counter()
+        charge_error, save_error = await asyncio.gather(
+            self.__async_timed(CHARGE_STAGE, charge),
+            self.__async_timed(SAVE_STAGE, save),
+        )
+
+        self.__settle(charge_error, save_error, start)
+        error = await self.__async_timed(COMMIT_STAGE, commit)
+        if error is not None:
+            raise error
+        self.__runs += 1
+
+
+    def get_stats(self) -> dict:
+        stats = {
+            "runs": self.__runs,
+            "rollbacks": self.__rollbacks,
+            "overlap_saved": self.__overlap_saved,
+        }
+        for stage in STAGES:
+            count = self.__count[stage]
+            stats[stage] = {
+                "count": count,
+                "failures": self.__failures[stage],
+                "last": self.__last[stage],
+                "avg": self.__total[stage] / count if count else 0.0,
+            }
+        return stats
+
+
+    def __settle(
+        self, charge_error: BaseException | None, save_error: BaseException | None, start: float,
+    ) -> None:
+        # Time the customer did not wait thanks to running the stages side by side
+        self.__overlap_saved += max(
+            0.0,
+            self.__current[CHARGE_STAGE] + self.__current[SAVE_STAGE]
+            - (time.perf_counter() - start),
+        )
+
+        error = charge_error or save_error
+        if error is not None:
+            # Roll back: don't commit the mode, completed stages are skipped on the retry
+            self.__rollbacks += 1
+            raise error
+
+    def __timed(self, stage: str, func: Callable[[], object]) -> object:
+        start = time.perf_counter()
+        try:
+            return func()
+        except BaseException:
+            self.__failures[stage] += 1
+            raise
+        finally:
+            self.__record(stage, time.perf_counter() - start)
+
+    async def __async_timed(
+        self, stage: str, func: Callable[[], Awaitable[object]] | None,
+    ) -> BaseException | None:
+        # Returns the error instead of raising, so one failing stage doesn't cancel the other
+        if func is None:
+            return None
+        start = time.perf_counter()
+        try:
+            await func()
+        except Exception as e:  # noqa: BLE001
+            self.__failures[stage] += 1
+            return e
+        finally:
+            self.__record(stage, time.perf_counter() - start)
+        return None
+
+    def __record(self, stage: str, elapsed: float) -> None:
+        self.__count[stage] += 1
+        self.__total[stage] += elapsed
+        self.__last[stage] = elapsed
+        self.__current[stage] = elapsed
+
+    @staticmethod
+    def __capture(func: Callable[..., object], *args: object) -> BaseException | None:
+        try:
+            func(*args)
+        except Exception as e:  # noqa: BLE001
+            return e
+        return None
@@ -5,6 +5,7 @@ import textwrap
 import exceptions as err
 from api_constants import NOT_FOUND
 from customer.vending_machine import VendingMachine
+from slot_addressing import slot_naming_from_config
 
 vending_machine: VendingMachine = None
 
@@ -18,7 +19,8 @@ def main():
         hardware_id = data["hardware_id"]
 
         try:
-            vending_machine = VendingMachine(row, col, hardware_id)
+            vending_machine = VendingMachine(
+                row, col, hardware_id, slot_naming=slot_naming_from_config(data))
         except err.InvalidDimensionsError as e:
             print("Error: ", e)
             sys.exit(1)
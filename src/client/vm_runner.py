@@ -3,7 +3,10 @@ import json
 import sys
 
 import exceptions as err
-from api_constants import NOT_FOUND
+from api_constants import JOURNAL_PATH, NOT_FOUND
+from async_http_transport import close_async_transport, get_async_transport
+from circuit_breaker import get_breaker
+from customer.async_vending_machine import AsyncVendingMachine
 from customer.Hardware.hardware_constants import (
     CARD_INFO_KEY,
     DELETE_KEY,
@@ -12,12 +15,24 @@ from customer.Hardware.hardware_constants import (
     LCD_LINE_1,
     LCD_LINE_2,
 )
-from customer.hardware_manager import DispenserManager, DisplayManager, InputManager
-from customer.vending_machine import VendingMachine
+from customer.hardware_manager import (
+    DispenseQueue,
+    DispenserManager,
+    DisplayManager,
+    InputManager,
+)
+from db_ping import HealthProber
+from enum_types import InventoryManagerMode
+from slot_addressing import slot_naming_from_config
 
 
 class VendingMachineRunner:
-    """Class runs on the pi and integrates database inventory functionality and hardware."""
+    """Class runs on the pi and integrates database inventory functionality and hardware.
+
+    Paid and free selections go to a DispenseQueue, the keypad is read again right away while
+    the motors work through the queue. With show_stats the telemetry of every subsystem is
+    printed after each transaction (log_stats).
+    """
 
     def __init__(
         self,
@@ -25,43 +40,69 @@ class VendingMachineRunner:
         display_mgr: DisplayManager,
         dispenser_mgr: DispenserManager,
         config_file: str,
+        *,
+        show_stats: bool = False,
     ) -> None:
         self.input = input_mgr
         self.display = display_mgr
         self.dispenser = dispenser_mgr
-        self.vending_machine: VendingMachine = None
+        self.dispense_queue = DispenseQueue(dispenser_mgr)
+        self.vending_machine: AsyncVendingMachine = None
+        self.health_prober = HealthProber()
+        self.show_stats = show_stats
 
         with open(config_file) as file:  # noqa: PTH123
-            data = json.load(file)
-            row = data["rows"]
-            col = data["columns"]
-            hardware_id = data["hardware_id"]
+            self.config = json.load(file)
 
-            try:
-                self.vending_machine = VendingMachine(row, col, hardware_id)
-            except err.InvalidDimensionsError as e:
-                print("Error: ", e)
-                sys.exit(1)
-            except err.QueryFailureError as e:
-                print("Error: ", e)
-                if(e.status_code == NOT_FOUND):
-                    print("Vending Machine not Registered on Vendor Side.")
-                sys.exit(1)
+    async def load_vending_machine(self):
+        # Loading queries the database, so it happens on the event loop rather than in __init__.
+        # Optional "journal_path" and "notifications" (MQTT, default true) keys let several
+        # machines run in one process, see benchmarks/bench_runner_load.py
+        try:
+            self.vending_machine = await AsyncVendingMachine.create(
+                self.config["rows"],
+                self.config["columns"],
+                self.config["hardware_id"],
+                slot_naming_from_config(self.config),
+                journal_path=self.config.get("journal_path", JOURNAL_PATH),
+                notifications=self.config.get("notifications", True),
+            )
+        except err.InvalidDimensionsError as e:
+            print("Error: ", e)
+            sys.exit(1)
+        except err.QueryFailureError as e:
+            print("Error: ", e)
+            if(e.status_code == NOT_FOUND):
+                print("Vending Machine not Registered on Vendor Side.")
+            sys.exit(1)
 
     async def run(self):
+        await self.load_vending_machine()
+
+        # Once running, requests fail immediately while the API is known to be down instead of
+        # freezing the machine mid transaction. The prober keeps the breaker up to date.
+        get_breaker().fail_fast = True
+        self.health_prober.start()
+
         await self.input.start()
         await self.display.start()
+        await self.dispense_queue.start()
         try:
             await self.run_default_state()
         finally:
+            self.health_prober.stop()
+            await self.dispense_queue.close()
+            self.dispenser.close()
+            await self.display.close()
             await self.input.close()
+            await close_async_transport()
 
     async def run_default_state(self):
         # Endlessly run default state and execute based on inputs accordingly
         while True:
             input_string = await self.get_and_display_input(
                 f"CHOOSE SLOT OR {CARD_INFO_KEY}",
-                "",
+                self.queue_status(),
                 {CARD_INFO_KEY},
             )
             if input_string is CARD_INFO_KEY:
@@ -70,16 +111,20 @@ class VendingMachineRunner:
                     await self.perform_transaction()
                 except err.InvalidModeError as e:
                     print("Error: " + str(e))
-                    await self.display.show_text("INVALID MODE", LCD_LINE_1)
+                    self.display.show_text("INVALID MODE", LCD_LINE_1)
                     await asyncio.sleep(1)
+                except err.BackendUnavailableError as e:
+                    await self.show_offline(e)
             else:
                 try:
                     # Free item is chosen, dispense
                     await self.dispense_free_item(input_string)
+                except err.BackendUnavailableError as e:
+                    await self.show_offline(e)
                 except err.NotFreeItemError:
                     # Normal item is chosen, show price (can't dispense unless transaction start)
                     price = self.vending_machine.get_price(input_string)
-                    await self.display.show_text(
+                    self.display.show_text(
                         f"${price:.2f}",
                         LCD_LINE_1,
                     )
@@ -88,32 +133,29 @@ class VendingMachineRunner:
     async def dispense_free_item(self, selection: str):
         try:
             # Dispense item in software
-            dispensed_item = self.vending_machine.buy_free_item(selection)
+            dispensed_item = await self.vending_machine.buy_free_item(selection)
 
-            # If successfully dispensed in software, dispense in hardware
-            await self.display.show_text("Dispensing " + selection, LCD_LINE_1)
-            row, col = self.vending_machine.inv_man.get_coordinates_from_slotname(selection)
-            await self.dispenser.dispense(row, col)
-            print("Dispensing Item: " + dispensed_item)
+            # If successfully dispensed in software, queue it for the hardware
+            await self.queue_dispense(selection, dispensed_item)
         except err.NegativeStockError:
             print("Item at this slot is out of stock, please try another.")
-            await self.display.show_text("OUT OF STOCK", LCD_LINE_1)
+            self.display.show_text("OUT OF STOCK", LCD_LINE_1)
             await asyncio.sleep(1)
         except err.EmptySlotError as e:
-            await self.display.show_text("OUT OF STOCK", LCD_LINE_1)
+            self.display.show_text("OUT OF STOCK", LCD_LINE_1)
             print("Error: ", e)
             await asyncio.sleep(1)
         except err.InvalidSlotNameError as e:
-            await self.display.show_text("INVALID SLOT", LCD_LINE_1)
+            self.display.show_text("INVALID SLOT", LCD_LINE_1)
             print("Error: ", e)
             await asyncio.sleep(1)
 
     async def perform_transaction(self):
-        await self.display.show_text("ENTERING PAYMENT", LCD_LINE_1)
+        self.display.show_text("ENTERING PAYMENT", LCD_LINE_1)
         await asyncio.sleep(1)
 
         try:
-            self.vending_machine.start_transaction()
+            await self.vending_machine.start_transaction()
             # All the stripe API payment stuff should happen inside here ^^
         except err.InvalidModeError as e:
             print("Error: " + str(e))
@@ -125,46 +167,112 @@ class VendingMachineRunner:
         while True:
             selection = await self.get_and_display_input(
                 "ENTER SLOT OR " + END_TRANSACTION_KEY,
-                "",
+                self.queue_status(),
                 {END_TRANSACTION_KEY},
             )
 
             # End transaction
             if selection is END_TRANSACTION_KEY:
                 try:
-                    charged_value = self.vending_machine.end_transaction()
-                    await self.display.show_text(f"CHARGED ${charged_value:.2f}", LCD_LINE_1)
+                    charged_value = await self.vending_machine.end_transaction()
+                    self.display.show_text(f"CHARGED ${charged_value:.2f}", LCD_LINE_1)
                     await asyncio.sleep(2)
                     print(f"Payment method was charged {charged_value}")
+                    if self.show_stats:
+                        self.log_stats()
                 except err.QueryFailureError as e:
                     print("Error: ", e)
+                    if self.vending_machine.inv_man.get_mode() is InventoryManagerMode.TRANSACTION:
+                        # A stage failed and was rolled back, retrying finishes what is left
+                        self.display.show_text("FAILED, RETRY", LCD_LINE_1)
+                        await asyncio.sleep(1)
+                        continue
+                except err.BackendUnavailableError as e:
+                    # Transaction stays open so the customer can retry ending it
+                    await self.show_offline(e)
+                    continue
                 return
 
             try:
                 # Dispense item in software
                 dispensed_item = self.vending_machine.buy_item(selection)
 
-                # Dispense item in hardware
-                await self.display.show_text("Dispensing " + selection, LCD_LINE_1)
-                row, col = self.vending_machine.inv_man.get_coordinates_from_slotname(selection)
-                await self.dispenser.dispense(row, col)
-                print("Dispensing Item: " + dispensed_item)
+                # Queue item for the hardware, the customer can choose the next one meanwhile
+                await self.queue_dispense(selection, dispensed_item)
             except err.NegativeStockError:
                 print("Item at this slot is out of stock, please try another.")
-                await self.display.show_text("OUT OF STOCK", LCD_LINE_1)
+                self.display.show_text("OUT OF STOCK", LCD_LINE_1)
                 await asyncio.sleep(1)
             except err.EmptySlotError as e:
                 print("Error: ", e)
-                await self.display.show_text("OUT OF STOCK", LCD_LINE_1)
+                self.display.show_text("OUT OF STOCK", LCD_LINE_1)
                 await asyncio.sleep(1)
             except err.InvalidSlotNameError as e:
                 print("Error: ", e)
-                await self.display.show_text("INVALID SLOT", LCD_LINE_1)
+                self.display.show_text("INVALID SLOT", LCD_LINE_1)
                 await asyncio.sleep(1)
 
+    def log_stats(self) -> None:
+        # Telemetry of the subsystems, printed after every transaction with --stats
+        stats = get_async_transport().get_stats()
+        print(
+            f"Requests: {stats['requests']}, "
+            f"reused connections: {stats['connections_reused']}, "
+            f"avg latency: {stats['avg_latency'] * 1000:.1f}ms",
+        )
+        stages = self.vending_machine.pipeline.get_stats()
+        print(
+            "Transaction stages: "
+            + ", ".join(
+                f"{stage} {stages[stage]['last'] * 1000:.1f}ms"
+                for stage in ("charge", "save", "commit"))
+            + f", overlap saved {stages['overlap_saved'] * 1000:.1f}ms total",
+        )
+        dispensing = self.dispense_queue.get_stats()
+        print(
+            f"Dispensed {dispensing['dispensed']} items, "
+            f"{dispensing['pending']} queued, "
+            f"{dispensing['items_per_minute']:.1f} items/min",
+        )
+        steps = self.dispenser.scheduler.get_stats()
+        print(
+            f"Step rate: {steps['achieved_rate']:.0f} of "
+            f"{steps['target_rate']:.0f} steps/s, {steps['late_ticks']} late ticks",
+        )
+        keys = self.input.get_stats()
+        print(
+            f"Input latency: avg {keys['input_latency'] * 1000:.1f}ms, "
+            f"max {keys['max_input_latency'] * 1000:.1f}ms, "
+            f"{keys['dropped']} keys dropped",
+        )
+        frames = self.display.get_stats()
+        print(
+            f"Display: drew {frames['drawn']} of {frames['posted']} texts, "
+            f"{frames['coalesced']} replaced before drawing",
+        )
+
+    async def queue_dispense(self, selection: str, dispensed_item: str):
+        row, col = self.vending_machine.inv_man.get_coordinates_from_slotname(selection)
+        # Dispenses run concurrently as the motor scheduler admits them, so there is no place in
+        # line to show, queue_status shows how many are pending
+        pending = self.dispense_queue.submit(selection, row, col)
+        print(f"Dispensing Item: {dispensed_item} ({pending} pending)")
+        self.display.show_text(f"QUEUED {selection}", LCD_LINE_1)
+        await asyncio.sleep(0.5)
+
+    def queue_status(self) -> str:
+        # Shown on the second line until the customer starts typing
+        pending = self.dispense_queue.pending()
+        return f"{pending} DISPENSING" if pending else ""
+
+    async def show_offline(self, e: err.BackendUnavailableError):
+        print("Error: ", e)
+        self.display.show_text("OFFLINE, RETRY", LCD_LINE_1)
+        await asyncio.sleep(1)
+
     async def get_and_display_input(self, line1: str, line2: str, return_keys: list[str]) -> str:
-        await self.display.show_text(line1, LCD_LINE_1)
-        await self.display.show_text(line2, LCD_LINE_2)
+        self.display.show_text(line1, LCD_LINE_1)
+        self.display.show_text(line2, LCD_LINE_2)
         input_string = ""
 
         while True:
@@ -182,4 +290,4 @@ class VendingMachineRunner:
             else:
                 input_string += key
 
-            await self.display.show_text(input_string, LCD_LINE_2)
+            self.display.show_text(input_string, LCD_LINE_2)
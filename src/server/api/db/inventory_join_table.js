@@ -1,23 +1,52 @@
 const db = require("./db_connection"); // Import database connection
 
+// Runs write(conn, version) in a transaction after bumping the vending machine's inventory
+// version. The vending machine row stays locked until commit, so a reader that sees the new
+// version also sees the write and delta syncs (GET ?since=) never skip a row.
+const versioned_write = async (vendingMachineID, deleted, write) => {
+    const conn = await db.getConnection();
+    try {
+        await conn.beginTransaction();
+        // LAST_INSERT_ID(expr) hands the incremented version back as insertId
+        const [bump] = await conn.query(`UPDATE vending_machines 
+            SET vm_inventory_version = LAST_INSERT_ID(vm_inventory_version + 1)
+            ${deleted ? ", vm_inventory_deleted_version = vm_inventory_version" : ""}
+            WHERE vm_id = ?`,
+            [vendingMachineID]);
+        const result = await write(conn, bump.insertId);
+        await conn.commit();
+        return result;
+    } catch (err) {
+        await conn.rollback();
+        throw err;
+    } finally {
+        conn.release();
+    }
+};
+
 const add_to_slot = async (vendingMachineID, slotName, itemID, price, stock) => {
-    await db.query(`INSERT INTO inventory_join_table 
-        (IJT_vm_id, IJT_slot_name, IJT_item_id, IJT_price, IJT_stock) 
-        VALUES (?, ?, ?, ?, ?)`,
-        [vendingMachineID, slotName, itemID, price, stock]);
+    return versioned_write(vendingMachineID, false, (conn, version) =>
+        conn.query(`INSERT INTO inventory_join_table 
+            (IJT_vm_id, IJT_slot_name, IJT_item_id, IJT_price, IJT_stock, IJT_version) 
+            VALUES (?, ?, ?, ?, ?, ?)`,
+            [vendingMachineID, slotName, itemID, price, stock, version]));
 };
 
 const update_slot = async (vendingMachineID, slotName, itemID, price, stock) => {
-    return await db.query(`UPDATE inventory_join_table 
-        SET IJT_item_id = ?, IJT_price = ?, IJT_stock = ? 
-        WHERE IJT_vm_id = ? AND IJT_slot_name = ?`,
-        [itemID, price, stock, vendingMachineID, slotName]);
+    return versioned_write(vendingMachineID, false, (conn, version) =>
+        conn.query(`UPDATE inventory_join_table 
+            SET IJT_item_id = ?, IJT_price = ?, IJT_stock = ?, IJT_version = ? 
+            WHERE IJT_vm_id = ? AND IJT_slot_name = ?`,
+            [itemID, price, stock, version, vendingMachineID, slotName]));
 };
 
+// Deleted rows cannot be returned by a delta, so deleting records the version and readers
+// that synced before it get a full snapshot instead
 const delete_slot = async (vendingMachineID, slotName) => {
-    return await db.query(`DELETE FROM inventory_join_table 
-        WHERE IJT_vm_id = ? AND IJT_slot_name = ?`, 
-        [vendingMachineID, slotName]);
+    return versioned_write(vendingMachineID, true, (conn) =>
+        conn.query(`DELETE FROM inventory_join_table 
+            WHERE IJT_vm_id = ? AND IJT_slot_name = ?`, 
+            [vendingMachineID, slotName]));
 }
 
 const modify_item_slot = async (vendingMachineID, slotName, itemID, price, stock) => {
@@ -40,4 +69,92 @@ const modify_item_slot = async (vendingMachineID, slotName, itemID, price, stock
     }
 };
 
-module.exports = { add_to_slot, update_slot, delete_slot, modify_item_slot };
\ No newline at end of file
+// Applies a batch of rows in one transaction under a single version bump. Rows carrying
+// expected_version are only applied if their slot is still at that version (a missing slot is
+// version 0); otherwise nothing is written and the error has the conflicting slot names in
+// err.conflicts. Rows with stock_delta add to the stored stock instead of replacing the slot.
+// Returns the version the rows were written at.
+const apply_versioned_rows = async (vendingMachineID, rows) => {
+    const deleted = rows.some((row) => row.stock_delta === undefined && row.item_id === null);
+    return versioned_write(vendingMachineID, deleted, async (conn, version) => {
+        const slotNames = rows.map((row) => row.slot_name);
+        const [current] = slotNames.length === 0 ? [[]] : await conn.query(`SELECT 
+                IJT_slot_name AS slot_name, IJT_version AS version 
+            FROM inventory_join_table 
+            WHERE IJT_vm_id = ? AND IJT_slot_name IN (?) FOR UPDATE`,
+            [vendingMachineID, slotNames]);
+        const versions = new Map(current.map((row) => [row.slot_name, row.version]));
+
+        const conflicts = rows
+            .filter((row) => row.expected_version !== undefined && row.expected_version !== null)
+            .filter((row) => (versions.get(row.slot_name) ?? 0) !== row.expected_version)
+            .map((row) => row.slot_name);
+        if(conflicts.length > 0) {
+            const conflict = new Error("Inventory rows were changed concurrently");
+            conflict.conflicts = conflicts;
+            throw conflict;
+        }
+
+        for(const row of rows) {
+            if(row.stock_delta !== undefined) {
+                const [result] = await conn.query(`UPDATE inventory_join_table 
+                    SET IJT_stock = IJT_stock + ?, IJT_version = ? 
+                    WHERE IJT_vm_id = ? AND IJT_slot_name = ? AND IJT_stock + ? >= 0`,
+                    [row.stock_delta, version, vendingMachineID, row.slot_name, row.stock_delta]);
+                if(result.affectedRows === 0) {
+                    // Slot is gone or would go below 0, the client has to merge it again
+                    const conflict = new Error("Stock delta cannot be applied");
+                    conflict.conflicts = [row.slot_name];
+                    throw conflict;
+                }
+            } else if(row.item_id === null) {
+                await conn.query(`DELETE FROM inventory_join_table 
+                    WHERE IJT_vm_id = ? AND IJT_slot_name = ?`,
+                    [vendingMachineID, row.slot_name]);
+            } else {
+                await conn.query(`INSERT INTO inventory_join_table 
+                    (IJT_vm_id, IJT_slot_name, IJT_item_id, IJT_price, IJT_stock, IJT_version) 
+                    VALUES (?, ?, ?, ?, ?, ?) 
+                    ON DUPLICATE KEY UPDATE IJT_item_id = VALUES(IJT_item_id), 
+                        IJT_price = VALUES(IJT_price), IJT_stock = VALUES(IJT_stock), 
+                        IJT_version = VALUES(IJT_version)`,
+                    [vendingMachineID, row.slot_name, row.item_id, row.price, row.stock, version]);
+            }
+        }
+        return version;
+    });
+};
+
+// Returns the current rows (with their versions) of some slots, slots without an item are
+// returned as empty rows at version 0
+const get_slot_rows = async (vendingMachineID, slotNames) => {
+    const [results] = await db.query(`SELECT 
+            ijt.IJT_slot_name AS slot_name, 
+            items.item_name AS item_name, 
+            ijt.IJT_price AS price, 
+            ijt.IJT_stock AS stock, 
+            ijt.IJT_version AS version 
+        FROM inventory_join_table AS ijt 
+        INNER JOIN items ON ijt.IJT_item_id = items.item_id 
+        WHERE ijt.IJT_vm_id = ? AND ijt.IJT_slot_name IN (?)`,
+        [vendingMachineID, slotNames]);
+    const found = new Map(results.map((row) => [row.slot_name, row]));
+    return slotNames.map((slot_name) => found.get(slot_name) ?? 
+        { slot_name, item_name: null, price: null, stock: null, version: 0 });
+};
+
+// Returns the current inventory version of a vending machine and the version of its latest
+// slot delete
+const get_versions = async (vendingMachineID) => {
+    const [results] = await db.query(`SELECT 
+            vm_inventory_version AS version, 
+            vm_inventory_deleted_version AS deleted_version 
+        FROM vending_machines WHERE vm_id = ?`,
+        [vendingMachineID]);
+    return results[0];
+};
+
+module.exports = { 
+    add_to_slot, update_slot, delete_slot, modify_item_slot, apply_versioned_rows, get_slot_rows, 
+    get_versions,
+};
@@ -31,6 +31,12 @@ function notifyDatabaseChange(vendingMachineID) {
     console.log(`Published to ${topic}: ${vendingMachineID} restocked`);
 }
 
+// Send notification to vending machine that its mode was changed
+function notifyModeChange(vendingMachineID, mode) {
+    const topic = `vm/mode/${vendingMachineID}`;
+    client.publish(topic, mode, { qos: 1, retain: true });
+}
+
 // Sends restock notification if VM just finished restocking
 async function notifyIfRestock(vendingMachineID) {
     const [results] = await db.query(
@@ -107,6 +113,7 @@ function getLocation(hardwareId) {
 
 module.exports = {
     notifyIfRestock,
+    notifyModeChange,
     healthCheck,
     getLocation
 };
@@ -2,7 +2,7 @@ const express = require("express");
 const router = express.Router();
 const VM = require("../db/vending_machine");
 const db = require("../db/db_connection");
-const { healthCheck } = require("../mqtt/mqtt");
+const { healthCheck, notifyModeChange } = require("../mqtt/mqtt");
 
 // Nested inventory routes
 router.use("/:id/inventory", require("./vending_machine_items"));
@@ -131,19 +131,37 @@ router.patch("/:id/register", async (req, res) => {
 });
 
 // Change mode
+// With expected_mode the change is a compare-and-set: it only happens if the current mode is
+// expected_mode, otherwise 409 is returned together with the current mode
 router.patch("/:id/mode", async (req, res) => {
     try {
-        const { vm_mode } = req.body;
+        const { vm_mode, expected_mode } = req.body;
+        const isMode = (mode) => mode === "i" || mode === "r" || mode === "t";
 
-        if(vm_mode !== "i" && vm_mode !== "r" && vm_mode !== "t") {
+        if(!isMode(vm_mode) || (expected_mode !== undefined && !isMode(expected_mode))) {
             res.status(400).json({ error: "Invalid vending machine mode, must be 'i', 'r', or 't'" });
             return;
         }
 
-        const [results] = await db.query("UPDATE vending_machines SET vm_mode = ? WHERE vm_id = ?", [vm_mode, req.params.id]);
+        const [results] = expected_mode === undefined
+            ? await db.query("UPDATE vending_machines SET vm_mode = ? WHERE vm_id = ?", [vm_mode, req.params.id])
+            : await db.query(
+                "UPDATE vending_machines SET vm_mode = ? WHERE vm_id = ? AND vm_mode = ?",
+                [vm_mode, req.params.id, expected_mode]);
+
+        if (results.affectedRows === 0 && expected_mode !== undefined) {
+            const [current] = await db.query("SELECT vm_mode FROM vending_machines WHERE vm_id = ?", [req.params.id]);
+            if (current.length > 0) {
+                res.status(409).json({ error: "Vending machine mode has changed", vm_mode: current[0].vm_mode });
+                return;
+            }
+        }
+
         if (results.affectedRows === 0) {
             res.status(404).json({ error: "Vending machine not found" });
         } else {
+            // Lets the machine drop its cached mode
+            notifyModeChange(req.params.id, vm_mode);
             res.json({ message: "Vending machine mode updated successfully" });
         }
     } catch (err) {
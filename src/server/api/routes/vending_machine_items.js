@@ -7,24 +7,42 @@ const VM = require("../db/vending_machine"); // Import vending_machine functions
 const mqtt = require("../mqtt/mqtt") // Import mqtt functions
 
 // Get all items for a vending machine
+// With ?since=<version> the response is { version, full, rows }: rows holds only slots written
+// after that version, or every slot (full = true) if a slot was deleted since then or since is 0
 router.get("/", async (req, res) => {
     try {
         const vendingMachineId = req.params.id; // Get vending machine ID from URL
         // Check if vending machine exists
         if(!await VM.vendingMachineExists(vendingMachineId, res)) return;
 
+        const since = req.query.since === undefined ? null : Number(req.query.since);
+        if(since !== null && !Number.isInteger(since)) {
+            res.status(400).json({ error: "since must be an integer version" });
+            return;
+        }
+
+        // Read the version before the rows: a write committed in between is sent again next
+        // sync, which is harmless, instead of being skipped
+        const { version, deleted_version } = await IJT.get_versions(vendingMachineId);
+        const full = since === null || since <= 0 || since < deleted_version || since > version;
+
         const [results] = await db.query(`
             SELECT 
                 ijt.IJT_slot_name AS slot_name, 
                 items.item_name AS item_name, 
                 ijt.IJT_price AS price, 
-                ijt.IJT_stock AS stock
+                ijt.IJT_stock AS stock,
+                ijt.IJT_version AS version
             FROM inventory_join_table AS ijt
             INNER JOIN items ON ijt.IJT_item_id = items.item_id
-            WHERE ijt.IJT_vm_id = ?
-        `, [vendingMachineId]);
+            WHERE ijt.IJT_vm_id = ? ${full ? "" : "AND ijt.IJT_version > ?"}
+        `, full ? [vendingMachineId] : [vendingMachineId, since]);
 
-        res.json(results);
+        if(since === null) {
+            res.json(results);
+            return;
+        }
+        res.json({ version, full, rows: results });
     } catch (err) {
         res.status(500).json({ error: err.message });
     }
@@ -124,6 +142,10 @@ router.delete("/:slot_name", async (req, res) => {
 });
 
 // Batch operation to update many rows in inventory_join_table
+// Rows are { slot_name, item_name, price, stock } (item_name null empties the slot) or
+// { slot_name, stock_delta } to add to the stored stock. Rows with expected_version are only
+// written if their slot is still at that version; if any is not, nothing is written and 409 is
+// returned with the current rows of the conflicting slots so the client can merge them.
 router.post("/", async (req, res) => {
     try {
         const vendingMachineId = req.params.id;
@@ -132,25 +154,31 @@ router.post("/", async (req, res) => {
 
         const rows = req.body;
 
-        // Loop through each row and perform specified operation
+        // Add items to items table if they do not exist
         for(const row of rows) {
-            const { slot_name, item_name, price, stock } = row;
-
-            // Add item to items table if it does not exist
-            var item_id = null;
-            if(item_name !== null) {
-                await items.create_item_if_not_exists(item_name);
-                item_id = await items.getItemIdByName(item_name);
+            row.item_id = null;
+            if(row.stock_delta === undefined && row.item_name !== null) {
+                await items.create_item_if_not_exists(row.item_name);
+                row.item_id = await items.getItemIdByName(row.item_name);
             }
+        }
 
-            // Update item in inventory_join_table
-            await IJT.modify_item_slot(vendingMachineId, slot_name, item_id, price, stock);
+        let version;
+        try {
+            version = await IJT.apply_versioned_rows(vendingMachineId, rows);
+        } catch (err) {
+            if(err.conflicts === undefined) throw err;
+            res.status(409).json({ 
+                error: err.message, 
+                conflicts: await IJT.get_slot_rows(vendingMachineId, err.conflicts),
+            });
+            return;
         }
 
         // Notifies vending machine of restock if current operation is restock
         await mqtt.notifyIfRestock(vendingMachineId)
 
-        res.json({ message: "Items updated successfully" });
+        res.json({ message: "Items updated successfully", version });
     } catch (err) {
         res.status(500).json({ error: err.message });
     }
@@ -35,6 +35,8 @@ CREATE TABLE IF NOT EXISTS vending_machines (
     vm_row_count INT UNSIGNED DEFAULT 0, -- Added default value
     vm_column_count INT UNSIGNED DEFAULT 0, -- Added default value
     vm_mode CHAR(1) NOT NULL DEFAULT 'i', -- "i" for idle, "r" for restocking, "t" for transaction
+    vm_inventory_version INT UNSIGNED NOT NULL DEFAULT 0, -- Bumped on every inventory write
+    vm_inventory_deleted_version INT UNSIGNED NOT NULL DEFAULT 0, -- Version of the latest slot delete
     org_id INT NOT NULL, 
     FOREIGN KEY (org_id) REFERENCES orgs(org_id) ON DELETE CASCADE
 );
@@ -62,6 +64,7 @@ CREATE TABLE IF NOT EXISTS inventory_join_table (
     IJT_item_id INT NOT NULL,
     IJT_price DECIMAL(10, 2) UNSIGNED NOT NULL,
     IJT_stock INT UNSIGNED NOT NULL,
+    IJT_version INT UNSIGNED NOT NULL DEFAULT 0, -- vm_inventory_version of the last write to this slot
     UNIQUE (IJT_vm_id, IJT_slot_name),
     FOREIGN KEY (IJT_vm_id) REFERENCES vending_machines(vm_id) ON DELETE CASCADE,
     FOREIGN KEY (IJT_item_id) REFERENCES items(item_id) ON DELETE CASCADE
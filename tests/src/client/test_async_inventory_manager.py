@@ -0,0 +1,170 @@
+import asyncio
+import inspect
+
+import pytest
+
+from src.client import async_inventory_manager, inventory_manager
+from src.client.async_inventory_manager import AsyncInventoryManager
+
+# Use the enum and errors the core imported so identity checks line up
+InventoryManagerMode = inventory_manager.InventoryManagerMode
+err = inventory_manager.err
+
+
+class FakeBackend:
+    """In memory stand in for AsyncSignalIO."""
+
+    def __init__(self) -> None:
+        self.mode = "i"
+        self.inventory = [{"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 4}]
+        self.updates = []
+        self.conflicts = []
+        self.mode_requests = 0
+
+    async def get_vending_machine(self, _hardware_id: str) -> dict:
+        await asyncio.sleep(0)
+        self.mode_requests += 1
+        return {"vm_row_count": 2, "vm_column_count": 2, "vm_mode": self.mode}
+
+    async def set_mode(
+        self, _hardware_id: str, new_mode: str, expected_mode: str | None = None) -> dict:
+        self.mode_requests += 1
+        if expected_mode is not None and expected_mode != self.mode:
+            raise err.QueryFailureError("Conflict", status_code=409)
+        self.mode = new_mode
+        return {}
+
+    async def get_inventory_of_vending_machine(
+        self, _hardware_id: str, since: int | None = None) -> list[dict]:
+        self.since = since
+        return self.inventory
+
+    async def update_database(self, _hardware_id: str, inventory: list[dict]) -> dict:
+        self.updates.append(inventory)
+        if self.conflicts:
+            raise err.InventoryConflictError("Conflict", self.conflicts.pop())
+        return {"version": 8}
+
+
+@pytest.fixture
+def backend(monkeypatch: pytest.MonkeyPatch) -> FakeBackend:
+    fake = FakeBackend()
+    monkeypatch.setattr(async_inventory_manager, "AsyncSignalIO", fake)
+    return fake
+
+
+def test_sync_from_database(backend: FakeBackend) -> None:
+    """Tests that awaiting sync_from_database loads inventory and mode."""
+    backend.mode = "r"
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+    asyncio.run(inv_man.sync_from_database())
+
+    assert inv_man.get_item("00").get_stock() == 4
+    assert inv_man.get_mode() is InventoryManagerMode.RESTOCKING
+
+
+def test_transaction_round_trip(backend: FakeBackend) -> None:
+    """Tests mode changes and saving the change log through the awaitable API."""
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+
+    async def run() -> None:
+        await inv_man.sync_from_database()
+        await inv_man.set_mode(InventoryManagerMode.TRANSACTION)
+        inv_man.change_stock("00", -1)
+        await inv_man.save_inventory_to_db()
+        await inv_man.set_mode(InventoryManagerMode.IDLE)
+
+    asyncio.run(run())
+
+    assert backend.mode == "i"
+    assert backend.updates == [
+        [{"slot_name": "00", "item_name": "Soda", "stock_delta": -1, "expected_version": 0}]]
+
+
+def test_delta_sync(backend: FakeBackend) -> None:
+    """Tests that syncs send the version token and only touch slots that changed."""
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+    backend.inventory = {
+        "version": 3, "full": True, "rows": [
+            {"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 4},
+            {"slot_name": "01", "item_name": "Chips", "price": "1.00", "stock": 2},
+        ],
+    }
+    assert asyncio.run(inv_man.load_inventory_from_db()) == ["00", "01"]
+    assert backend.since == 0
+
+    backend.inventory = {
+        "version": 5, "full": False, "rows": [
+            {"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 4},
+            {"slot_name": "01", "item_name": "Chips", "price": "1.00", "stock": 7},
+        ],
+    }
+    assert asyncio.run(inv_man.load_inventory_from_db()) == ["01"]
+    assert backend.since == 3
+    assert inv_man.inventory_version == 5
+
+    # A full snapshot clears slots the database no longer has
+    backend.inventory = {"version": 6, "full": True, "rows": backend.inventory["rows"][1:]}
+    assert asyncio.run(inv_man.load_inventory_from_db()) == ["00"]
+    assert inv_man.get_stock_information() == "01: Chips, Price: 1.0, Left in Stock: 7"
+
+
+def test_mode_lease_and_compare_and_set(backend: FakeBackend) -> None:
+    """Tests that mode changes take one request and conflicts are resolved from the database."""
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+    asyncio.run(inv_man.sync_from_database())
+
+    backend.mode_requests = 0
+    asyncio.run(inv_man.set_mode(InventoryManagerMode.TRANSACTION))
+    asyncio.run(inv_man.load_mode_from_db())
+    assert backend.mode_requests == 1
+
+    asyncio.run(inv_man.set_mode(InventoryManagerMode.IDLE))
+
+    # A vendor started restocking behind our back, the stale cached mode loses the CAS
+    backend.mode = "r"
+    with pytest.raises(err.InvalidModeError):
+        asyncio.run(inv_man.set_mode(InventoryManagerMode.TRANSACTION))
+    assert inv_man.get_mode() is InventoryManagerMode.RESTOCKING
+
+
+def test_stock_conflict_is_merged(backend: FakeBackend) -> None:
+    """Tests that a sale rejected by a concurrent restock is re-applied on top of it."""
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+    asyncio.run(inv_man.sync_from_database())
+
+    inv_man.change_stock("00", -1)
+    backend.conflicts = [
+        [{"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 10, "version": 7}]]
+    asyncio.run(inv_man.save_inventory_to_db())
+
+    assert backend.updates[-1] == [
+        {"slot_name": "00", "item_name": "Soda", "stock_delta": -1, "expected_version": 7}]
+    assert inv_man.get_item("00").get_stock() == 9
+    assert inv_man.slot_versions[0] == 8
+
+
+class BlockingBackend:
+    """Blocking stand in for SignalIO answering with a FakeBackend."""
+
+    def __init__(self, backend: FakeBackend) -> None:
+        self.backend = backend
+
+    def __getattr__(self, name: str) -> object:
+        method = getattr(self.backend, name)
+        return lambda *args: asyncio.run(method(*args))
+
+
+def test_core_stays_blocking(backend: FakeBackend, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests that the core shares state with the async manager and its methods still block."""
+    inv_man = AsyncInventoryManager(2, 2, "TEST")
+    # Patch the module the core was loaded from, the flat import of inventory_manager
+    monkeypatch.setattr(inspect.getmodule(inv_man.core), "SignalIO", BlockingBackend(backend))
+
+    # e.g. the MQTT thread resyncs through the core
+    vm_db = inv_man.core.sync_from_database()
+    assert vm_db["vm_mode"] == "i"
+    assert inv_man.get_item("00").get_stock() == 4
+
+    asyncio.run(inv_man.set_mode(InventoryManagerMode.TRANSACTION))
+    assert inv_man.core.get_mode() is InventoryManagerMode.TRANSACTION
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.client import circuit_breaker, db_ping
+from src.client.circuit_breaker import CircuitBreaker
+
+CircuitState = circuit_breaker.CircuitState
+
+
+class FakeClock:
+    """Manually advanced stand in for time.monotonic."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock: FakeClock) -> CircuitBreaker:
+    """Breaker without jitter so backoff delays are exact."""
+    return CircuitBreaker(
+        failure_threshold=2, base_delay=1, max_delay=4, jitter=0, clock=clock, rng=lambda: 0.5)
+
+
+def test_opens_after_threshold(breaker: CircuitBreaker) -> None:
+    """Tests that the breaker only opens after consecutive failures reach the threshold."""
+    breaker.record_failure()
+    assert breaker.get_state() is CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.get_state() is CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.time_until_retry() == 1
+
+
+def test_half_open_single_trial(breaker: CircuitBreaker, clock: FakeClock) -> None:
+    """Tests that only one trial request is let through once the backoff has passed."""
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 1
+
+    assert breaker.get_state() is CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.get_state() is CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_backoff_grows_and_caps(breaker: CircuitBreaker, clock: FakeClock) -> None:
+    """Tests exponential backoff on repeated failed trials, capped at max_delay."""
+    breaker.record_failure()
+    breaker.record_failure()
+    delays = [breaker.time_until_retry()]
+    for _ in range(3):
+        clock.now += delays[-1]
+        assert breaker.allow_request()
+        breaker.record_failure()
+        delays.append(breaker.time_until_retry())
+
+    assert delays == [1, 2, 4, 4]
+
+
+def test_jitter_range(clock: FakeClock) -> None:
+    """Tests that jitter only randomizes the configured fraction of the delay."""
+    low = CircuitBreaker(base_delay=2, jitter=0.5, clock=clock, rng=lambda: 0.0)
+    high = CircuitBreaker(base_delay=2, jitter=0.5, clock=clock, rng=lambda: 1.0)
+    assert low.backoff_delay(1) == 1
+    assert high.backoff_delay(1) == 2
+
+
+def test_before_call_fails_fast(breaker: CircuitBreaker) -> None:
+    """Tests that before_call refuses requests while open."""
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(circuit_breaker.err.BackendUnavailableError):
+        breaker.before_call()
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_half_open_second_caller_waits(breaker: CircuitBreaker, clock: FakeClock) -> None:
+    """Tests that a caller refused during the half open trial waits for it to resolve."""
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 1
+    assert breaker.allow_request()
+
+    # The trial is in flight: a second caller must back off instead of retrying at once
+    assert not breaker.allow_request()
+    assert breaker.time_until_retry() == breaker.trial_wait
+
+    breaker.trial_wait = 5
+    waiter = threading.Thread(target=breaker.wait_until_available)
+    waiter.start()
+    breaker.record_success()
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+    assert breaker.allow_request()
+
+
+def test_guard_does_not_spin_during_trial(
+    breaker: CircuitBreaker, clock: FakeClock, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that a guarded call made during the half open trial waits before checking again."""
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 1
+    assert breaker.allow_request()
+    breaker.trial_wait = 0.05
+    monkeypatch.setattr(db_ping, "get_breaker", lambda: breaker)
+    waits = []
+
+    @db_ping.async_circuit_breaker_guard()
+    async def call() -> str:
+        return "ok"
+
+    async def run() -> str:
+        async def resolve_trial() -> None:
+            await asyncio.sleep(0.1)
+            breaker.record_success()
+
+        resolver = asyncio.create_task(resolve_trial())
+        result = await call()
+        await resolver
+        return result
+
+    original = breaker.async_wait_until_available
+
+    async def counted_wait() -> None:
+        waits.append(breaker.time_until_retry())
+        await original()
+
+    monkeypatch.setattr(breaker, "async_wait_until_available", counted_wait)
+    assert asyncio.run(run()) == "ok"
+    assert 0 < len(waits) <= 3
+    assert all(wait > 0 for wait in waits)
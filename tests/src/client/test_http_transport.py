@@ -0,0 +1,69 @@
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.client.http_transport import HttpTransport
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    """Local keep-alive HTTP server standing in for the backend."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(server_url: str) -> None:
+    """Tests that consecutive requests share one pooled connection."""
+    transport = HttpTransport()
+    for _ in range(5):
+        transport.get(server_url + "/vending-machines/ID/inventory").raise_for_status()
+
+    stats = transport.get_stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+    assert stats["routes"]["inventory"]["requests"] == 5
+    transport.close()
+
+
+def test_reset_stats(server_url: str) -> None:
+    """Tests that counters start from zero again after reset_stats."""
+    transport = HttpTransport()
+    transport.get(server_url + "/health")
+    transport.reset_stats()
+
+    stats = transport.get_stats()
+    assert stats["requests"] == 0
+    assert stats["connections_opened"] == 0
+    transport.close()
+
+
+def test_timeout_for_route() -> None:
+    """Tests per route timeout lookup, including nested routes and the default."""
+    transport = HttpTransport(route_timeouts={"vending-machines": 3, "inventory": 7},
+                              default_timeout=11)
+    assert transport.timeout_for("http://host/vending-machines/ID/mode") == 3
+    assert transport.timeout_for("http://host/vending-machines/ID/inventory") == 7
+    assert transport.timeout_for("http://host/stripes/pay") == 11
+    transport.close()
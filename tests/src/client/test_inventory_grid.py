@@ -0,0 +1,59 @@
+import pytest
+
+from src.client import inventory_grid
+from src.client.inventory_grid import EMPTY, InventoryGrid
+
+# Use the exceptions the module under test raises so identity checks line up
+err = inventory_grid.err
+
+
+@pytest.fixture
+def grid() -> InventoryGrid:
+    return InventoryGrid(4)
+
+
+def test_set_item_interns_names(grid: InventoryGrid) -> None:
+    """Tests that slots holding the same item share one interned name id."""
+    grid.set_item(0, "Soda", 1.5, 3)
+    grid.set_item(2, "Soda", 2.25, 1)
+
+    assert grid.name_ids[0] == grid.name_ids[2]
+    assert grid.names == ["Soda"]
+    assert list(grid.prices) == [150, 0, 225, 0]
+    assert grid.get_cost(2) == 2.25
+    assert grid.name_ids[1] == EMPTY
+
+
+def test_view_follows_slot(grid: InventoryGrid) -> None:
+    """Tests that an ItemView reads and writes through to the arrays."""
+    grid.set_item(1, "Chips", 1, 5)
+    view = grid.view(1)
+
+    view.adjust_stock(-2)
+    view.set_cost(0.75)
+    assert grid.get_stock(1) == 3
+    assert grid.prices[1] == 75
+
+    grid.set_item(1, "Candy", 2, 1)
+    assert view.get_name() == "Candy"
+
+
+def test_validation(grid: InventoryGrid) -> None:
+    """Tests that the grid rejects the same values Item does."""
+    with pytest.raises(err.NegativeCostError):
+        grid.set_item(0, "Soda", -1, 1)
+    with pytest.raises(err.NegativeStockError):
+        grid.set_item(0, "Soda", 1, -1)
+
+    grid.set_item(0, "Soda", 1, 1)
+    with pytest.raises(err.NegativeStockError):
+        grid.adjust_stock(0, -2)
+
+
+def test_clear_all(grid: InventoryGrid) -> None:
+    """Tests that clear_all empties every slot."""
+    grid.set_item(0, "Soda", 1, 1)
+    grid.set_item(3, "Chips", 1, 1)
+    grid.clear_all()
+
+    assert all(grid.is_empty(index) for index in range(grid.size))
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.client import inventory_journal
+from src.client.circuit_breaker import CircuitBreaker
+from src.client.inventory_journal import InventoryJournal, JournalReplayer
+
+
+def row(slot_name: str, stock: int) -> dict:
+    return {"slot_name": slot_name, "item_name": "Soda", "price": 1.5, "stock": stock}
+
+
+@pytest.fixture
+def journal(tmp_path) -> InventoryJournal:  # noqa: ANN001
+    return InventoryJournal(str(tmp_path / "journal.log"))
+
+
+class FakeCommunicator:
+    """Stand in for db_communicator that records replayed requests or fails like an outage."""
+
+    def __init__(self) -> None:
+        self.online = True
+        self.rejecting = False
+        self.updates = []
+        self.modes = []
+        self.VMItems = SimpleNamespace(update_vm_inv=self.update_vm_inv)
+        self.VMs = SimpleNamespace(alter_mode=self.alter_mode)
+
+    def update_vm_inv(self, _hardware_id: str, rows: list[dict]) -> dict:
+        if not self.online:
+            raise ConnectionError("offline")
+        if self.rejecting:
+            raise inventory_journal.err.QueryFailureError("Invalid inventory", status_code=400)
+        self.updates.append(rows)
+        return {}
+
+    def alter_mode(self, _hardware_id: str, mode: str) -> dict:
+        self.modes.append(mode)
+        return {}
+
+
+@pytest.fixture
+def communicator(monkeypatch: pytest.MonkeyPatch) -> FakeCommunicator:
+    fake = FakeCommunicator()
+    breaker = CircuitBreaker(failure_threshold=100)
+    monkeypatch.setattr(inventory_journal, "db_communicator", fake)
+    # Fresh breaker so failures from other tests don't short circuit the replay
+    monkeypatch.setattr(inventory_journal, "get_breaker", lambda: breaker)
+    return fake
+
+
+def test_records_survive_restart(journal: InventoryJournal) -> None:
+    """Tests that pending records are read back by a new journal on the same file."""
+    journal.append_changes([row("00", 3)])
+    journal.append_mode("t")
+    journal.close()
+
+    reopened = InventoryJournal(journal.path)
+    assert reopened.pending_rows() == [row("00", 3)]
+    assert reopened.pending_mode() == "t"
+
+
+def test_torn_write_is_ignored(journal: InventoryJournal) -> None:
+    """Tests that a partially written final line from a crash does not lose earlier records."""
+    journal.append_changes([row("00", 3)])
+    journal.close()
+    with open(journal.path, "a") as file:  # noqa: PTH123
+        file.write('{"type":"inventory","ro')
+
+    assert InventoryJournal(journal.path).pending_rows() == [row("00", 3)]
+
+
+def test_next_batch_coalesces(journal: InventoryJournal) -> None:
+    """Tests that batches keep only the latest row per slot and respect the slot limit."""
+    journal.append_changes([row("00", 3)])
+    journal.append_changes([row("00", 2)])
+    journal.append_changes([row("01", 5)])
+
+    rows, mode, seq = journal.next_batch(max_slots=1)
+    assert rows == [row("00", 2)]
+    assert mode is None
+    assert seq == 2
+
+
+def test_stock_deltas_are_added_up(journal: InventoryJournal) -> None:
+    """Tests that coalescing sums stock deltas and folds them into an earlier full row."""
+    sale = {"slot_name": "00", "item_name": "Soda", "stock_delta": -1, "expected_version": 4}
+    journal.append_changes([sale])
+    journal.append_changes([{**sale, "expected_version": 5}])
+    assert journal.pending_rows() == [{**sale, "stock_delta": -2}]
+
+    journal.append_changes([row("01", 5)])
+    journal.append_changes([{**sale, "slot_name": "01"}])
+    assert journal.pending_rows()[1] == row("01", 4)
+
+
+def test_acknowledge_compacts(journal: InventoryJournal) -> None:
+    """Tests that acknowledging everything empties the journal file."""
+    journal.append_changes([row("00", 3)])
+    journal.append_mode("i")
+    journal.acknowledge(2)
+
+    assert not journal.has_pending()
+    assert journal.size_bytes() == 0
+    assert journal.get_stats()["compactions"] == 1
+
+
+def test_replay_drains_journal(journal: InventoryJournal, communicator: FakeCommunicator) -> None:
+    """Tests that replay sends coalesced rows and the final mode, then empties the journal."""
+    journal.append_mode("t")
+    journal.append_changes([row("00", 3)])
+    journal.append_changes([row("00", 2)])
+    journal.append_mode("i")
+
+    replayer = JournalReplayer(journal, "TEST")
+    assert replayer.replay_once()
+    assert communicator.updates == [[row("00", 2)]]
+    assert communicator.modes == ["i"]
+    assert not journal.has_pending()
+    assert replayer.get_stats()["replayed_rows"] == 1
+
+
+def test_replay_keeps_records_offline(
+    journal: InventoryJournal, communicator: FakeCommunicator) -> None:
+    """Tests that an outage leaves journaled records pending."""
+    communicator.online = False
+    journal.append_changes([row("00", 3)])
+
+    replayer = JournalReplayer(journal, "TEST")
+    assert not replayer.replay_once()
+    assert journal.pending_rows() == [row("00", 3)]
+    assert replayer.get_stats()["last_error"] is not None
+
+
+def test_replay_soon_sends_in_background(
+    journal: InventoryJournal, communicator: FakeCommunicator) -> None:
+    """Tests that replay_soon wakes the background thread without waiting for the interval."""
+    journal.append_changes([row("00", 3)])
+
+    replayer = JournalReplayer(journal, "TEST", interval=60)
+    replayer.replay_soon()
+    for _ in range(200):
+        if not journal.has_pending():
+            break
+        time.sleep(0.01)
+    replayer.stop()
+
+    assert communicator.updates == [[row("00", 3)]]
+    assert not journal.has_pending()
+
+
+def test_rejected_batch_is_dead_lettered(
+    journal: InventoryJournal, communicator: FakeCommunicator) -> None:
+    """Tests that a batch the API rejects is moved aside instead of blocking the journal."""
+    communicator.rejecting = True
+    journal.append_changes([row("00", 3)])
+    journal.append_mode("i")
+
+    replayer = JournalReplayer(journal, "TEST")
+    assert replayer.replay_once()
+    assert not journal.has_pending()
+    # The mode transition in the same batch is not lost with the rejected rows
+    assert communicator.modes == ["i"]
+    assert replayer.get_stats()["rejected_batches"] == 1
+
+    with open(journal.rejected_path) as file:  # noqa: PTH123
+        rejected = [json.loads(line) for line in file]
+    assert [record["rows"] for record in rejected] == [[row("00", 3)]]
+    assert rejected[0]["mode"] is None
+
+    # Later records are replayed normally
+    communicator.rejecting = False
+    journal.append_changes([row("01", 5)])
+    assert replayer.replay_once()
+    assert communicator.updates == [[row("01", 5)]]
+
+
+def test_async_replay_shares_sync_path(
+    journal: InventoryJournal, communicator: FakeCommunicator) -> None:
+    """Tests that the awaitable replay sends through the same implementation."""
+    journal.append_changes([row("00", 3)])
+
+    replayer = JournalReplayer(journal, "TEST")
+    assert asyncio.run(replayer.async_replay_once())
+    assert communicator.updates == [[row("00", 3)]]
+    assert not journal.has_pending()
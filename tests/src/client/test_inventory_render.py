@@ -0,0 +1,35 @@
+from src.client.inventory_manager import InventoryManager
+
+
+def test_render_matches_listing() -> None:
+    """Tests the stock listing with and without empty slots."""
+    inv_man = InventoryManager(2, 2, "TEST")
+    inv_man.add_item("00", "Soda", 2, 1.5)
+    inv_man.add_item("11", "Chips", 0, 1)
+
+    assert inv_man.get_stock_information() == "00: Soda, Price: 1.5, Left in Stock: 2"
+    assert inv_man.get_stock_information(show_empty_slots=True) == "\n".join([
+        "00: Soda, Price: 1.5, Left in Stock: 2",
+        "01: <EMPTY>",
+        "10: <EMPTY>",
+        "11: Chips, Price: 1.0, Left in Stock: 0",
+    ])
+
+
+def test_render_tracks_changes() -> None:
+    """Tests that only written slots are re-rendered and every write is reflected."""
+    inv_man = InventoryManager(2, 2, "TEST")
+    inv_man.add_item("00", "Soda", 2, 1.5)
+    inv_man.get_stock_information()
+    assert not inv_man.grid.dirty
+
+    inv_man.change_stock("00", -1)
+    assert inv_man.grid.dirty == {0}
+    assert inv_man.get_stock_information() == "00: Soda, Price: 1.5, Left in Stock: 1"
+
+    # Writes through an item view mark the slot as well
+    inv_man.get_item("00").set_cost(2)
+    assert inv_man.get_stock_information() == "00: Soda, Price: 2.0, Left in Stock: 1"
+
+    inv_man.clear_slot("00")
+    assert inv_man.get_stock_information() == ""
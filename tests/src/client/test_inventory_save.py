@@ -0,0 +1,112 @@
+import pytest
+
+from src.client import inventory_manager
+from src.client.api_constants import INVENTORY_SAVE_ATTEMPTS
+from src.client.inventory_manager import InventoryManager
+
+err = inventory_manager.err
+
+
+class FakeSignalIO:
+    """In memory stand in for SignalIO answering saves with queued conflicts."""
+
+    def __init__(self) -> None:
+        self.updates = []
+        self.conflicts = []
+
+    def get_vending_machine(self, _hardware_id: str) -> dict:
+        return {"vm_row_count": 1, "vm_column_count": 2, "vm_mode": "i"}
+
+    def get_inventory_of_vending_machine(self, _hardware_id: str, _since: int) -> dict:
+        return {"version": 2, "full": True, "rows": [
+            {"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 4, "version": 2},
+            {"slot_name": "01", "item_name": "Chips", "price": "1.00", "stock": 2, "version": 1},
+        ]}
+
+    def update_database(self, _hardware_id: str, rows: list[dict]) -> dict:
+        self.updates.append(rows)
+        if self.conflicts:
+            raise err.InventoryConflictError("Conflict", self.conflicts.pop(0))
+        return {"version": 9}
+
+
+@pytest.fixture
+def api(monkeypatch: pytest.MonkeyPatch) -> FakeSignalIO:
+    fake = FakeSignalIO()
+    monkeypatch.setattr(inventory_manager, "SignalIO", fake)
+    return fake
+
+
+@pytest.fixture
+def inv_man(api: FakeSignalIO) -> InventoryManager:  # noqa: ARG001
+    manager = InventoryManager(1, 2, "TEST")
+    manager.sync_from_database()
+    return manager
+
+
+def restocked(stock: int, version: int, item_name: str = "Soda") -> list[dict]:
+    return [{
+        "slot_name": "00", "item_name": item_name, "price": "1.50", "stock": stock,
+        "version": version,
+    }]
+
+
+def test_nothing_to_save(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a save without changes sends no request."""
+    inv_man.save_inventory_to_db()
+    assert api.updates == []
+
+
+def test_sales_are_written_as_deltas(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that sales are sent as stock deltas against the slot's version, edits in full."""
+    inv_man.change_stock("00", -1)
+    inv_man.change_stock("00", -1)
+    inv_man.set_cost("01", 1.25)
+    inv_man.save_inventory_to_db()
+
+    assert api.updates == [[
+        {"slot_name": "00", "item_name": "Soda", "stock_delta": -2, "expected_version": 2},
+        {"slot_name": "01", "item_name": "Chips", "price": 1.25, "stock": 2,
+         "expected_version": 1},
+    ]]
+    assert list(inv_man.slot_versions) == [9, 9]
+
+    # The change log was cleared, saving again sends nothing
+    inv_man.save_inventory_to_db()
+    assert len(api.updates) == 1
+
+
+def test_conflict_is_rebased(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a sale rejected with 409 is rebased onto the restocked row and sent again."""
+    inv_man.change_stock("00", -1)
+    api.conflicts = [restocked(10, 5)]
+    inv_man.save_inventory_to_db()
+
+    assert api.updates[-1] == [
+        {"slot_name": "00", "item_name": "Soda", "stock_delta": -1, "expected_version": 5}]
+    assert inv_man.get_item("00").get_stock() == 9
+    assert inv_man.slot_versions[0] == 9
+
+
+def test_conflict_with_replaced_item_drops_sale(
+    api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a sale of an item that was replaced meanwhile is not sent again."""
+    inv_man.change_stock("00", -1)
+    api.conflicts = [restocked(6, 5, "Water")]
+    inv_man.save_inventory_to_db()
+
+    assert len(api.updates) == 1
+    assert inv_man.get_item("00").get_name() == "Water"
+    assert inv_man.get_item("00").get_stock() == 6
+
+
+def test_gives_up_after_save_attempts(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a slot that keeps changing fails the save with a 409 after every attempt."""
+    inv_man.change_stock("00", -1)
+    api.conflicts = [restocked(10, version) for version in range(5, 5 + INVENTORY_SAVE_ATTEMPTS)]
+
+    with pytest.raises(err.QueryFailureError) as raised:
+        inv_man.save_inventory_to_db()
+
+    assert raised.value.status_code == 409
+    assert len(api.updates) == INVENTORY_SAVE_ATTEMPTS
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.client.customer.Hardware.key_events import (
+    DROP_NEWEST,
+    DROP_OLDEST,
+    KeyEvent,
+    KeyEventQueue,
+)
+
+
+def test_events_from_a_thread_arrive_in_order() -> None:
+    """Tests that events put from another thread wake up and reach the event loop in order."""
+    async def run() -> list[str]:
+        queue = KeyEventQueue(8)
+        queue.bind(asyncio.get_running_loop())
+        producer = threading.Thread(
+            target=lambda: [queue.put(KeyEvent(key, 0.0)) for key in "123"])
+        producer.start()
+        keys = [(await asyncio.wait_for(queue.get(), 1)).key for _ in range(3)]
+        producer.join()
+        return keys
+
+    assert asyncio.run(run()) == ["1", "2", "3"]
+
+
+@pytest.mark.parametrize(("overflow", "kept"), [(DROP_NEWEST, "12"), (DROP_OLDEST, "23")])
+def test_overflow_policy(overflow: str, kept: str) -> None:
+    """Tests that a full queue drops the key its policy says and counts it."""
+    async def run() -> tuple[list[bool], str, dict]:
+        queue = KeyEventQueue(2, overflow)
+        queue.bind(asyncio.get_running_loop())
+        accepted = [queue.put(KeyEvent(key, 0.0)) for key in "123"]
+        keys = "".join([(await queue.get()).key for _ in range(2)])
+        return accepted, keys, queue.get_stats()
+
+    accepted, keys, stats = asyncio.run(run())
+    assert accepted == [True, True, overflow == DROP_OLDEST]
+    assert keys == kept
+    assert stats["dropped"] == 1
+    assert stats["peak"] == 2
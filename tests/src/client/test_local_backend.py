@@ -0,0 +1,80 @@
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from src.client import inventory_manager, local_backend
+from src.client.async_inventory_manager import AsyncInventoryManager
+from src.client.local_backend import LocalBackend
+
+# Use the enum the inventory manager imported so identity checks line up
+InventoryManagerMode = inventory_manager.InventoryManagerMode
+
+
+@pytest.fixture
+def api() -> Iterator[LocalBackend]:
+    backend = LocalBackend()
+    backend.add_machine("LOCAL", 1, 2, {"00": ("Soda", 1.5, 10)})
+    backend.start()
+    yield backend
+    backend.stop()
+
+
+async def close_transport() -> None:
+    # The session belongs to the event loop of the test
+    await local_backend.async_db_communicator.get_async_transport().close()
+
+
+def test_concurrent_sales_add_up(api: LocalBackend) -> None:
+    """Tests that stock deltas of two machines writing the same slot are both applied."""
+    first = AsyncInventoryManager(1, 2, "LOCAL")
+    second = AsyncInventoryManager(1, 2, "LOCAL")
+
+    async def run() -> None:
+        await first.sync_from_database()
+        await second.sync_from_database()
+
+        await first.set_mode(InventoryManagerMode.TRANSACTION)
+        first.change_stock("00", -1)
+        await first.save_inventory_to_db()
+        await first.set_mode(InventoryManagerMode.IDLE)
+
+        # second still expects the slot's old version, its save is rebased after a conflict
+        second.invalidate_mode_lease()
+        await second.set_mode(InventoryManagerMode.TRANSACTION)
+        second.change_stock("00", -2)
+        await second.save_inventory_to_db()
+        await second.set_mode(InventoryManagerMode.IDLE)
+        await close_transport()
+
+    asyncio.run(run())
+
+    assert api.get_stock("LOCAL", "00") == 7
+    assert api.get_mode("LOCAL") == "i"
+    assert api.get_stats()["conflicts"] == 1
+
+
+def test_mode_compare_and_set(api: LocalBackend) -> None:
+    """Tests that a mode change expecting a stale mode is refused."""
+    inv_man = AsyncInventoryManager(1, 2, "LOCAL")
+
+    async def run() -> tuple[bool, bool]:
+        changed = await inv_man.compare_and_set_mode(
+            InventoryManagerMode.IDLE, InventoryManagerMode.RESTOCKING)
+        stale = await inv_man.compare_and_set_mode(
+            InventoryManagerMode.IDLE, InventoryManagerMode.TRANSACTION)
+        await close_transport()
+        return changed, stale
+
+    assert asyncio.run(run()) == (True, False)
+    assert api.get_mode("LOCAL") == "r"
+
+
+def test_stop_restores_backend_host() -> None:
+    """Tests that the API clients point at the stand in only while it runs."""
+    host = local_backend.db_ping.BACKEND_HOST
+    backend = LocalBackend()
+    url = backend.start()
+    assert local_backend.async_db_communicator.BACKEND_HOST == url
+    backend.stop()
+    assert local_backend.db_ping.BACKEND_HOST == host
@@ -0,0 +1,131 @@
+import pytest
+
+from src.client import inventory_manager
+from src.client.customer.mqtt import MQTTConnection
+from src.client.inventory_manager import InventoryManager
+
+# Use the enum and errors the inventory manager imported so identity checks line up
+InventoryManagerMode = inventory_manager.InventoryManagerMode
+err = inventory_manager.err
+
+
+class FakeSignalIO:
+    """In memory stand in for SignalIO counting mode requests."""
+
+    def __init__(self) -> None:
+        self.mode = "i"
+        self.reads = 0
+        self.writes = 0
+        self.always_conflict = False
+
+    def get_vending_machine(self, _hardware_id: str) -> dict:
+        self.reads += 1
+        return {"vm_row_count": 1, "vm_column_count": 2, "vm_mode": self.mode}
+
+    def set_mode(self, _hardware_id: str, new_mode: str, expected_mode: str) -> dict:
+        self.writes += 1
+        if self.always_conflict or expected_mode != self.mode:
+            raise err.QueryFailureError("Conflict", status_code=409)
+        self.mode = new_mode
+        return {}
+
+    def get_inventory_of_vending_machine(self, _hardware_id: str, _since: int) -> list[dict]:
+        return [{"slot_name": "00", "item_name": "Soda", "price": "1.50", "stock": 4}]
+
+
+@pytest.fixture
+def api(monkeypatch: pytest.MonkeyPatch) -> FakeSignalIO:
+    fake = FakeSignalIO()
+    monkeypatch.setattr(inventory_manager, "SignalIO", fake)
+    return fake
+
+
+@pytest.fixture
+def inv_man(api: FakeSignalIO) -> InventoryManager:
+    manager = InventoryManager(1, 2, "TEST")
+    manager.sync_from_database()
+    api.reads = 0
+    return manager
+
+
+def test_lease_skips_mode_reads(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a leased mode is changed with a single compare-and-set request."""
+    inv_man.load_mode_from_db()
+    inv_man.set_mode(InventoryManagerMode.TRANSACTION)
+
+    assert (api.reads, api.writes) == (0, 1)
+    assert api.mode == "t"
+    assert inv_man.get_mode() is InventoryManagerMode.TRANSACTION
+
+
+def test_expired_lease_is_read_before_validating(
+    api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that set_mode validates against the database mode once the lease is gone."""
+    api.mode = "r"
+    inv_man.invalidate_mode_lease()
+
+    with pytest.raises(err.InvalidModeError):
+        inv_man.set_mode(InventoryManagerMode.TRANSACTION)
+
+    # Refused locally, no compare-and-set was sent
+    assert (api.reads, api.writes) == (1, 0)
+    assert inv_man.get_mode() is InventoryManagerMode.RESTOCKING
+
+
+def test_conflict_reloads_and_retries(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that a 409 reloads the mode and the change is retried against it."""
+    inv_man.set_mode(InventoryManagerMode.TRANSACTION)
+    # A vendor took over the machine, the lease still holds the stale TRANSACTION
+    api.mode = "r"
+
+    inv_man.set_mode(InventoryManagerMode.IDLE)
+
+    assert (api.reads, api.writes) == (1, 3)
+    assert api.mode == "i"
+    assert inv_man.get_mode() is InventoryManagerMode.IDLE
+
+
+def test_repeated_conflict_gives_up(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that set_mode retries a conflicting change only once."""
+    api.always_conflict = True
+
+    with pytest.raises(err.InvalidModeError):
+        inv_man.set_mode(InventoryManagerMode.TRANSACTION)
+    assert api.writes == 2
+    assert inv_man.get_mode() is InventoryManagerMode.IDLE
+
+
+def test_mode_announcement_is_applied(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that vm/mode messages set the cached mode without requests."""
+    restocks = []
+
+    def on_message(topic: str, payload: bytes) -> None:
+        MQTTConnection.handle_message("TEST", inv_man, lambda: restocks.append(1), topic, payload)
+
+    assert not inv_man.mode_confirmed()
+    on_message("vm/mode/TEST", b"i")
+    assert inv_man.mode_confirmed()
+
+    on_message("vm/mode/OTHER", b"t")
+    assert inv_man.get_mode() is InventoryManagerMode.IDLE
+
+    api.mode = "r"
+    on_message("vm/mode/TEST", b"r")
+    assert inv_man.get_mode() is InventoryManagerMode.RESTOCKING
+    assert inv_man.mode_confirmed()
+    assert (api.reads, api.writes) == (0, 0)
+
+    on_message("vm/restocked/TEST", b"TEST restocked")
+    assert restocks == [1]
+
+
+def test_lost_announcements_drop_the_lease(api: FakeSignalIO, inv_man: InventoryManager) -> None:
+    """Tests that the mode is read again after the connection to the broker was lost."""
+    inv_man.apply_remote_mode("i")
+    inv_man.mode_notifications_lost()
+    assert not inv_man.mode_confirmed()
+
+    api.mode = "r"
+    inv_man.load_mode_from_db()
+    assert api.reads == 1
+    assert inv_man.get_mode() is InventoryManagerMode.RESTOCKING
@@ -0,0 +1,37 @@
+import pytest
+
+from src.client.customer.Hardware.motion_profile import S_CURVE, TRAPEZOIDAL, MotionProfile
+
+
+@pytest.mark.parametrize("shape", [TRAPEZOIDAL, S_CURVE])
+def test_delays_ramp_up_cruise_and_down(shape: str) -> None:
+    """Tests that a move accelerates from the start rate to the max rate and back."""
+    profile = MotionProfile(shape, start_rate=500, max_rate=1000, acceleration=2500)
+    delays = profile.delays(2000)
+
+    assert len(delays) == 2000
+    assert delays[0] == pytest.approx(1 / 500)
+    assert delays[-1] == delays[0]
+    assert delays[1000] == pytest.approx(1 / 1000)
+    ramp = delays[:len(profile.ramp)]
+    assert ramp == sorted(ramp, reverse=True)
+    assert profile.duration(2000) < 2000 / 500
+
+
+def test_short_move_turns_around_half_way() -> None:
+    """Tests that a move too short to reach the max rate is still symmetric."""
+    profile = MotionProfile(TRAPEZOIDAL, start_rate=500, max_rate=1000, acceleration=2500)
+    delays = profile.delays(11)
+
+    assert len(delays) == 11
+    assert delays == delays[::-1]
+    assert min(delays) > 1 / 1000
+
+
+def test_invalid_profile() -> None:
+    """Tests that invalid shapes and rates are rejected."""
+    with pytest.raises(ValueError):  # noqa: PT011
+        MotionProfile("linear", 500, 1000, 2500)
+    with pytest.raises(ValueError):  # noqa: PT011
+        MotionProfile(TRAPEZOIDAL, 1000, 500, 2500)
+    assert MotionProfile.from_config(None) is None
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from src.client.customer.hardware_manager import MotorScheduler
+
+STEP_DELAY = 0.01
+
+
+class FakeMotor:
+    """Stand in for StepperMotor recording when each step was taken."""
+
+    max_energized_coils = 1
+
+    def __init__(self, stall: float = 0.0) -> None:
+        self.stall = stall
+        self.steps: list[float] = []
+
+    def step_delays(self, total_steps: int) -> list[float]:
+        return [STEP_DELAY] * total_steps
+
+    def total_steps(self, quarter_rotations: int) -> int:
+        return quarter_rotations
+
+    def begin(self) -> None:
+        pass
+
+    def step(self, _step_num: int) -> None:
+        self.steps.append(time.perf_counter())
+        if len(self.steps) == 1:
+            # e.g. the stepping thread was descheduled
+            time.sleep(self.stall)
+
+    def end(self) -> None:
+        pass
+
+
+def test_late_step_restarts_schedule() -> None:
+    """Tests that a step more than an interval late doesn't cause a burst of catch up steps."""
+    scheduler = MotorScheduler()
+    motor = FakeMotor(stall=6 * STEP_DELAY)
+    asyncio.run(scheduler.rotate(motor, 4))
+    scheduler.close()
+
+    gaps = [later - earlier for earlier, later in zip(motor.steps, motor.steps[1:], strict=False)]
+    assert gaps[0] >= 6 * STEP_DELAY
+    # The steps after the late one keep their spacing instead of being sent back to back
+    assert min(gaps[1:]) >= STEP_DELAY / 2
@@ -0,0 +1,96 @@
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from src.client.customer.Hardware import LCD_display, keypad, stepper_motors
+from src.client.customer.Hardware.hardware_constants import (
+    KEYPAD_COL_PINS,
+    KEYPAD_LAYOUT,
+    KEYPAD_ROW_PINS,
+    STEP_SEQUENCE,
+)
+from src.client.customer.Hardware.simulated.keypad_matrix import KeypadMatrix
+
+
+@pytest.fixture(autouse=True)
+def simulated() -> Iterator[None]:
+    # The drivers' own backend module, tests import them under another package name
+    backend = LCD_display.backend
+    backend.select(backend.SIMULATED)
+    yield
+    backend.select(backend.REAL)
+
+
+def make_lcd() -> LCD_display.LCDDisplay:
+    return LCD_display.LCDDisplay(0x27, 16, 0x80, 0xC0, 1, 0, 0x08, 0x04, 0.0005, 0.0005)
+
+
+def test_lcd_writes_reach_the_display() -> None:
+    """Tests that diffed, batched writes show up on the virtual HD44780 without busy errors."""
+    async def run() -> tuple[list[str], dict, dict]:
+        lcd = make_lcd()
+        await lcd.init()
+        await lcd.write("CHOOSE SLOT", 0x80)
+        await lcd.write("A12", 0xC0)
+        await lcd.write("A1", 0xC0)
+        return lcd.bus.device(0x27).lines(), lcd.bus.device(0x27).get_stats(), lcd.get_stats()
+
+    lines, display, stats = asyncio.run(run())
+    assert lines == ["CHOOSE SLOT     ", "A1              "]
+    assert display["busy_violations"] == 0
+    assert stats["skipped_chars"] > 0
+
+
+def test_lcd_scrolls_by_display_shift() -> None:
+    """Tests that a long message with a blank other line scrolls by shifting the display."""
+    async def run() -> list[list[str]]:
+        lcd = make_lcd()
+        await lcd.init()
+        await lcd.write("PRESS C TO PAY FOR ITEMS", 0x80, scroll_delay=0.02)
+        frames = [lcd.bus.device(0x27).lines()]
+        # Wait for the display to shift, a loaded machine may take longer than scroll_delay
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            frames.append(lcd.bus.device(0x27).lines())
+            if frames[-1] != frames[0]:
+                break
+        await lcd.clear_all()
+        frames.append(lcd.bus.device(0x27).lines())
+        return frames
+
+    frames = asyncio.run(run())
+    text = "PRESS C TO PAY FOR ITEMS".ljust(40) * 2
+    assert all(frame[0] in text and frame[1] == " " * 16 for frame in frames[:-1])
+    assert len({frame[0] for frame in frames[:-1]}) > 1
+    assert frames[-1] == [" " * 16, " " * 16]
+
+
+def test_keypad_reads_scripted_taps() -> None:
+    """Tests that the edge triggered keypad queues every tap of the virtual matrix once."""
+    async def run() -> list[str]:
+        pad = keypad.AsyncKeypad(
+            KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS, chip=1, debounce=0.002)
+        matrix = KeypadMatrix(
+            keypad.backend.lgpio.get_chip(1), KEYPAD_LAYOUT, KEYPAD_ROW_PINS, KEYPAD_COL_PINS)
+        await pad.start()
+        matrix.play([(0.01, key) for key in "A12*"])
+        keys = [await asyncio.wait_for(pad.get_key(), 10) for _ in range(4)]
+        await pad.close()
+        return keys
+
+    assert asyncio.run(run()) == ["A", "1", "2", "*"]
+
+
+def test_stepper_steps_are_recorded() -> None:
+    """Tests that a rotation writes every step of the sequence as one group write."""
+    motor = stepper_motors.StepperMotor(8, 0.0005, STEP_SEQUENCE, [2, 3, 4, 17], chip=2)
+    motor.run_steps(16)
+    motor.close()
+
+    recorder = stepper_motors.backend.lgpio.get_chip(2).recorders[2]
+    assert [bits for _, bits in recorder.writes] == motor.step_masks * 2 + [0, 0]
+    stats = recorder.get_stats()
+    assert stats["steps"] == 16
+    # Deadlines are absolute, a late step shortens the next interval but never speeds up the run
+    assert stats["rate"] <= 1 / 0.0005 * 1.01
@@ -0,0 +1,54 @@
+import pytest
+
+from src.client import slot_addressing
+from src.client.slot_addressing import SlotAddressing, row_label, slot_naming_from_config
+
+# Use the enum and exceptions the module under test imported so identity checks line up
+SlotNamingScheme = slot_addressing.SlotNamingScheme
+err = slot_addressing.err
+
+
+def test_digits_scheme() -> None:
+    """Tests that small machines keep the original two digit slot names."""
+    slots = SlotAddressing(3, 4)
+
+    assert slots.scheme is SlotNamingScheme.DIGITS
+    assert slots.get_index("23") == 11
+    assert slots.get_coordinates("12") == (1, 2)
+    with pytest.raises(err.InvalidSlotNameError):
+        slots.get_index("24")
+
+
+def test_alphanumeric_scheme() -> None:
+    """Tests naming, aliases and reverse lookup on a machine larger than 10x10."""
+    slots = SlotAddressing(40, 12)
+
+    assert slots.scheme is SlotNamingScheme.ALPHANUMERIC
+    assert slots.get_name(0) == "A01"
+    assert slots.get_index("AB12") == 27 * 12 + 11
+    assert slots.get_index("c3") == slots.get_index("C03") == 2 * 12 + 2
+    assert len(set(slots.names)) == 40 * 12
+    with pytest.raises(err.InvalidSlotNameError):
+        slots.get_index("A13")
+
+
+def test_row_labels() -> None:
+    """Tests the letter sequence used for rows."""
+    assert [row_label(r) for r in (0, 25, 26, 51, 701)] == ["A", "Z", "AA", "AZ", "ZZ"]
+
+
+def test_dimension_limits() -> None:
+    """Tests that dimensions are checked against the scheme and slot limit."""
+    with pytest.raises(err.InvalidDimensionsError):
+        SlotAddressing(11, 2, SlotNamingScheme.DIGITS)
+    with pytest.raises(err.InvalidDimensionsError):
+        SlotAddressing(0, 5)
+    with pytest.raises(err.InvalidDimensionsError):
+        SlotAddressing(200, 200)
+
+
+def test_slot_naming_from_config() -> None:
+    """Tests reading the optional scheme from the machine configuration."""
+    assert slot_naming_from_config({}) is None
+    assert slot_naming_from_config({"slot_naming": "alphanumeric"}) is (
+        SlotNamingScheme.ALPHANUMERIC)
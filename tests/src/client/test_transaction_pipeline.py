@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.client.transaction_pipeline import TransactionPipeline
+
+
+def test_stages_overlap_then_commit() -> None:
+    """Tests that charge and save run at the same time and commit runs after both."""
+    pipeline = TransactionPipeline()
+    both_started = threading.Barrier(2, timeout=2)
+    calls = []
+
+    pipeline.run(
+        lambda: calls.append(("charge", both_started.wait())),
+        lambda: calls.append(("save", both_started.wait())),
+        lambda: calls.append(("commit", None)),
+    )
+
+    assert calls[-1] == ("commit", None)
+    stats = pipeline.get_stats()
+    assert stats["runs"] == 1
+    assert stats["commit"]["count"] == 1
+
+
+def test_failed_stage_skips_commit() -> None:
+    """Tests that a failing charge rolls back the commit but lets the save finish."""
+    pipeline = TransactionPipeline()
+    calls = []
+
+    async def charge() -> None:
+        raise ConnectionError("declined")
+
+    async def save() -> None:
+        await asyncio.sleep(0)
+        calls.append("save")
+
+    async def commit() -> None:
+        calls.append("commit")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(pipeline.run_async(charge, save, commit))
+
+    assert calls == ["save"]
+    stats = pipeline.get_stats()
+    assert stats["rollbacks"] == 1
+    assert stats["charge"]["failures"] == 1
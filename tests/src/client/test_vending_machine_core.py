@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from src.client import inventory_manager
+from src.client.api_operation import run_operation
+from src.client.customer.vending_machine_core import VendingMachineCore
+from src.client.inventory_journal import InventoryJournal
+from src.client.inventory_manager import InventoryManager
+
+# Use the enum and errors the inventory manager imported so identity checks line up
+InventoryManagerMode = inventory_manager.InventoryManagerMode
+err = inventory_manager.err
+
+
+class FakeSignalIO:
+    """In memory stand in for SignalIO recording every request."""
+
+    def __init__(self) -> None:
+        self.mode = "i"
+        self.requests = []
+
+    def get_vending_machine(self, _hardware_id: str) -> dict:
+        self.requests.append("get_vending_machine")
+        return {"vm_row_count": 1, "vm_column_count": 2, "vm_mode": self.mode}
+
+    def set_mode(self, _hardware_id: str, new_mode: str, expected_mode: str) -> dict:
+        self.requests.append("set_mode")
+        if expected_mode != self.mode:
+            raise err.QueryFailureError("Conflict", status_code=409)
+        self.mode = new_mode
+        return {}
+
+    def get_inventory_of_vending_machine(self, _hardware_id: str, _since: int) -> list[dict]:
+        return [{"slot_name": "00", "item_name": "Water", "price": "0", "stock": 4}]
+
+    def replay_journal(self, _replayer: object) -> bool:
+        return True
+
+
+@pytest.fixture
+def api(monkeypatch: pytest.MonkeyPatch) -> FakeSignalIO:
+    fake = FakeSignalIO()
+    monkeypatch.setattr(inventory_manager, "SignalIO", fake)
+    return fake
+
+
+@pytest.fixture
+def core(api: FakeSignalIO, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> VendingMachineCore:
+    inv_man = InventoryManager(1, 2, "TEST", InventoryJournal(str(tmp_path / "journal.log")))
+    # Keep the replayer thread from reaching the network
+    monkeypatch.setattr(inv_man.journal_replayer, "replay_soon", lambda: None)
+    inv_man.sync_from_database()
+    api.requests = []
+    return VendingMachineCore(inv_man)
+
+
+def buy_free_item(core: VendingMachineCore, api: FakeSignalIO) -> str:
+    return run_operation(core.buy_free_item_op("00"), api)
+
+
+def test_confirmed_mode_takes_fast_path(api: FakeSignalIO, core: VendingMachineCore) -> None:
+    """Tests that a free item is dispensed without requests once MQTT confirmed the mode."""
+    core.inv_man.apply_remote_mode("i")
+
+    assert buy_free_item(core, api) == "Water"
+    assert api.requests == []
+    assert core.inv_man.get_item("00").get_stock() == 3
+    assert core.inv_man.journal.pending_rows() != []
+
+
+def test_unconfirmed_mode_uses_compare_and_set(
+    api: FakeSignalIO, core: VendingMachineCore) -> None:
+    """Tests that without an MQTT confirmation the dispense goes through the database."""
+    assert buy_free_item(core, api) == "Water"
+    assert api.requests == ["set_mode", "set_mode"]
+    assert core.inv_man.get_mode() is InventoryManagerMode.IDLE
+
+
+def test_remote_restocking_refuses_free_item(
+    api: FakeSignalIO, core: VendingMachineCore) -> None:
+    """Tests that a vendor restocking elsewhere blocks free dispenses on both paths."""
+    # Not announced yet, the leased IDLE is stale and the compare-and-set catches it
+    api.mode = "r"
+    with pytest.raises(err.InvalidModeError):
+        buy_free_item(core, api)
+    assert core.inv_man.get_mode() is InventoryManagerMode.RESTOCKING
+
+    # Announced over MQTT, refused without a request
+    api.requests = []
+    core.inv_man.apply_remote_mode("r")
+    with pytest.raises(err.InvalidModeError):
+        buy_free_item(core, api)
+    assert api.requests == []
+
+    assert core.inv_man.get_item("00").get_stock() == 4
+    assert api.mode == "r"